@@ -8,16 +8,22 @@ from alembic import context
 from app.core.config import get_settings
 from app.db.session import Base
 from app.models import (  # noqa: F401
+    BackgroundJob,
     Project,
     PunishmentOption,
     RewardExchangeOption,
     ScoreExchange,
     ScoreIncrease,
     Student,
+    StudentScoreBalance,
     SystemSettings,
     Task,
     User,
     UserAccount,
+    score_exchanges_archive,
+    score_increases_archive,
+    students_archive,
+    tasks_archive,
 )
 
 # this is the Alembic Config object, which provides
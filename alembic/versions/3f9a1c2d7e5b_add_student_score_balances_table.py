@@ -0,0 +1,61 @@
+"""add_student_score_balances_table
+
+Revision ID: 3f9a1c2d7e5b
+Revises: b94e9028158c
+Create Date: 2026-10-17 09:12:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2d7e5b'
+down_revision: Union[str, None] = 'b94e9028158c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('student_score_balances',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('total_increase', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('total_exchange', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('available_points', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('student_id')
+    )
+
+    # 根据现有的积分增加/兑换记录回填余额（排除已删除的记录）
+    op.execute(
+        """
+        INSERT INTO student_score_balances
+            (student_id, total_increase, total_exchange, available_points, updated_at)
+        SELECT
+            s.id,
+            COALESCE(inc.total, 0),
+            COALESCE(exc.total, 0),
+            COALESCE(inc.total, 0) - COALESCE(exc.total, 0),
+            CURRENT_TIMESTAMP
+        FROM students s
+        LEFT JOIN (
+            SELECT student_id, SUM(points) AS total
+            FROM score_increases
+            WHERE is_deleted = 0
+            GROUP BY student_id
+        ) inc ON inc.student_id = s.id
+        LEFT JOIN (
+            SELECT student_id, SUM(cost_points) AS total
+            FROM score_exchanges
+            WHERE is_deleted = 0
+            GROUP BY student_id
+        ) exc ON exc.student_id = s.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('student_score_balances')
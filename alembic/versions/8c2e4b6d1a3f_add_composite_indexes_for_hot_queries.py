@@ -0,0 +1,56 @@
+"""add_composite_indexes_for_hot_queries
+
+Revision ID: 8c2e4b6d1a3f
+Revises: 3f9a1c2d7e5b
+Create Date: 2026-10-17 15:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e4b6d1a3f'
+down_revision: Union[str, None] = '3f9a1c2d7e5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 列表查询：WHERE student_id = ? AND is_deleted = 0 ORDER BY created_at DESC, id DESC
+    # 按索引顺序读取，不需要 filesort，游标分页为索引范围扫描
+    op.create_index(
+        'ix_score_increases_student_deleted_created',
+        'score_increases',
+        ['student_id', 'is_deleted', 'created_at', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_score_exchanges_student_deleted_created',
+        'score_exchanges',
+        ['student_id', 'is_deleted', 'created_at', 'id'],
+        unique=False,
+    )
+    # 任务列表同上，status（IN 条件）放在最后，通过索引条件下推在回表前过滤
+    op.create_index(
+        'ix_tasks_student_deleted_created',
+        'tasks',
+        ['student_id', 'is_deleted', 'created_at', 'id', 'status'],
+        unique=False,
+    )
+    # 首页评分统计：WHERE student_id IN (...) AND is_deleted = 0 AND status = 'completed' AND updated_at >= ?
+    # 分组用到的 project_level1_id、rating 也在索引中，只读索引即可完成统计
+    op.create_index(
+        'ix_tasks_student_status_updated',
+        'tasks',
+        ['student_id', 'is_deleted', 'status', 'updated_at', 'project_level1_id', 'rating'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_student_status_updated', table_name='tasks')
+    op.drop_index('ix_tasks_student_deleted_created', table_name='tasks')
+    op.drop_index('ix_score_exchanges_student_deleted_created', table_name='score_exchanges')
+    op.drop_index('ix_score_increases_student_deleted_created', table_name='score_increases')
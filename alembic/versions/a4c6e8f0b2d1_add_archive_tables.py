@@ -0,0 +1,107 @@
+"""add_archive_tables
+
+Revision ID: a4c6e8f0b2d1
+Revises: 5d7f9b1e3c2a
+Create Date: 2026-10-17 19:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c6e8f0b2d1'
+down_revision: Union[str, None] = '5d7f9b1e3c2a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 归档表与热表列相同（主键保持不变，可以原样恢复），不建外键
+    op.create_table('students_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('gender', sa.String(length=16), nullable=True),
+    sa.Column('birthday', sa.Date(), nullable=True),
+    sa.Column('stage', sa.String(length=16), nullable=True),
+    sa.Column('school', sa.String(length=255), nullable=True),
+    sa.Column('enroll_date', sa.Date(), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_students_archive_user_id', 'students_archive', ['user_id'], unique=False)
+
+    op.create_table('tasks_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('project_level1_id', sa.Integer(), nullable=False),
+    sa.Column('project_level2_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('rating', sa.String(length=8), nullable=True),
+    sa.Column('reward_type', sa.String(length=16), nullable=False),
+    sa.Column('reward_points', sa.Integer(), nullable=True),
+    sa.Column('punishment_option_id', sa.Integer(), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tasks_archive_student_id', 'tasks_archive', ['student_id'], unique=False)
+
+    op.create_table('score_increases_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('project_level1_id', sa.Integer(), nullable=False),
+    sa.Column('project_level2_id', sa.Integer(), nullable=True),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_score_increases_archive_student_deleted_created',
+        'score_increases_archive',
+        ['student_id', 'is_deleted', 'created_at', 'id'],
+        unique=False,
+    )
+
+    op.create_table('score_exchanges_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('reward_option_id', sa.Integer(), nullable=False),
+    sa.Column('cost_points', sa.Integer(), nullable=False),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_score_exchanges_archive_student_deleted_created',
+        'score_exchanges_archive',
+        ['student_id', 'is_deleted', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_score_exchanges_archive_student_deleted_created', table_name='score_exchanges_archive')
+    op.drop_table('score_exchanges_archive')
+    op.drop_index('ix_score_increases_archive_student_deleted_created', table_name='score_increases_archive')
+    op.drop_table('score_increases_archive')
+    op.drop_index('ix_tasks_archive_student_id', table_name='tasks_archive')
+    op.drop_table('tasks_archive')
+    op.drop_index('ix_students_archive_user_id', table_name='students_archive')
+    op.drop_table('students_archive')
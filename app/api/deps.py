@@ -2,15 +2,15 @@ from typing import AsyncGenerator
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import get_settings
-from app.core.security import verify_password
+from app.core.identity_cache import identity_cache
+from app.core.jwt_verifier import InvalidToken, VerifiedToken, token_verifier
 from app.crud.user import get_user_by_email, get_user_by_id
-from app.db.session import get_db
+from app.db.routing import mark_user_write, session_committed, should_use_replica
+from app.db.session import async_session_maker, get_db, replica_session_maker
 from app.models.user import User
-from app.schemas.user import TokenData
+from app.schemas.user import CurrentUser
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
@@ -18,50 +18,88 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme),
-) -> User:
-    settings = get_settings()
+) -> AsyncGenerator[CurrentUser, None]:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # 同一个 token 在有效期内只校验一次签名
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        sub: str | None = payload.get("sub")
-        if sub is None:
-            raise credentials_exception
-        token_data = TokenData(sub=sub)
-    except JWTError:
+        verified = token_verifier.verify(token)
+    except InvalidToken:
         raise credentials_exception
 
+    # 优先使用缓存的用户快照，命中时不查询数据库
+    current_user = identity_cache.get(verified.sub)
+    if current_user is None:
+        current_user = await _load_current_user(db, verified)
+        if current_user is None:
+            raise credentials_exception
+        identity_cache.set(verified.sub, current_user)
+
+    try:
+        yield current_user
+    finally:
+        # 请求提交了事务（与接口使用的是同一个主库会话）：之后一段时间内该用户的读请求走主库
+        if session_committed(db):
+            await mark_user_write(current_user.id)
+
+
+async def _load_current_user(db: AsyncSession, verified: VerifiedToken) -> CurrentUser | None:
     # token的sub可能是email或user_id（格式：user_id:123）
-    sub_str = token_data.sub  # type: ignore[arg-type]
-    if sub_str.startswith("user_id:"):
-        # 使用user_id查找
-        user_id = int(sub_str.split(":")[1])
-        user = await get_user_by_id(db, user_id)
+    if verified.user_id is not None:
+        user = await get_user_by_id(db, verified.user_id)
     else:
         # 使用email查找（向后兼容）
-        user = await get_user_by_email(db, sub_str)
+        user = await get_user_by_email(db, verified.sub)
     
     if user is None:
-        raise credentials_exception
-    return user
+        return None
+    return CurrentUser.model_validate(user)
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: CurrentUser = Depends(get_current_user),
+) -> CurrentUser:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="用户已被禁用")
     return current_user
 
 
 async def get_current_admin(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
+    current_user: CurrentUser = Depends(get_current_active_user),
+) -> CurrentUser:
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="权限不足")
     return current_user
 
 
+async def get_current_active_db_user(
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """需要完整用户信息（或要修改用户）的接口使用，会查询数据库"""
+    user = await get_user_by_id(db, current_user.id)
+    if user is None:
+        identity_cache.invalidate_user(current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无法验证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def get_read_db(
+    current_user: CurrentUser = Depends(get_current_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    只读接口使用的数据库会话
+    配置了只读副本且该用户最近没有写操作时使用副本，否则使用主库
+    """
+    session_maker = async_session_maker
+    if replica_session_maker is not None and await should_use_replica(current_user.id):
+        session_maker = replica_session_maker
+    async with session_maker() as session:
+        yield session
@@ -6,7 +6,7 @@ from pydantic import BaseModel
 from app.api.deps import get_current_admin
 from app.db.session import get_db
 from app.models.system import SystemSettings
-from app.models.user import User
+from app.schemas.user import CurrentUser
 
 router = APIRouter()
 
@@ -25,7 +25,7 @@ class SystemSettingsUpdate(BaseModel):
 @router.get("/settings", response_model=SystemSettingsRead)
 async def get_system_settings(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin),
+    current_user: CurrentUser = Depends(get_current_admin),
 ):
     """获取系统设置（仅管理员）"""
     result = await db.execute(select(SystemSettings).limit(1))
@@ -45,7 +45,7 @@ async def get_system_settings(
 async def update_system_settings(
     settings_update: SystemSettingsUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin),
+    current_user: CurrentUser = Depends(get_current_admin),
 ):
     """更新系统设置（仅管理员）"""
     result = await db.execute(select(SystemSettings).limit(1))
@@ -1,18 +1,29 @@
 """AI 语音助手接口 - 使用大模型解析用户语音指令"""
+import asyncio
+import copy
 import json
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from openai import AsyncOpenAI
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_db, get_read_db
+from app.core.ai_cache import ai_parse_cache, normalize_command_text, parse_cache_key
 from app.core.config import get_settings
+from app.core.llm_gateway import llm_gateway
+from app.core.stt import stt_backend
+from app.crud import ai_context as crud_ai_context
 from app.crud import project as crud_project
 from app.crud import score as crud_score
-from app.models.user import User
+from app.schemas.user import CurrentUser
+from app.schemas.ai_context import UserContextSnapshot
+from app.utils.audio import AudioSpool, UploadedAudio, join_transcripts, receive_audio_upload, split_audio
+from app.utils.fast_intent import fast_intent
+from app.utils.name_index import NameIndex, UserMatchIndex
+from app.utils.partial_json import PartialJSONObjectScanner
 
 router = APIRouter()
 settings = get_settings()
@@ -39,6 +50,16 @@ class VoiceCommandResponse(BaseModel):
     error: Optional[str] = None
 
 
+class VoiceCommandBatchRequest(BaseModel):
+    """批量语音指令请求"""
+    texts: List[str] = Field(..., min_length=1, max_length=settings.AI_BATCH_MAX_COMMANDS)
+
+
+class VoiceCommandBatchResponse(BaseModel):
+    """批量语音指令响应，results 与请求中的 texts 一一对应"""
+    results: List[VoiceCommandResponse]
+
+
 # 基础系统提示词（不包含硬编码的选项）
 SYSTEM_PROMPT = """你是一个积分管理系统的智能助手，负责解析用户的语音指令。
 
@@ -89,98 +110,124 @@ SYSTEM_PROMPT = """你是一个积分管理系统的智能助手，负责解析
 - 只返回 JSON，不要有其他内容"""
 
 
-async def _build_user_context(db: AsyncSession, user_id: int) -> str:
+def _extract_json(content: str) -> dict:
+    """从大模型返回的内容中提取 JSON"""
+    try:
+        # 尝试直接解析
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # 尝试从 markdown 代码块中提取
+        json_match = re.search(r'```(?:json)?\s*([\s\S]*?)```', content)
+        if json_match:
+            return json.loads(json_match.group(1))
+        # 尝试找到 JSON 对象
+        json_match = re.search(r'\{[\s\S]*\}', content)
+        if json_match:
+            return json.loads(json_match.group(0))
+        raise ValueError("无法从响应中提取 JSON")
+
+
+def _chat_request(full_system_prompt: str, text: str, max_tokens: int = 500) -> dict[str, Any]:
+    """解析指令的大模型请求参数"""
+    return {
+        "model": settings.AI_MODEL,
+        "messages": [
+            {"role": "system", "content": full_system_prompt},
+            {"role": "user", "content": text}
+        ],
+        "temperature": 0.3,  # 低温度以获得更确定的结果
+        "max_tokens": max_tokens,
+    }
+
+
+async def _parse_with_llm(user_id: int, full_system_prompt: str, text: str) -> dict:
     """
-    构建用户上下文信息，包含所有表单下拉框选项
-    通过调用后端接口动态获取，确保选项变化时 AI 也能自动适应
+    调用大模型解析指令，返回解析出的 JSON
+    结果按“规范化文本 + 系统提示词哈希”缓存，用户的项目或选项变化后提示词不同，不会命中旧结果
     """
-    from app.core.enums import (
-        TaskStatus,
-        TaskRating,
-        RewardType,
-        get_enum_label,
+
+    async def _request() -> bytes:
+        response = await llm_gateway.chat_completion(user_id, **_chat_request(full_system_prompt, text))
+        parsed = _extract_json(response.choices[0].message.content)
+        return json.dumps(parsed, ensure_ascii=False).encode("utf-8")
+
+    if settings.AI_PARSE_CACHE_TTL <= 0:
+        return json.loads(await _request())
+    key = parse_cache_key(user_id, full_system_prompt, text)
+    return json.loads(await ai_parse_cache.get_or_build(key, _request))
+
+
+# 批量解析时追加在系统提示词之后的说明（系统提示词前面部分与单条解析相同）
+BATCH_PROMPT_SUFFIX = """
+
+**批量解析：**用户消息是一个 JSON 数组，每个元素为 {"id": 编号, "text": "指令内容"}，各条指令相互独立。
+请对每一条分别按上述格式解析，只返回如下 JSON（每条指令对应 results 中的一个元素，id 与输入一致）：
+{"results": [{"id": 编号, "action": ..., "confidence": ..., "corrected_text": ..., "data": {...}, "message": ...}]}"""
+
+# 批量解析时大模型返回内容的 token 上限
+BATCH_MAX_TOKENS = 8000
+
+
+async def _parse_batch_with_llm(user_id: int, full_system_prompt: str, texts: List[str]) -> List[Optional[dict]]:
+    """一次大模型调用解析多条指令，返回与 texts 一一对应的解析结果（大模型漏掉的为 None）"""
+    user_message = json.dumps([{"id": i, "text": text} for i, text in enumerate(texts)], ensure_ascii=False)
+    response = await llm_gateway.chat_completion(
+        user_id,
+        **_chat_request(
+            full_system_prompt + BATCH_PROMPT_SUFFIX,
+            user_message,
+            max_tokens=min(500 * len(texts), BATCH_MAX_TOKENS),
+        ),
+    )
+    content = _extract_json(response.choices[0].message.content)
+    items = content.get("results") if isinstance(content, dict) else content
+    
+    results: List[Optional[dict]] = [None] * len(texts)
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        index = item.pop("id", None)
+        if isinstance(index, int) and 0 <= index < len(texts):
+            results[index] = item
+    return results
+
+
+def _parse_fast_path(snapshot: UserContextSnapshot, text: str) -> Optional[dict]:
+    """格式固定的指令用本地规则解析，有歧义时返回 None"""
+    if not settings.AI_FAST_PATH_ENABLED:
+        return None
+    return fast_intent.parse(text, snapshot)
+
+
+async def _parse_command(user_id: int, snapshot: UserContextSnapshot, text: str) -> dict:
+    """先尝试本地规则解析，无法确定时调用大模型"""
+    parsed = _parse_fast_path(snapshot, text)
+    if parsed is not None:
+        return parsed
+    return await _parse_with_llm(user_id, SYSTEM_PROMPT + snapshot.prompt, text)
+
+
+def _build_intent(parsed: dict) -> ParsedIntent:
+    """根据大模型的解析结果构建意图对象"""
+    data = parsed.get("data") or {}
+    # 将纠错后的文本添加到 data 中，方便前端显示
+    if parsed.get("corrected_text"):
+        data["corrected_text"] = parsed.get("corrected_text")
+    
+    return ParsedIntent(
+        action=parsed.get("action", "unknown"),
+        confidence=parsed.get("confidence", 0.5),
+        data=data,
+        message=parsed.get("message"),
+        warnings=[]
     )
-    
-    context_parts = []
-    
-    # ========== 1. 获取用户自定义的项目（一级和二级） ==========
-    level1_projects = await crud_project.get_projects_by_user(db, user_id=user_id, level=1)
-    if level1_projects:
-        projects_info = []
-        for p1 in level1_projects:
-            level2_projects = await crud_project.get_projects_by_user(
-                db, user_id=user_id, level=2, parent_id=p1.id
-            )
-            if level2_projects:
-                level2_names = [p2.name for p2 in level2_projects]
-                projects_info.append(f"  - {p1.name}：{', '.join(level2_names)}")
-            else:
-                projects_info.append(f"  - {p1.name}")
-        
-        context_parts.append("【一级项目（用户自定义）】")
-        context_parts.extend(projects_info)
-    
-    # ========== 2. 获取固定的枚举选项（通过枚举接口） ==========
-    
-    # 任务状态选项
-    task_status_options = [
-        get_enum_label("task_status", status.value) 
-        for status in TaskStatus
-    ]
-    if task_status_options:
-        context_parts.append("\n【任务状态（固定选项）】")
-        context_parts.append(f"  {', '.join(task_status_options)}")
-    
-    # 任务评分选项
-    task_rating_options = [
-        get_enum_label("task_rating", rating.value) 
-        for rating in TaskRating
-    ]
-    if task_rating_options:
-        context_parts.append("\n【任务评分（固定选项）】")
-        context_parts.append(f"  {', '.join(task_rating_options)}")
-    
-    # 惩奖类型选项
-    reward_type_options = [
-        get_enum_label("reward_type", rt.value) 
-        for rt in RewardType
-    ]
-    if reward_type_options:
-        context_parts.append("\n【惩奖类型（固定选项）】")
-        context_parts.append(f"  {', '.join(reward_type_options)}")
-    
-    # 奖励积分选项（从枚举接口获取）
-    reward_points_options = [1, 3, 5, 7, 10]  # 这些值在 enums.py 中定义
-    if reward_points_options:
-        points_labels = [f"{p}积分" for p in reward_points_options]
-        context_parts.append("\n【奖励积分（固定选项，仅供参考，必须使用用户实际说的数值）】")
-        context_parts.append(f"  {', '.join(points_labels)}")
-        context_parts.append("  **重要：如果用户说的积分值不在上述列表中，也必须使用用户实际说的数值，不要强制匹配！例如用户说'奖励15分'，即使15不在列表中，也要返回 reward_points: 15**")
-    
-    # ========== 3. 获取用户自定义的惩罚选项 ==========
-    punishment_options = await crud_score.get_punishment_options(db, user_id=user_id)
-    if punishment_options:
-        punishment_names = [p.name for p in punishment_options]
-        context_parts.append("\n【惩罚选项（用户自定义）】")
-        context_parts.append(f"  {', '.join(punishment_names)}")
-    
-    # ========== 4. 获取用户自定义的兑换选项 ==========
-    reward_options = await crud_score.get_reward_exchange_options(db, user_id=user_id)
-    if reward_options:
-        options_info = [f"  - {o.name}（{o.cost_points}积分）" for o in reward_options]
-        context_parts.append("\n【可兑换的奖励选项（用户自定义）】")
-        context_parts.extend(options_info)
-    
-    if context_parts:
-        return "\n\n**用户系统中所有可用的选项（请优先匹配这些选项，即使语音识别有错误也要智能纠错）：**\n" + "\n".join(context_parts)
-    return ""
 
 
 @router.post("/parse-voice-command", response_model=VoiceCommandResponse)
 async def parse_voice_command(
     request: VoiceCommandRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     解析用户语音指令
@@ -195,67 +242,15 @@ async def parse_voice_command(
     
     try:
         # 获取用户自定义的项目和兑换选项作为上下文
-        user_context = await _build_user_context(db, current_user.id)
-        
-        # 构建完整的系统提示词（基础提示词 + 用户上下文）
-        full_system_prompt = SYSTEM_PROMPT + user_context
-        
-        # 初始化 OpenAI 客户端（兼容 DeepSeek/Qwen）
-        client = AsyncOpenAI(
-            api_key=settings.AI_API_KEY,
-            base_url=settings.AI_API_BASE_URL,
-        )
+        snapshot = await crud_ai_context.get_user_snapshot(db, current_user.id)
         
-        # 调用大模型
-        response = await client.chat.completions.create(
-            model=settings.AI_MODEL,
-            messages=[
-                {"role": "system", "content": full_system_prompt},
-                {"role": "user", "content": request.text}
-            ],
-            temperature=0.3,  # 低温度以获得更确定的结果
-            max_tokens=500,
-        )
-        
-        # 解析大模型返回
-        content = response.choices[0].message.content
-        
-        # 尝试提取 JSON
-        try:
-            # 尝试直接解析
-            parsed = json.loads(content)
-        except json.JSONDecodeError:
-            # 尝试从 markdown 代码块中提取
-            json_match = re.search(r'```(?:json)?\s*([\s\S]*?)```', content)
-            if json_match:
-                parsed = json.loads(json_match.group(1))
-            else:
-                # 尝试找到 JSON 对象
-                json_match = re.search(r'\{[\s\S]*\}', content)
-                if json_match:
-                    parsed = json.loads(json_match.group(0))
-                else:
-                    raise ValueError("无法从响应中提取 JSON")
-        
-        # 构建意图对象
-        data = parsed.get("data", {})
-        # 将纠错后的文本添加到 data 中，方便前端显示
-        if parsed.get("corrected_text"):
-            data["corrected_text"] = parsed.get("corrected_text")
-        
-        intent = ParsedIntent(
-            action=parsed.get("action", "unknown"),
-            confidence=parsed.get("confidence", 0.5),
-            data=data,
-            message=parsed.get("message"),
-            warnings=[]
-        )
+        # 先用本地规则解析，无法确定时调用大模型（相同指令命中缓存时不调用）
+        parsed = await _parse_command(current_user.id, snapshot, request.text)
+        intent = _build_intent(parsed)
         
         # 根据意图类型进行数据匹配验证
-        if intent.action == "add_task":
-            intent = await _validate_task_data(db, intent, current_user.id)
-        elif intent.action == "exchange_points":
-            intent = await _validate_exchange_data(db, intent, current_user.id)
+        match_index = await crud_ai_context.get_user_match_index(db, current_user.id)
+        intent = _validate_intent(match_index, intent)
         
         return VoiceCommandResponse(success=True, intent=intent)
         
@@ -266,42 +261,195 @@ async def parse_voice_command(
         )
 
 
-async def _validate_task_data(
-    db: AsyncSession,
-    intent: ParsedIntent,
-    user_id: int
-) -> ParsedIntent:
+@router.post("/parse-voice-commands:batch", response_model=VoiceCommandBatchResponse)
+async def parse_voice_commands_batch(
+    request: VoiceCommandBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    批量解析语音指令（例如对照成绩单一次说出多条结果）
+    
+    用户上下文和匹配索引只加载一次；本地规则和缓存都无法解析的指令合并为一次大模型调用，
+    每条指令单独返回解析结果或错误
+    """
+    if not settings.AI_API_KEY:
+        raise HTTPException(
+            status_code=503,
+            detail="AI 服务未配置，请联系管理员设置 AI_API_KEY"
+        )
+    
+    user_id = current_user.id
+    texts = request.texts
+    snapshot = await crud_ai_context.get_user_snapshot(db, user_id)
+    full_system_prompt = SYSTEM_PROMPT + snapshot.prompt
+    match_index = await crud_ai_context.get_user_match_index(db, user_id)
+    
+    parsed: List[Optional[dict]] = [None] * len(texts)
+    errors: List[Optional[str]] = [None] * len(texts)
+    # 规范化文本 -> 需要大模型解析的指令下标（相同的指令只解析一次）
+    pending: Dict[str, List[int]] = {}
+    for i, text in enumerate(texts):
+        if not text.strip():
+            errors[i] = "指令内容为空"
+            continue
+        parsed[i] = _parse_fast_path(snapshot, text)
+        if parsed[i] is None:
+            pending.setdefault(normalize_command_text(text), []).append(i)
+    
+    use_cache = settings.AI_PARSE_CACHE_TTL > 0
+    keys = {norm: parse_cache_key(user_id, full_system_prompt, texts[indexes[0]]) for norm, indexes in pending.items()}
+    generations: Dict[str, bytes] = {}
+    if use_cache:
+        for norm in list(pending):
+            cached = await ai_parse_cache.get(keys[norm])
+            if cached is not None:
+                for i in pending.pop(norm):
+                    parsed[i] = json.loads(cached)
+            else:
+                # 生成前记录缓存代数，写回缓存时使用
+                generations[norm] = await ai_parse_cache.current_generation(keys[norm])
+    
+    if pending:
+        norms = list(pending)
+        llm_texts = [texts[pending[norm][0]] for norm in norms]
+        error = "大模型未返回该条指令的解析结果"
+        try:
+            if len(llm_texts) == 1:
+                results = [await _parse_with_llm(user_id, full_system_prompt, llm_texts[0])]
+            else:
+                results = await _parse_batch_with_llm(user_id, full_system_prompt, llm_texts)
+        except Exception as e:
+            results = [None] * len(norms)
+            error = f"解析语音指令失败: {str(e)}"
+        
+        for norm, result in zip(norms, results):
+            if result is None:
+                for i in pending[norm]:
+                    errors[i] = error
+                continue
+            if use_cache and len(norms) > 1:
+                payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                await ai_parse_cache.set(keys[norm], payload, generations.get(norm))
+            for i in pending[norm]:
+                # 验证时会修改 data，相同指令各自使用一份副本
+                parsed[i] = copy.deepcopy(result)
+    
+    responses = []
+    for result, error in zip(parsed, errors):
+        if error is not None or result is None:
+            responses.append(VoiceCommandResponse(success=False, error=error))
+            continue
+        try:
+            intent = _validate_intent(match_index, _build_intent(result))
+            responses.append(VoiceCommandResponse(success=True, intent=intent))
+        except Exception as e:
+            responses.append(VoiceCommandResponse(success=False, error=f"解析语音指令失败: {str(e)}"))
+    return VoiceCommandBatchResponse(results=responses)
+
+
+# 流式解析时提前发送给前端的字段
+STREAM_PARTIAL_FIELDS = ("action", "corrected_text", "confidence", "message")
+
+
+def _sse_event(event: str, data: Any) -> bytes:
+    """编码一条 SSE 事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+@router.post("/parse-voice-command/stream")
+async def parse_voice_command_stream(
+    request: VoiceCommandRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    解析用户语音指令（SSE 流式返回）
+    
+    事件：
+    - partial：大模型输出中 action、corrected_text 等字段一完整就发送，data 为 {"field": ..., "value": ...}
+    - result：验证、匹配完成后的最终结果，data 与 /parse-voice-command 的响应相同
+    """
+    if not settings.AI_API_KEY:
+        raise HTTPException(
+            status_code=503,
+            detail="AI 服务未配置，请联系管理员设置 AI_API_KEY"
+        )
+    
+    user_id = current_user.id
+    snapshot = await crud_ai_context.get_user_snapshot(db, user_id)
+    full_system_prompt = SYSTEM_PROMPT + snapshot.prompt
+    # 请求依赖中的数据库会话在响应开始发送前就会关闭，匹配索引提前取出
+    match_index = await crud_ai_context.get_user_match_index(db, user_id)
+    
+    async def _events() -> AsyncIterator[bytes]:
+        try:
+            # 本地规则解析或缓存命中时直接发送全部字段
+            parsed = _parse_fast_path(snapshot, request.text)
+            cache_key = parse_cache_key(user_id, full_system_prompt, request.text)
+            if parsed is None and settings.AI_PARSE_CACHE_TTL > 0:
+                cached = await ai_parse_cache.get(cache_key)
+                parsed = json.loads(cached) if cached is not None else None
+            if parsed is not None:
+                for field in STREAM_PARTIAL_FIELDS:
+                    if field in parsed:
+                        yield _sse_event("partial", {"field": field, "value": parsed[field]})
+            else:
+                # 生成前记录缓存代数，写回缓存时使用
+                generation = await ai_parse_cache.current_generation(cache_key)
+                scanner = PartialJSONObjectScanner()
+                content_parts = []
+                async for text in llm_gateway.chat_completion_stream(
+                    user_id, **_chat_request(full_system_prompt, request.text)
+                ):
+                    content_parts.append(text)
+                    for field, value in scanner.feed(text):
+                        if field in STREAM_PARTIAL_FIELDS:
+                            yield _sse_event("partial", {"field": field, "value": value})
+                parsed = _extract_json("".join(content_parts))
+                if settings.AI_PARSE_CACHE_TTL > 0:
+                    payload = json.dumps(parsed, ensure_ascii=False).encode("utf-8")
+                    await ai_parse_cache.set(cache_key, payload, generation)
+            
+            intent = _validate_intent(match_index, _build_intent(parsed))
+            result = VoiceCommandResponse(success=True, intent=intent)
+        except Exception as e:
+            result = VoiceCommandResponse(success=False, error=f"解析语音指令失败: {str(e)}")
+        yield _sse_event("result", result.model_dump(mode="json"))
+    
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        # 禁止 nginx 缓冲，事件生成后立即发送
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _validate_intent(match_index: UserMatchIndex, intent: ParsedIntent) -> ParsedIntent:
+    """根据意图类型进行数据匹配验证"""
+    if intent.action == "add_task":
+        return _validate_task_data(match_index, intent)
+    if intent.action == "exchange_points":
+        return _validate_exchange_data(match_index, intent)
+    return intent
+
+
+def _not_found_warning(message: str, index: NameIndex, name: str) -> str:
+    """未匹配时的提示，附上读音或字形相近的候选名称"""
+    suggestions = index.suggestions(name)
+    if suggestions:
+        message += f"（是否是「{'」「'.join(suggestions)}」？）"
+    return message
+
+
+def _validate_task_data(match_index: UserMatchIndex, intent: ParsedIntent) -> ParsedIntent:
     """验证任务数据并匹配系统中的项目"""
     data = intent.data
     warnings = []
     
-    # 获取所有一级项目
-    level1_projects = await crud_project.get_projects_by_user(db, user_id=user_id, level=1)
-    
-    # 匹配一级项目（使用更严格的匹配策略，避免强行匹配含义相差较远的项目）
+    # 匹配一级项目（精确匹配、长度相近的包含关系或同音，避免强行匹配含义相差较远的项目）
     project_level1_name = data.get("project_level1_name", "")
-    matched_level1 = None
-    
-    if project_level1_name:
-        # 首先尝试精确匹配或高度相似匹配
-        project_lower = project_level1_name.lower().strip()
-        for p in level1_projects:
-            p_name_lower = p.name.lower().strip()
-            # 精确匹配
-            if project_lower == p_name_lower:
-                matched_level1 = p
-                break
-            # 如果用户说的名称包含在项目名称中，且长度相近（避免"国际象棋"匹配到"象棋"这种短词）
-            if len(project_lower) >= 3 and project_lower in p_name_lower:
-                # 检查是否真的是相关项目（避免强行匹配）
-                # 如果项目名称明显更长，可能是包含关系，需要更严格判断
-                if len(p_name_lower) - len(project_lower) <= 5:  # 允许一定的长度差异
-                    matched_level1 = p
-                    break
-            # 如果项目名称包含在用户说的名称中
-            if len(p_name_lower) >= 3 and p_name_lower in project_lower:
-                matched_level1 = p
-                break
+    matched_level1 = match_index.level1.best_match(project_level1_name) if project_level1_name else None
     
     if matched_level1:
         data["project_level1_id"] = matched_level1.id
@@ -309,42 +457,29 @@ async def _validate_task_data(
     else:
         # 如果AI已经解析出项目名称但没有匹配到，保留原始名称，提示用户新增
         if project_level1_name:
-            warnings.append(f"未找到匹配的一级项目「{project_level1_name}」，将提示您新增该项目")
+            warnings.append(_not_found_warning(
+                f"未找到匹配的一级项目「{project_level1_name}」，将提示您新增该项目",
+                match_index.level1,
+                project_level1_name,
+            ))
         data["project_level1_id"] = None
     
-    # 匹配二级项目（使用更严格的匹配策略）
+    # 匹配二级项目（在匹配到的一级项目下查找）
     if matched_level1 and data.get("project_level2_name"):
-        level2_projects = await crud_project.get_projects_by_user(
-            db, user_id=user_id, level=2, parent_id=matched_level1.id
-        )
         project_level2_name = data.get("project_level2_name", "")
-        matched_level2 = None
-        
-        if project_level2_name:
-            project_lower = project_level2_name.lower().strip()
-            for p in level2_projects:
-                p_name_lower = p.name.lower().strip()
-                # 精确匹配
-                if project_lower == p_name_lower:
-                    matched_level2 = p
-                    break
-                # 如果用户说的名称包含在项目名称中，且长度相近
-                if len(project_lower) >= 3 and project_lower in p_name_lower:
-                    if len(p_name_lower) - len(project_lower) <= 5:
-                        matched_level2 = p
-                        break
-                # 如果项目名称包含在用户说的名称中
-                if len(p_name_lower) >= 3 and p_name_lower in project_lower:
-                    matched_level2 = p
-                    break
+        level2_index = match_index.level2(matched_level1.id)
+        matched_level2 = level2_index.best_match(project_level2_name)
         
         if matched_level2:
             data["project_level2_id"] = matched_level2.id
             data["project_level2_name_matched"] = matched_level2.name
         else:
             # 如果AI已经解析出项目名称但没有匹配到，保留原始名称，提示用户新增
-            if project_level2_name:
-                warnings.append(f"未找到匹配的二级项目「{project_level2_name}」，将提示您新增该项目")
+            warnings.append(_not_found_warning(
+                f"未找到匹配的二级项目「{project_level2_name}」，将提示您新增该项目",
+                level2_index,
+                project_level2_name,
+            ))
             data["project_level2_id"] = None
     else:
         data["project_level2_id"] = None
@@ -399,33 +534,18 @@ async def _validate_task_data(
     # 验证惩罚选项（匹配系统中的惩罚选项）
     punishment_option_name = data.get("punishment_option_name", "")
     if punishment_option_name:
-        # 获取所有惩罚选项
-        from app.crud import score as crud_score
-        punishment_options = await crud_score.get_punishment_options(db, user_id=user_id)
-        
-        matched_punishment = None
-        if punishment_options:
-            punishment_lower = punishment_option_name.lower().strip()
-            for option in punishment_options:
-                option_name_lower = option.name.lower().strip()
-                # 精确匹配
-                if punishment_lower == option_name_lower:
-                    matched_punishment = option
-                    break
-                # 模糊匹配（包含关系）
-                if len(punishment_lower) >= 2 and (
-                    punishment_lower in option_name_lower or 
-                    option_name_lower in punishment_lower
-                ):
-                    matched_punishment = option
-                    break
+        matched_punishment = match_index.punishment_options.best_match(punishment_option_name)
         
         if matched_punishment:
             data["punishment_option_id"] = matched_punishment.id
             data["punishment_option_name_matched"] = matched_punishment.name
         else:
             # 如果AI已经解析出惩罚选项名称但没有匹配到，保留原始名称，提示用户新增
-            warnings.append(f"未找到匹配的惩罚选项「{punishment_option_name}」，将提示您新增该选项")
+            warnings.append(_not_found_warning(
+                f"未找到匹配的惩罚选项「{punishment_option_name}」，将提示您新增该选项",
+                match_index.punishment_options,
+                punishment_option_name,
+            ))
             data["punishment_option_id"] = None
     
     intent.data = data
@@ -433,45 +553,32 @@ async def _validate_task_data(
     return intent
 
 
-async def _validate_exchange_data(
-    db: AsyncSession,
-    intent: ParsedIntent,
-    user_id: int
-) -> ParsedIntent:
+def _validate_exchange_data(match_index: UserMatchIndex, intent: ParsedIntent) -> ParsedIntent:
     """验证兑换数据并匹配系统中的奖励选项"""
     data = intent.data
     warnings = []
-    
-    # 获取所有奖励选项
-    reward_options = await crud_score.get_reward_exchange_options(db, user_id=user_id)
+    reward_options = match_index.reward_option_list
     
     reward_name = data.get("reward_name", "")
-    matched_option = None
-    
-    # 尝试匹配
-    for option in reward_options:
-        # 精确匹配名称
-        if reward_name.lower() == option.name.lower():
-            matched_option = option
-            break
-        # 模糊匹配名称
-        if reward_name.lower() in option.name.lower() or option.name.lower() in reward_name.lower():
-            matched_option = option
-            break
-        # 尝试从用户输入中提取数字进行匹配
+    matched_option = match_index.reward_options.best_match(reward_name) if reward_name else None
+    
+    # 名称匹配不到时，尝试从用户输入中提取数字进行匹配（例如“兑换10块”匹配“10元”）
+    if matched_option is None:
         numbers = re.findall(r'\d+', reward_name)
-        if numbers:
-            for num in numbers:
-                if num in option.name:
-                    matched_option = option
-                    break
+        matched_option = next(
+            (option for option in reward_options if any(num in option.name for num in numbers)), None
+        )
     
     if matched_option:
         data["reward_option_id"] = matched_option.id
         data["reward_option_name"] = matched_option.name
         data["cost_points"] = matched_option.cost_points
     else:
-        warnings.append(f"未找到奖励「{reward_name}」的匹配项，请手动选择")
+        warnings.append(_not_found_warning(
+            f"未找到奖励「{reward_name}」的匹配项，请手动选择",
+            match_index.reward_options,
+            reward_name,
+        ))
         data["reward_option_id"] = None
         # 列出可用选项供参考
         if reward_options:
@@ -483,16 +590,55 @@ async def _validate_exchange_data(
     return intent
 
 
-@router.post("/recognize-audio")
+async def _transcribe_audio(user_id: int, upload: UploadedAudio) -> str:
+    """识别上传的音频，较长的录音切分后并发识别各段再拼接"""
+    segments = await split_audio(upload)
+    slots = asyncio.Semaphore(settings.AUDIO_CHUNK_CONCURRENCY)
+    
+    async def _transcribe(filename: str, spool: AudioSpool) -> str:
+        async with slots:
+            return await stt_backend.transcribe(user_id, filename, spool)
+    
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(_transcribe(filename, spool)) for filename, spool in segments]
+    except ExceptionGroup as e:
+        raise e.exceptions[0]
+    finally:
+        for _, spool in segments:
+            if spool is not upload.spool:
+                spool.close()
+    return join_transcripts([task.result() for task in tasks])
+
+
+@router.post(
+    "/recognize-audio",
+    # 请求体在接口内流式解析，这里补充文档中的请求格式
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["audio"],
+                        "properties": {"audio": {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    },
+)
 async def recognize_audio(
-    audio: UploadFile = File(...),
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     识别音频文件并返回解析结果（用于微信浏览器等不支持 Web Speech API 的环境）
     
-    使用 OpenAI Whisper API 进行语音识别，然后解析指令
+    使用 STT_BACKEND 配置的语音识别后端（OpenAI Whisper API 或本地模型）识别，然后解析指令。
+    上传内容边接收边写入缓冲（超过内存上限后写临时文件），过大或过长时提前返回 413/422
     """
     if not settings.AI_API_KEY:
         raise HTTPException(
@@ -500,86 +646,31 @@ async def recognize_audio(
             detail="AI 服务未配置，请联系管理员设置 AI_API_KEY"
         )
     
+    upload = await receive_audio_upload(request, "audio")
     try:
-        # 读取音频文件
-        audio_content = await audio.read()
-        
-        # 使用 OpenAI Whisper API 进行语音识别
-        client = AsyncOpenAI(
-            api_key=settings.AI_API_KEY,
-            base_url=settings.AI_API_BASE_URL,
-        )
-        
-        # 将音频内容转换为文件对象
-        import io
-        audio_file = io.BytesIO(audio_content)
-        audio_file.name = audio.filename or "audio.webm"
-        
-        # 调用 Whisper API 进行语音识别
+        # 语音识别
         try:
-            # 注意：需要 OpenAI API 支持 audio.transcriptions
-            # 如果使用 DeepSeek/Qwen，可能需要使用其他语音识别服务
-            transcription = await client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language="zh"
-            )
-            text = transcription.text
+            # 注意：remote 后端需要 OpenAI API 支持 audio.transcriptions
+            # 如果使用 DeepSeek/Qwen，可以改用 STT_BACKEND=local 在本机识别
+            text = await _transcribe_audio(current_user.id, upload)
+        except HTTPException:
+            raise
         except Exception as e:
-            # 如果不支持 Whisper，提示用户使用文字输入
-            # 未来可以集成百度、讯飞、阿里云等语音识别服务
+            # 如果识别服务不可用，提示用户使用文字输入
+            # 其他识别服务（百度、讯飞、阿里云等）可以实现 TranscriptionBackend 接入
             raise HTTPException(
                 status_code=501,
                 detail=f"当前 AI 服务不支持音频识别: {str(e)}。请使用文字输入功能。"
             )
         
         # 使用识别出的文本调用解析接口
-        user_context = await _build_user_context(db, current_user.id)
-        full_system_prompt = SYSTEM_PROMPT + user_context
-        
-        response = await client.chat.completions.create(
-            model=settings.AI_MODEL,
-            messages=[
-                {"role": "system", "content": full_system_prompt},
-                {"role": "user", "content": text}
-            ],
-            temperature=0.3,
-            max_tokens=500,
-        )
-        
-        content = response.choices[0].message.content
-        
-        # 解析 JSON
-        try:
-            parsed = json.loads(content)
-        except json.JSONDecodeError:
-            json_match = re.search(r'```(?:json)?\s*([\s\S]*?)```', content)
-            if json_match:
-                parsed = json.loads(json_match.group(1))
-            else:
-                json_match = re.search(r'\{[\s\S]*\}', content)
-                if json_match:
-                    parsed = json.loads(json_match.group(0))
-                else:
-                    raise ValueError("无法从响应中提取 JSON")
-        
-        data = parsed.get("data", {})
-        if parsed.get("corrected_text"):
-            data["corrected_text"] = parsed.get("corrected_text")
-        
-        intent = ParsedIntent(
-            action=parsed.get("action", "unknown"),
-            confidence=parsed.get("confidence", 0.5),
-            data=data,
-            message=parsed.get("message"),
-            warnings=[]
-        )
+        snapshot = await crud_ai_context.get_user_snapshot(db, current_user.id)
+        parsed = await _parse_command(current_user.id, snapshot, text)
+        intent = _build_intent(parsed)
         
         # 验证数据
-        if intent.action == "add_task":
-            intent = await _validate_task_data(db, intent, current_user.id)
-        elif intent.action == "exchange_points":
-            intent = await _validate_exchange_data(db, intent, current_user.id)
+        match_index = await crud_ai_context.get_user_match_index(db, current_user.id)
+        intent = _validate_intent(match_index, intent)
         
         return VoiceCommandResponse(
             success=True,
@@ -593,12 +684,14 @@ async def recognize_audio(
             success=False,
             error=f"语音识别失败: {str(e)}"
         )
+    finally:
+        upload.close()
 
 
 @router.get("/available-options")
 async def get_available_options(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     获取用户可用的选项，供语音助手使用
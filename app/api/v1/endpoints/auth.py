@@ -4,9 +4,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_db_user, get_current_active_user
 from app.core.config import get_settings
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.identity_cache import identity_cache
+from app.core.security import create_access_token, get_password_hash_async, verify_password_async
 from app.crud.user import create_user, create_user_without_password, get_user_by_email, get_user_by_id
 from app.crud.user_account import (
     create_user_account,
@@ -18,7 +19,7 @@ from app.db.session import get_db
 from app.models.system import SystemSettings
 from app.models.user import User
 from app.schemas.auth import BindAccountRequest, DingtalkLoginRequest, WechatLoginRequest
-from app.schemas.user import Token, UserCreate, UserRead
+from app.schemas.user import CurrentUser, Token, UserCreate, UserRead
 from app.schemas.user_account import UserAccountRead
 from app.utils.oauth import get_dingtalk_user_info, get_wechat_user_info
 from app.utils.wechat_jssdk import get_wechat_jssdk_config
@@ -51,6 +52,8 @@ async def register(
     try:
         user = await create_user(db, user_in)
         return UserRead.model_validate(user)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -77,7 +80,7 @@ async def login_for_access_token(
             detail="该账号未设置密码，请使用其他方式登录",
         )
     
-    if not verify_password(form_data.password, user.hashed_password):
+    if not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名或密码错误",
@@ -94,7 +97,7 @@ async def login_for_access_token(
 
 
 @router.get("/me", response_model=UserRead)
-async def read_users_me(current_user: User = Depends(get_current_active_user)) -> UserRead:
+async def read_users_me(current_user: User = Depends(get_current_active_db_user)) -> UserRead:
     return UserRead.model_validate(current_user)
 
 
@@ -198,7 +201,7 @@ async def login_with_dingtalk(
 
 @router.get("/accounts", response_model=list[UserAccountRead])
 async def get_my_accounts(
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_db_user),
     db: AsyncSession = Depends(get_db),
 ) -> list[UserAccountRead]:
     """获取当前用户的所有关联账号"""
@@ -230,7 +233,7 @@ async def get_my_accounts(
 @router.post("/accounts/bind", response_model=UserAccountRead)
 async def bind_account(
     request: BindAccountRequest,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_db_user),
     db: AsyncSession = Depends(get_db),
 ) -> UserAccountRead:
     """绑定账号"""
@@ -262,8 +265,10 @@ async def bind_account(
             )
         # 更新用户的email和password
         current_user.email = request.account_id
-        current_user.hashed_password = get_password_hash(request.password)
+        current_user.hashed_password = await get_password_hash_async(request.password)
         await db.commit()
+        # 邮箱变更后，旧的以邮箱为 subject 的 token 不应继续命中缓存
+        identity_cache.invalidate_user(current_user.id)
     
     # 创建账号关联
     from app.schemas.user_account import UserAccountCreate
@@ -299,7 +304,7 @@ async def get_wechat_app_id():
 @router.get("/wechat/user-info")
 async def get_wechat_user_info_endpoint(
     code: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """通过微信授权码获取用户信息（用于账号绑定）"""
     try:
@@ -1,7 +1,7 @@
 """
 枚举值 API - 返回所有固定的下拉选项，保持前后端一致
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from pydantic import BaseModel
 from typing import List
 
@@ -15,6 +15,7 @@ from app.core.enums import (
     get_enum_label,
     get_enum_values,
 )
+from app.utils.etag import StaticJSONResponse
 
 router = APIRouter()
 
@@ -36,12 +37,8 @@ class EnumsResponse(BaseModel):
     project_level: List[EnumOption]  # 项目层级
 
 
-@router.get("/enums", response_model=EnumsResponse)
-async def get_enums():
-    """
-    获取所有枚举值
-    所有固定的下拉选项都从这里获取，保持前后端一致
-    """
+def build_enums() -> EnumsResponse:
+    """构建枚举值响应"""
     return EnumsResponse(
         task_status=[
             EnumOption(
@@ -94,3 +91,15 @@ async def get_enums():
         ],
     )
 
+
+# 枚举值在进程生命周期内不变，启动时序列化一次
+ENUMS_RESPONSE = StaticJSONResponse(build_enums().model_dump_json().encode("utf-8"))
+
+
+@router.get("/enums", response_model=EnumsResponse)
+async def get_enums(request: Request):
+    """
+    获取所有枚举值
+    所有固定的下拉选项都从这里获取，保持前后端一致
+    """
+    return ENUMS_RESPONSE.respond(request)
@@ -6,7 +6,17 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.core.cache import get_cache_stats
+from app.core.identity_cache import identity_cache
+from app.core.jobs import job_runner
+from app.core.jwt_verifier import token_verifier
+from app.core.llm_gateway import llm_gateway
+from app.core.oauth_client import oauth_client
+from app.core.security import password_hash_service
+from app.core.stt import stt_backend
+from app.db.session import get_db, get_pool_stats
+from app.utils.audio import audio_memory_budget
+from app.utils.fast_intent import fast_intent
 
 router = APIRouter()
 
@@ -33,6 +43,15 @@ async def health_check_db(db: AsyncSession = Depends(get_db)):
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
 
 
+@router.get("/health/db/pool")
+async def health_check_db_pool():
+    """
+    数据库连接池状态
+    返回当前 worker 进程的已签出/溢出连接数和获取连接的等待时间
+    """
+    return get_pool_stats()
+
+
 @router.get("/health/ready")
 async def readiness_check(db: AsyncSession = Depends(get_db)):
     """
@@ -45,3 +64,51 @@ async def readiness_check(db: AsyncSession = Depends(get_db)):
     except Exception:
         return {"status": "not_ready"}
 
+
+
+@router.get("/health/cache")
+async def cache_stats():
+    """
+    缓存统计
+    返回各响应缓存、已校验 token 缓存和已认证用户缓存的命中/未命中次数（当前 worker 进程）
+    """
+    return {
+        "caches": get_cache_stats(),
+        "auth_tokens": token_verifier.stats(),
+        "auth_users": identity_cache.stats(),
+    }
+
+
+@router.get("/health/password-hash")
+async def password_hash_stats():
+    """
+    密码哈希线程池统计
+    返回排队等待时间和 bcrypt 计算时间（当前 worker 进程）
+    """
+    return password_hash_service.stats()
+
+
+@router.get("/health/ai")
+async def ai_gateway_stats():
+    """
+    大模型调用统计
+    返回并发、重试、超时次数、调用延迟分布、本地规则解析的命中率、音频上传占用的内存和语音识别后端状态（当前 worker 进程）
+    """
+    return {
+        **llm_gateway.stats(),
+        "fast_path": fast_intent.stats(),
+        "audio_memory": audio_memory_budget.stats(),
+        "stt": stt_backend.stats(),
+    }
+
+
+@router.get("/health/oauth")
+async def oauth_client_stats():
+    """第三方登录接口统计：每个平台的调用次数、失败次数、熔断状态和延迟分布（当前 worker 进程）"""
+    return oauth_client.stats()
+
+
+@router.get("/health/jobs")
+async def job_runner_stats(db: AsyncSession = Depends(get_db)):
+    """后台任务统计：各状态的任务数（全部进程）和当前 worker 进程的执行次数、失败次数"""
+    return {**job_runner.stats(), "jobs": await job_runner.status_counts(db)}
@@ -3,11 +3,11 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_read_db
 from app.crud import project as crud
 from app.db.session import get_db
-from app.models.user import User
 from app.schemas.project import ProjectCreate, ProjectRead, ProjectUpdate
+from app.schemas.user import CurrentUser
 
 router = APIRouter()
 
@@ -16,8 +16,8 @@ router = APIRouter()
 async def get_projects(
     level: Annotated[int | None, Query(description="层级：1=一级，2=二级")] = None,
     parent_id: Annotated[int | None, Query(description="父项目ID")] = None,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """获取项目列表"""
     projects = await crud.get_projects_by_user(db, current_user.id, level=level, parent_id=parent_id)
@@ -45,7 +45,7 @@ async def get_projects(
 async def create_project(
     project: ProjectCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """创建项目"""
     # 验证层级和父项目
@@ -70,7 +70,7 @@ async def update_project(
     project_id: int,
     project_update: ProjectUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """更新项目"""
     project = await crud.update_project(db, project_id, project_update, current_user.id)
@@ -83,7 +83,7 @@ async def update_project(
 async def delete_project(
     project_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """删除项目"""
     success = await crud.delete_project(db, project_id, current_user.id)
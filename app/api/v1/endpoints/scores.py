@@ -1,12 +1,11 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_read_db
 from app.crud import score as crud
 from app.db.session import get_db
-from app.models.user import User
 from app.schemas.score import (
     PunishmentOptionCreate,
     PunishmentOptionRead,
@@ -19,15 +18,20 @@ from app.schemas.score import (
     ScoreIncreaseRead,
     ScoreSummary,
 )
+from app.schemas.user import CurrentUser
+from app.utils.pagination import ndjson_response, parse_cursor, trim_page
 
 router = APIRouter()
 
+# 积分记录默认每页数量
+DEFAULT_PAGE_SIZE = 100
+
 
 @router.get("/summary", response_model=ScoreSummary)
 async def get_score_summary(
     student_id: Annotated[int, Query(description="学生ID")],
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """获取积分汇总"""
     # 验证学生属于当前用户
@@ -43,63 +47,54 @@ async def get_score_summary(
 
 @router.get("/increases", response_model=list[ScoreIncreaseRead])
 async def get_score_increases(
+    response: Response,
     student_id: Annotated[int, Query(description="学生ID")],
-    limit: Annotated[int, Query(description="限制数量", ge=1, le=100)] = 100,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    limit: Annotated[int | None, Query(description="每页数量（json 默认 100；ndjson 不传则返回全部）", ge=1, le=100)] = None,
+    cursor: Annotated[str | None, Query(description="分页游标（上一页响应头 X-Next-Cursor 的值）")] = None,
+    format: Annotated[Literal["json", "ndjson"], Query(description="响应格式：json 或 ndjson（流式）")] = "json",
+    include_archived: Annotated[bool, Query(description="是否包含已归档的较早记录（全部历史）；只看近期记录时传 false，只查询热表")] = True,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
-    """获取积分增加记录"""
+    """获取积分增加记录（按时间倒序，响应头 X-Next-Cursor 存在时表示还有下一页）"""
     # 验证学生属于当前用户
     from app.crud import student as student_crud
-    from app.crud import project as project_crud
-    from app.crud import task as task_crud
 
     student = await student_crud.get_student_by_id(db, student_id, current_user.id)
     if not student:
         raise HTTPException(status_code=404, detail="学生不存在")
 
-    increases = await crud.get_score_increases(db, student_id, limit=limit)
-    
-    # 获取项目名称和评分等级
-    result = []
-    project_cache = {}  # 缓存项目，避免重复查询
-    task_cache = {}  # 缓存任务，避免重复查询
-    
-    for increase in increases:
-        increase_dict = ScoreIncreaseRead.model_validate(increase).model_dump()
-        
-        # 获取一级项目名称
-        if increase.project_level1_id not in project_cache:
-            project1 = await project_crud.get_project_by_id(db, increase.project_level1_id, current_user.id)
-            project_cache[increase.project_level1_id] = project1.name if project1 else None
-        increase_dict["project_level1_name"] = project_cache[increase.project_level1_id]
-        
-        # 获取二级项目名称
-        if increase.project_level2_id:
-            if increase.project_level2_id not in project_cache:
-                project2 = await project_crud.get_project_by_id(db, increase.project_level2_id, current_user.id)
-                project_cache[increase.project_level2_id] = project2.name if project2 else None
-            increase_dict["project_level2_name"] = project_cache[increase.project_level2_id]
-        
-        # 获取任务的评分等级
-        if increase.task_id not in task_cache:
-            task = await task_crud.get_task_by_id(db, increase.task_id, student_id)
-            task_cache[increase.task_id] = task.rating if task else None
-        increase_dict["rating"] = task_cache[increase.task_id]
-        
-        result.append(ScoreIncreaseRead(**increase_dict))
-    
-    return result
+    before = parse_cursor(cursor)
+    if format == "ndjson":
+        return ndjson_response(
+            lambda session: crud.stream_score_increases(
+                session, student_id, before=before, limit=limit, include_archived=include_archived
+            ),
+            ScoreIncreaseRead,
+            bind=db.bind,
+        )
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    # 多取一条用于判断是否还有下一页
+    increases = await crud.get_score_increases_with_details(
+        db, student_id, limit=limit + 1, before=before, include_archived=include_archived
+    )
+    increases = trim_page(increases, limit, response)
+    return [ScoreIncreaseRead.model_validate(increase) for increase in increases]
 
 
 @router.get("/exchanges", response_model=list[ScoreExchangeRead])
 async def get_score_exchanges(
+    response: Response,
     student_id: Annotated[int, Query(description="学生ID")],
-    limit: Annotated[int, Query(description="限制数量", ge=1, le=100)] = 100,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    limit: Annotated[int | None, Query(description="每页数量（json 默认 100；ndjson 不传则返回全部）", ge=1, le=100)] = None,
+    cursor: Annotated[str | None, Query(description="分页游标（上一页响应头 X-Next-Cursor 的值）")] = None,
+    format: Annotated[Literal["json", "ndjson"], Query(description="响应格式：json 或 ndjson（流式）")] = "json",
+    include_archived: Annotated[bool, Query(description="是否包含已归档的较早记录（全部历史）；只看近期记录时传 false，只查询热表")] = True,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
-    """获取积分兑换记录"""
+    """获取积分兑换记录（按时间倒序，响应头 X-Next-Cursor 存在时表示还有下一页）"""
     # 验证学生属于当前用户
     from app.crud import student as student_crud
 
@@ -107,33 +102,30 @@ async def get_score_exchanges(
     if not student:
         raise HTTPException(status_code=404, detail="学生不存在")
 
-    exchanges = await crud.get_score_exchanges(db, student_id, limit=limit)
-    
-    # 获取奖励名称
-    result = []
-    reward_cache = {}  # 缓存奖励选项，避免重复查询
-    
-    for exchange in exchanges:
-        exchange_dict = ScoreExchangeRead.model_validate(exchange).model_dump()
-        
-        # 从缓存或数据库获取奖励名称
-        if exchange.reward_option_id not in reward_cache:
-            reward_option = await crud.get_reward_exchange_option_by_id(
-                db, exchange.reward_option_id, current_user.id
-            )
-            reward_cache[exchange.reward_option_id] = reward_option.name if reward_option else None
-        exchange_dict["reward_name"] = reward_cache[exchange.reward_option_id]
-        
-        result.append(ScoreExchangeRead(**exchange_dict))
-    
-    return result
+    before = parse_cursor(cursor)
+    if format == "ndjson":
+        return ndjson_response(
+            lambda session: crud.stream_score_exchanges(
+                session, student_id, before=before, limit=limit, include_archived=include_archived
+            ),
+            ScoreExchangeRead,
+            bind=db.bind,
+        )
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    # 多取一条用于判断是否还有下一页
+    exchanges = await crud.get_score_exchanges_with_details(
+        db, student_id, limit=limit + 1, before=before, include_archived=include_archived
+    )
+    exchanges = trim_page(exchanges, limit, response)
+    return [ScoreExchangeRead.model_validate(exchange) for exchange in exchanges]
 
 
 @router.post("/exchanges", response_model=ScoreExchangeRead, status_code=201)
 async def create_score_exchange(
     exchange: ScoreExchangeCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """创建积分兑换记录"""
     # 验证学生属于当前用户
@@ -157,8 +149,8 @@ async def create_score_exchange(
 # 奖励选项管理
 @router.get("/reward-options", response_model=list[RewardExchangeOptionRead])
 async def get_reward_exchange_options(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """获取奖励选项列表"""
     options = await crud.get_reward_exchange_options(db, current_user.id)
@@ -169,7 +161,7 @@ async def get_reward_exchange_options(
 async def create_reward_exchange_option(
     option: RewardExchangeOptionCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """创建奖励选项"""
     return await crud.create_reward_exchange_option(db, option, current_user.id)
@@ -180,7 +172,7 @@ async def update_reward_exchange_option(
     option_id: int,
     option_update: RewardExchangeOptionUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """更新奖励选项"""
     option = await crud.update_reward_exchange_option(db, option_id, option_update, current_user.id)
@@ -193,7 +185,7 @@ async def update_reward_exchange_option(
 async def delete_reward_exchange_option(
     option_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """删除奖励选项"""
     success = await crud.delete_reward_exchange_option(db, option_id, current_user.id)
@@ -204,8 +196,8 @@ async def delete_reward_exchange_option(
 # 惩罚选项管理
 @router.get("/punishment-options", response_model=list[PunishmentOptionRead])
 async def get_punishment_options(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """获取惩罚选项列表"""
     options = await crud.get_punishment_options(db, current_user.id)
@@ -216,7 +208,7 @@ async def get_punishment_options(
 async def create_punishment_option(
     option: PunishmentOptionCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """创建惩罚选项"""
     # 如果生成关联任务，验证项目
@@ -238,7 +230,7 @@ async def update_punishment_option(
     option_id: int,
     option_update: PunishmentOptionUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """更新惩罚选项"""
     option_data = option_update.model_dump(exclude_unset=True)
@@ -252,7 +244,7 @@ async def update_punishment_option(
 async def delete_punishment_option(
     option_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """删除惩罚选项"""
     success = await crud.delete_punishment_option(db, option_id, current_user.id)
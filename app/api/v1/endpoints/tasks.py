@@ -1,28 +1,33 @@
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_read_db
 from app.crud import task as crud
 from app.db.session import get_db
-from app.models.user import User
 from app.schemas.task import TaskCreate, TaskRead, TaskUpdate
+from app.schemas.user import CurrentUser
+from app.utils.pagination import ndjson_response, parse_cursor, trim_page
 
 router = APIRouter()
 
 
 @router.get("/", response_model=list[TaskRead])
 async def get_tasks(
+    response: Response,
     student_id: Annotated[int, Query(description="学生ID")],
     project_level1_id: Annotated[int | None, Query(description="一级项目ID")] = None,
     project_level2_id: Annotated[int | None, Query(description="二级项目ID")] = None,
     status: Annotated[list[str] | None, Query(description="状态（支持多选）")] = None,
     include_all_status: Annotated[bool, Query(description="是否包含所有状态", example=False)] = False,
     completed_after: Annotated[datetime | None, Query(description="完成时间（在此时间之后完成的任务）")] = None,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    limit: Annotated[int | None, Query(description="每页数量（不传则返回全部）", ge=1, le=500)] = None,
+    cursor: Annotated[str | None, Query(description="分页游标（上一页响应头 X-Next-Cursor 的值）")] = None,
+    format: Annotated[Literal["json", "ndjson"], Query(description="响应格式：json 或 ndjson（流式）")] = "json",
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """获取任务列表（默认只返回未开始和进行中的）"""
     # 验证学生属于当前用户
@@ -32,15 +37,26 @@ async def get_tasks(
     if not student:
         raise HTTPException(status_code=404, detail="学生不存在")
 
-    tasks = await crud.get_tasks(
-        db,
-        student_id,
+    filters = dict(
         project_level1_id=project_level1_id,
         project_level2_id=project_level2_id,
         status=status,
         include_all_status=include_all_status,
         completed_after=completed_after,
+        before=parse_cursor(cursor),
     )
+
+    if format == "ndjson":
+        return ndjson_response(
+            lambda session: crud.stream_tasks(session, student_id, limit=limit, **filters),
+            TaskRead,
+            bind=db.bind,
+        )
+
+    # 多取一条用于判断是否还有下一页
+    tasks = await crud.get_tasks(db, student_id, limit=limit + 1 if limit else None, **filters)
+    if limit:
+        tasks = trim_page(tasks, limit, response)
     return tasks
 
 
@@ -48,7 +64,7 @@ async def get_tasks(
 async def create_task(
     task: TaskCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """创建任务"""
     # 验证学生属于当前用户
@@ -91,7 +107,7 @@ async def update_task(
     task_update: TaskUpdate,
     student_id: Annotated[int, Query(description="学生ID")],
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ):
     """更新任务（只有未开始和进行中的可以修改）"""
     # 验证学生属于当前用户
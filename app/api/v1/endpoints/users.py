@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_current_admin
 from app.db.session import get_db
 from app.models.user import User
-from app.schemas.user import UserRead
+from app.schemas.user import CurrentUser, UserRead
 
 router = APIRouter()
 
@@ -15,7 +15,7 @@ router = APIRouter()
 @router.get("/", response_model=List[UserRead])
 async def list_users(
     db: AsyncSession = Depends(get_db),
-    _: User = Depends(get_current_admin),
+    _: CurrentUser = Depends(get_current_admin),
 ) -> list[UserRead]:
     stmt: Select[tuple[User]] = select(User).order_by(User.created_at.desc())
     result = await db.execute(stmt)
@@ -0,0 +1,46 @@
+"""
+语音指令解析结果缓存
+
+家长每天会重复说相同的指令，相同的文本在相同的用户上下文下大模型的解析结果基本一致，
+所以按“规范化后的文本 + 用户上下文哈希”缓存大模型返回的解析结果，命中时不再调用大模型。
+
+用户上下文包含项目、惩罚选项和兑换选项，这些数据变化后上下文哈希随之变化，
+旧的缓存条目不会再被命中（之后由 TTL / LRU 淘汰），不需要在写操作中手动失效。
+"""
+import hashlib
+import re
+import unicodedata
+
+from app.core.cache import ResponseCache, create_cache_backend, register_cache
+from app.core.config import get_settings
+
+settings = get_settings()
+
+ai_parse_cache = register_cache(
+    ResponseCache(
+        "ai-parse",
+        create_cache_backend(max_entries=settings.AI_PARSE_CACHE_MAX_ENTRIES),
+        ttl=settings.AI_PARSE_CACHE_TTL,
+    )
+)
+
+# 规范化时去掉的标点（不包含 *，A* 是评分等级）
+_PUNCTUATION_RE = re.compile(r"[\s,，.。!！?？、;；:：\"'“”‘’~～…]+")
+
+
+def normalize_command_text(text: str) -> str:
+    """规范化语音指令文本：全角转半角、统一小写、去掉空白和标点"""
+    text = unicodedata.normalize("NFKC", text)
+    return _PUNCTUATION_RE.sub("", text).lower()
+
+
+def context_fingerprint(system_prompt: str) -> str:
+    """系统提示词（基础提示词 + 用户上下文）和模型的哈希"""
+    raw = f"{settings.AI_MODEL}\n{system_prompt}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def parse_cache_key(user_id: int, system_prompt: str, text: str) -> str:
+    """解析结果缓存的 key"""
+    text_hash = hashlib.sha256(normalize_command_text(text).encode("utf-8")).hexdigest()[:32]
+    return f"{user_id}:{context_fingerprint(system_prompt)}:{text_hash}"
@@ -0,0 +1,223 @@
+"""
+响应缓存
+
+提供可插拔的缓存后端：
+- MemoryCacheBackend：进程内 LRU + TTL（多 worker 部署时各进程独立，失效只作用于当前进程）
+- RedisCacheBackend：Redis 兼容后端，多个 worker 共享（任何实现了 get/set/delete/incr 的异步客户端都可以替代）
+- NullCacheBackend：不缓存，不能容忍跨进程失效延迟的缓存（例如首页积分余额）在没有共享后端时使用
+
+ResponseCache 在后端之上按 key 维护一个“代数”（generation），写操作调用 invalidate 时代数加一，
+读到的缓存值如果不是当前代数生成的就视为未命中，避免并发读写时把旧数据写回缓存。
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Protocol
+
+from app.core.config import get_settings
+
+
+class CacheBackend(Protocol):
+    """缓存后端接口"""
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+    async def incr(self, key: str) -> int: ...
+
+
+class MemoryCacheBackend:
+    """进程内 LRU 缓存，支持 TTL"""
+
+    def __init__(self, max_entries: int = 1000, default_ttl: Optional[int] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: OrderedDict[str, tuple[Any, Optional[float]]] = OrderedDict()
+
+    def _get_entry(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _set_entry(self, key: str, value: Any, ttl: Optional[int]) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._get_entry(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self._set_entry(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        value = int(self._get_entry(key) or 0) + 1
+        # 代数计数器不过期，只会被 LRU 淘汰（淘汰后从 0 重新计数，旧缓存值也已淘汰或过期）
+        self._set_entry(key, value, 0)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    """Redis 兼容缓存后端（例如 redis.asyncio.Redis）"""
+
+    def __init__(self, client: Any, prefix: str = "little-score:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        await self.client.set(self.prefix + key, value, ex=ttl or None)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+    async def incr(self, key: str) -> int:
+        return int(await self.client.incr(self.prefix + key))
+
+
+class NullCacheBackend:
+    """不缓存任何内容：读取总是未命中，写入和失效都不做任何事"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def incr(self, key: str) -> int:
+        return 0
+
+
+def create_cache_backend(max_entries: int = 1000, shared_only: bool = False) -> CacheBackend:
+    """
+    根据配置创建缓存后端（CACHE_BACKEND=memory / redis）
+    shared_only：只使用多个 worker 共享的后端；CACHE_BACKEND=memory 时返回 NullCacheBackend（不缓存），
+    用于写操作后必须立即失效、不能依赖 TTL 的缓存（进程内缓存的失效只作用于当前 worker）
+    """
+    settings = get_settings()
+    if settings.CACHE_BACKEND == "redis":
+        if not settings.CACHE_REDIS_URL:
+            raise RuntimeError("CACHE_BACKEND=redis 时必须配置 CACHE_REDIS_URL")
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:  # pragma: no cover - 取决于部署环境
+            raise RuntimeError("使用 Redis 缓存需要安装 redis 包：pip install redis") from e
+        return RedisCacheBackend(redis_asyncio.from_url(settings.CACHE_REDIS_URL))
+    if shared_only:
+        return NullCacheBackend()
+    return MemoryCacheBackend(max_entries=max_entries)
+
+
+class ResponseCache:
+    """
+    带命中统计和写后失效的响应缓存
+    缓存值为预先序列化好的 bytes，命中时可以直接作为响应体返回
+    """
+
+    def __init__(self, namespace: str, backend: CacheBackend, ttl: Optional[int] = None):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _value_key(self, key: Any) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _generation_key(self, key: Any) -> str:
+        return f"{self.namespace}:gen:{key}"
+
+    async def current_generation(self, key: Any) -> bytes:
+        """当前代数（生成内容之前读取，写入时传给 set）"""
+        generation = await self.backend.get(self._generation_key(key))
+        if generation is None:
+            return b"0"
+        return str(generation).encode() if isinstance(generation, int) else generation
+
+    async def _lookup(self, key: Any) -> tuple[bytes, Optional[bytes]]:
+        """返回当前代数和缓存内容（未命中或不是当前代数生成的为 None）"""
+        generation = await self.current_generation(key)
+        cached = await self.backend.get(self._value_key(key))
+        if cached is not None:
+            cached_generation, _, payload = cached.partition(b"\n")
+            if cached_generation == generation:
+                self.hits += 1
+                return generation, payload
+        self.misses += 1
+        return generation, None
+
+    async def get(self, key: Any) -> Optional[bytes]:
+        """读取缓存，未命中返回 None"""
+        _, payload = await self._lookup(key)
+        return payload
+
+    async def set(self, key: Any, payload: bytes, generation: Optional[bytes] = None) -> None:
+        """
+        写入缓存
+        generation 应为生成 payload 之前读取到的代数，生成期间发生失效时写入的值不会被命中
+        """
+        if generation is None:
+            generation = await self.current_generation(key)
+        await self.backend.set(self._value_key(key), generation + b"\n" + payload, self.ttl)
+
+    async def get_or_build(self, key: Any, builder: Callable[[], Awaitable[bytes]]) -> bytes:
+        """命中则返回缓存内容，否则调用 builder 生成并写入缓存"""
+        generation, payload = await self._lookup(key)
+        if payload is not None:
+            return payload
+        payload = await builder()
+        await self.set(key, payload, generation)
+        return payload
+
+    async def invalidate(self, key: Any) -> None:
+        """使缓存失效（在写操作提交之后调用）"""
+        self.invalidations += 1
+        await self.backend.incr(self._generation_key(key))
+        await self.backend.delete(self._value_key(key))
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# 已注册的缓存，用于健康检查接口输出统计信息
+_registry: dict[str, ResponseCache] = {}
+
+
+def register_cache(cache: ResponseCache) -> ResponseCache:
+    _registry[cache.namespace] = cache
+    return cache
+
+
+def get_cache_stats() -> dict[str, dict[str, Any]]:
+    """获取所有已注册缓存的命中统计"""
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,58 @@
+"""
+已认证用户缓存
+
+token subject（user_id:123 或 email）-> CurrentUser 快照，带 TTL 和容量上限。
+缓存是进程内的，多 worker 部署时其他进程的缓存依赖 TTL 过期，所以 TTL 应保持较短。
+
+invalidate_user 只作用于当前 worker。目前没有禁用用户、设置管理员的接口，
+直接修改数据库中的 is_active / is_admin 后，各 worker 最多在 AUTH_USER_CACHE_TTL 秒后生效；
+以后增加这类接口时，应在写操作提交后调用 invalidate_user（其他 worker 仍依赖 TTL）。
+"""
+import time
+from collections import OrderedDict
+
+from app.core.config import get_settings
+from app.schemas.user import CurrentUser
+
+
+class IdentityCache:
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[CurrentUser, float]] = OrderedDict()
+
+    def get(self, sub: str) -> CurrentUser | None:
+        entry = self._data.get(sub)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._data[sub]
+            self.misses += 1
+            return None
+        self._data.move_to_end(sub)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, sub: str, user: CurrentUser) -> None:
+        if self.ttl <= 0:
+            return
+        self._data[sub] = (user, time.monotonic() + self.ttl)
+        self._data.move_to_end(sub)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """用户被禁用或信息变更时调用，移除该用户的所有缓存（包括以邮箱为 subject 的旧 token）"""
+        for sub in [sub for sub, (user, _) in self._data.items() if user.id == user_id]:
+            del self._data[sub]
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+_settings = get_settings()
+identity_cache = IdentityCache(
+    max_entries=_settings.AUTH_USER_CACHE_MAX_ENTRIES,
+    ttl=_settings.AUTH_USER_CACHE_TTL,
+)
@@ -0,0 +1,276 @@
+"""
+后台任务执行器
+
+耗时的数据维护操作（例如学生删除后分批标记相关记录）不在请求事务中执行：
+- 请求在自己的事务中写入 background_jobs 记录（与触发它的修改一起 commit），提交后立即返回
+- 每个 worker 进程运行一个 JobRunner，轮询待执行的任务；通过条件 UPDATE 抢占任务并持有租约，
+  同一任务同时只在一个进程中执行，进程异常退出后租约过期，其他进程会接手
+- 处理函数分批执行，每批一个短事务，进度与该批修改在同一事务中保存，重试时从记录的进度继续
+- 失败后按指数退避重试，超过最大次数标记为 failed；dedupe_key 保证同一操作只创建一个任务
+"""
+import asyncio
+import json
+import os
+import socket
+import traceback
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.db.session import async_session_maker
+from app.models.job import BackgroundJob, JobStatus
+from app.utils.time import utcnow
+
+# 失败重试的最长退避时间（秒）
+MAX_RETRY_DELAY = 600
+
+
+class JobLeaseLost(Exception):
+    """租约已过期并被其他进程接手，当前进程停止执行该任务"""
+
+
+class JobContext:
+    """传给任务处理函数：任务参数、已保存的进度和数据库会话工厂"""
+
+    def __init__(self, runner: "JobRunner", job: BackgroundJob):
+        self.runner = runner
+        self.job_id = job.id
+        self.payload: dict[str, Any] = json.loads(job.payload or "{}")
+        self.progress: dict[str, Any] = json.loads(job.progress or "{}")
+        self.session_maker = runner.session_maker
+
+    async def save_progress(self, db: AsyncSession, key: str, value: Any) -> None:
+        """
+        在处理函数的事务中保存进度并续租（随该批修改一起 commit）
+        租约已被其他进程接手时抛出 JobLeaseLost，调用方的事务不会提交
+        """
+        progress = {**self.progress, key: value}
+        result = await db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == self.job_id, BackgroundJob.locked_by == self.runner.worker_id)
+            .values(
+                progress=json.dumps(progress, ensure_ascii=False),
+                locked_until=utcnow() + timedelta(seconds=self.runner.lease_seconds),
+            )
+        )
+        if result.rowcount != 1:
+            raise JobLeaseLost()
+        self.progress = progress
+
+
+JobHandler = Callable[[JobContext], Awaitable[None]]
+
+
+class JobRunner:
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        poll_interval: float = 2.0,
+        lease_seconds: int = 60,
+        max_attempts: int = 5,
+        retry_base: float = 5.0,
+        enabled: bool = True,
+    ):
+        self.session_maker = session_maker
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.enabled = enabled
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"[:64]
+
+        self._handlers: dict[str, JobHandler] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.lease_lost = 0
+
+    @classmethod
+    def from_settings(cls) -> "JobRunner":
+        settings = get_settings()
+        return cls(
+            async_session_maker,
+            poll_interval=settings.JOB_POLL_INTERVAL,
+            lease_seconds=settings.JOB_LEASE_SECONDS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            retry_base=settings.JOB_RETRY_BASE_SECONDS,
+            enabled=settings.JOB_RUNNER_ENABLED,
+        )
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """注册任务处理函数（模块导入时调用）"""
+        self._handlers[kind] = handler
+
+    async def enqueue(
+        self, db: AsyncSession, kind: str, dedupe_key: str, payload: dict[str, Any]
+    ) -> BackgroundJob:
+        """
+        在调用方的事务中创建任务（由调用方 commit，commit 后调用 notify 让当前进程立即执行）
+        同一 dedupe_key 的任务已存在时返回已有的任务
+        """
+        existing = await self._get_by_dedupe_key(db, dedupe_key)
+        if existing is not None:
+            return existing
+        job = BackgroundJob(
+            kind=kind,
+            dedupe_key=dedupe_key,
+            payload=json.dumps(payload, ensure_ascii=False),
+            progress="{}",
+            status=JobStatus.PENDING,
+            run_after=utcnow(),
+        )
+        try:
+            async with db.begin_nested():
+                db.add(job)
+        except IntegrityError:
+            # 并发请求已创建了同一个任务
+            return await self._get_by_dedupe_key(db, dedupe_key)  # type: ignore[return-value]
+        return job
+
+    @staticmethod
+    async def _get_by_dedupe_key(db: AsyncSession, dedupe_key: str) -> Optional[BackgroundJob]:
+        result = await db.execute(select(BackgroundJob).where(BackgroundJob.dedupe_key == dedupe_key))
+        return result.scalar_one_or_none()
+
+    def notify(self) -> None:
+        """有新任务时唤醒当前进程的执行循环（其他进程在下次轮询时发现）"""
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        """启动执行循环（应用启动时调用）"""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        """停止执行循环（应用退出时调用），正在执行的任务中断后租约过期，由其他进程或下次启动继续"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                ran = await self.run_once()
+            except Exception:
+                print("⚠️ 后台任务执行循环出错")
+                traceback.print_exc()
+                ran = False
+            if ran:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_once(self) -> bool:
+        """抢占并执行一个到期的任务，没有待执行的任务时返回 False"""
+        job = await self._claim()
+        if job is None:
+            return False
+        await self._execute(job)
+        return True
+
+    def _claimable(self, now):
+        return or_(
+            and_(BackgroundJob.status == JobStatus.PENDING, BackgroundJob.run_after <= now),
+            # 执行中但租约已过期（持有的进程异常退出）
+            and_(BackgroundJob.status == JobStatus.RUNNING, BackgroundJob.locked_until < now),
+        )
+
+    async def _claim(self) -> Optional[BackgroundJob]:
+        if not self._handlers:
+            return None
+        now = utcnow()
+        async with self.session_maker() as db:
+            candidates = await db.execute(
+                select(BackgroundJob.id)
+                .where(BackgroundJob.kind.in_(list(self._handlers)), self._claimable(now))
+                .order_by(BackgroundJob.run_after)
+                .limit(5)
+            )
+            for job_id in candidates.scalars().all():
+                # 条件 UPDATE 抢占：多个进程同时抢同一个任务时只有一个能更新成功
+                result = await db.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id == job_id, self._claimable(now))
+                    .values(
+                        status=JobStatus.RUNNING,
+                        locked_by=self.worker_id,
+                        locked_until=now + timedelta(seconds=self.lease_seconds),
+                        attempts=BackgroundJob.attempts + 1,
+                    )
+                )
+                await db.commit()
+                if result.rowcount == 1:
+                    return await db.get(BackgroundJob, job_id)
+        return None
+
+    async def _execute(self, job: BackgroundJob) -> None:
+        context = JobContext(self, job)
+        try:
+            await self._handlers[job.kind](context)
+        except JobLeaseLost:
+            self.lease_lost += 1
+            return
+        except Exception as e:
+            await self._record_failure(job, e)
+            return
+        await self._finish(job.id, {"status": JobStatus.COMPLETED, "last_error": None})
+        self.completed += 1
+
+    async def _record_failure(self, job: BackgroundJob, error: Exception) -> None:
+        message = f"{type(error).__name__}: {error}"[:2000]
+        print(f"⚠️ 后台任务 {job.kind}#{job.id} 第 {job.attempts} 次执行失败: {message}")
+        if job.attempts >= self.max_attempts:
+            self.failed += 1
+            await self._finish(job.id, {"status": JobStatus.FAILED, "last_error": message})
+            return
+        self.retried += 1
+        delay = min(self.retry_base * 2 ** (job.attempts - 1), MAX_RETRY_DELAY)
+        await self._release(
+            job.id,
+            {"status": JobStatus.PENDING, "last_error": message, "run_after": utcnow() + timedelta(seconds=delay)},
+        )
+
+    async def _finish(self, job_id: int, values: dict[str, Any]) -> None:
+        await self._release(job_id, {**values, "finished_at": utcnow()})
+
+    async def _release(self, job_id: int, values: dict[str, Any]) -> None:
+        async with self.session_maker() as db:
+            await db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == job_id, BackgroundJob.locked_by == self.worker_id)
+                .values(**values, locked_by=None, locked_until=None)
+            )
+            await db.commit()
+
+    async def status_counts(self, db: AsyncSession) -> dict[str, int]:
+        result = await db.execute(
+            select(BackgroundJob.status, func.count(BackgroundJob.id)).group_by(BackgroundJob.status)
+        )
+        return {status: count for status, count in result.all()}
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "worker_id": self.worker_id,
+            "handlers": sorted(self._handlers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "lease_lost": self.lease_lost,
+        }
+
+
+job_runner = JobRunner.from_settings()
@@ -0,0 +1,148 @@
+"""
+访问令牌（JWT）校验
+
+同一个 token 在有效期内会被反复使用，每次请求都重新校验签名、解析 subject 是重复计算：
+- 校验通过的 token 按摘要缓存解析结果（subject、user_id、过期时间），命中时跳过签名校验，到期后自动失效
+- 缓存是进程内的 LRU，容量有上限；缓存的是 token 本身的校验结果，用户状态仍由 identity_cache 负责
+- JWT 库通过统一接口接入（python-jose、PyJWT），可用 JWT_BACKEND 切换，基准测试见 benchmarks/jwt_verify.py
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Protocol
+
+from app.core.config import get_settings
+
+
+class InvalidToken(Exception):
+    """签名错误、已过期、格式错误或缺少 subject"""
+
+
+class JWTBackend(Protocol):
+    """JWT 库的统一接口，校验失败时抛出 InvalidToken"""
+
+    name: str
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict[str, Any]: ...
+
+
+class JoseBackend:
+    name = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict[str, Any]:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._error as e:
+            raise InvalidToken(str(e)) from e
+
+
+class PyJWTBackend:
+    name = "pyjwt"
+
+    def __init__(self):
+        try:
+            import jwt
+        except ImportError as e:
+            raise RuntimeError("JWT_BACKEND=pyjwt 需要安装 PyJWT：pip install pyjwt") from e
+
+        self._jwt = jwt
+        self._error = jwt.PyJWTError
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict[str, Any]:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._error as e:
+            raise InvalidToken(str(e)) from e
+
+
+JWT_BACKENDS = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
+
+
+def create_jwt_backend(name: str) -> JWTBackend:
+    if name not in JWT_BACKENDS:
+        raise RuntimeError(f"不支持的 JWT_BACKEND：{name}（可选 {', '.join(JWT_BACKENDS)}）")
+    return JWT_BACKENDS[name]()
+
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    sub: str
+    # subject 为 user_id:123 格式时的用户ID，旧 token 使用邮箱作为 subject 时为 None
+    user_id: Optional[int]
+    expires_at: Optional[float]  # Unix 时间戳，token 没有 exp 时为 None（不缓存）
+
+
+def _parse_claims(payload: dict[str, Any]) -> VerifiedToken:
+    sub = payload.get("sub")
+    if not isinstance(sub, str) or not sub:
+        raise InvalidToken("缺少 subject")
+    user_id = None
+    if sub.startswith("user_id:"):
+        try:
+            user_id = int(sub[len("user_id:"):])
+        except ValueError:
+            raise InvalidToken("subject 格式错误")
+    exp = payload.get("exp")
+    return VerifiedToken(sub=sub, user_id=user_id, expires_at=float(exp) if exp is not None else None)
+
+
+class TokenVerifier:
+    def __init__(self, backend: JWTBackend, key: str, algorithm: str, max_entries: int):
+        self.backend = backend
+        self.key = key
+        self.algorithm = algorithm
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[bytes, VerifiedToken] = OrderedDict()
+
+    def verify_uncached(self, token: str) -> VerifiedToken:
+        return _parse_claims(self.backend.decode(token, self.key, self.algorithm))
+
+    def verify(self, token: str) -> VerifiedToken:
+        """校验 token，失败时抛出 InvalidToken"""
+        if self.max_entries <= 0:
+            return self.verify_uncached(token)
+
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = self._cache.get(digest)
+        if cached is not None:
+            if cached.expires_at > time.time():  # type: ignore[operator]
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return cached
+            del self._cache[digest]
+
+        self.misses += 1
+        verified = self.verify_uncached(token)
+        if verified.expires_at is not None:
+            self._cache[digest] = verified
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return verified
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.backend.name, "size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def create_token_verifier() -> TokenVerifier:
+    settings = get_settings()
+    return TokenVerifier(
+        backend=create_jwt_backend(settings.JWT_BACKEND),
+        key=settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+        max_entries=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+    )
+
+
+token_verifier = create_token_verifier()
@@ -0,0 +1,311 @@
+"""
+大模型调用网关
+
+应用级的 OpenAI 兼容客户端（DeepSeek/Qwen 等），在 FastAPI lifespan 中创建和关闭：
+- 复用同一个带连接池的 httpx 客户端（保持 keep-alive 和 TLS 会话）
+- 全局并发上限 + 单用户并发上限，超出时排队等待
+- 每次调用有整体截止时间（包含排队和重试），单次请求有超时
+- 连接错误、超时、429 和 5xx 按指数退避（带随机抖动）重试
+- 按操作统计调用延迟分布
+"""
+import asyncio
+import random
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+# 可重试的错误：连接错误（含超时）、限流、服务端错误
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class LLMDeadlineExceeded(Exception):
+    """调用超过整体截止时间"""
+
+
+class LatencyHistogram:
+    """延迟分布（毫秒分桶，累计计数）"""
+
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        buckets: dict[str, int] = {}
+        cumulative = 0
+        for bound, n in zip(self.BUCKETS_MS, self.counts):
+            cumulative += n
+            buckets[f"le_{bound}ms"] = cumulative
+        buckets["le_inf"] = self.count
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+            "buckets": buckets,
+        }
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str,
+        max_concurrency: int = 16,
+        per_user_concurrency: int = 2,
+        max_connections: int = 20,
+        request_timeout: float = 20.0,
+        call_deadline: float = 45.0,
+        max_retries: int = 2,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.per_user_concurrency = per_user_concurrency
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+        self.call_deadline = call_deadline
+        self.max_retries = max_retries
+        self.transport = transport  # 测试时可以传入指向本地假服务的 transport
+
+        self._client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._global_slots = asyncio.Semaphore(max_concurrency)
+        # 用户ID -> [信号量, 使用中的调用数]，调用数归零时移除
+        self._user_slots: dict[int, list] = {}
+
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.deadline_exceeded = 0
+        self.queue_wait = LatencyHistogram()
+        self.latency: dict[str, LatencyHistogram] = {}
+
+    @classmethod
+    def from_settings(cls) -> "LLMGateway":
+        settings = get_settings()
+        return cls(
+            api_key=settings.AI_API_KEY,
+            base_url=settings.AI_API_BASE_URL,
+            max_concurrency=settings.AI_MAX_CONCURRENCY,
+            per_user_concurrency=settings.AI_PER_USER_CONCURRENCY,
+            max_connections=settings.AI_MAX_CONNECTIONS,
+            request_timeout=settings.AI_REQUEST_TIMEOUT,
+            call_deadline=settings.AI_CALL_DEADLINE,
+            max_retries=settings.AI_MAX_RETRIES,
+        )
+
+    async def start(self) -> None:
+        """创建连接池和客户端（应用启动时调用）"""
+        if self._client is not None:
+            return
+        self._http_client = httpx.AsyncClient(
+            transport=self.transport,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=httpx.Timeout(self.request_timeout, connect=5.0),
+        )
+        # 重试由网关负责（带截止时间和抖动），关闭 SDK 自带的重试
+        self._client = AsyncOpenAI(
+            api_key=self.api_key or "",
+            base_url=self.base_url,
+            http_client=self._http_client,
+            max_retries=0,
+        )
+
+    async def close(self) -> None:
+        """关闭连接池（应用退出时调用）"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._client = None
+        self._http_client = None
+
+    async def _get_client(self) -> AsyncOpenAI:
+        # 未经过 lifespan 启动时（例如命令行脚本）按需创建
+        if self._client is None:
+            await self.start()
+        return self._client  # type: ignore[return-value]
+
+    @asynccontextmanager
+    async def _user_slot(self, user_id: int) -> AsyncIterator[None]:
+        slot = self._user_slots.get(user_id)
+        if slot is None:
+            slot = self._user_slots[user_id] = [asyncio.Semaphore(self.per_user_concurrency), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                self._user_slots.pop(user_id, None)
+
+    def _backoff(self, attempt: int) -> float:
+        """指数退避 + 完全随机抖动"""
+        return random.uniform(0, min(4.0, 0.25 * 2 ** attempt))
+
+    async def call(self, operation: str, user_id: int, request: Callable[[AsyncOpenAI], Awaitable[T]]) -> T:
+        """
+        在并发限制和截止时间内执行一次大模型调用
+        request 接收客户端并发起请求，重试时会再次调用（请求参数需要可以重复使用）
+        """
+        client = await self._get_client()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.call_deadline
+        self.calls += 1
+        try:
+            async with asyncio.timeout_at(deadline):
+                queued_at = time.perf_counter()
+                async with self._user_slot(user_id), self._global_slots:
+                    self.queue_wait.observe(time.perf_counter() - queued_at)
+                    self.in_flight += 1
+                    try:
+                        return await self._call_with_retries(operation, client, request, deadline)
+                    finally:
+                        self.in_flight -= 1
+        except TimeoutError as e:
+            self.failures += 1
+            self.deadline_exceeded += 1
+            raise LLMDeadlineExceeded(f"AI 服务响应超时（超过 {self.call_deadline:g} 秒）") from e
+        except Exception:
+            self.failures += 1
+            raise
+
+    async def _call_with_retries(
+        self,
+        operation: str,
+        client: AsyncOpenAI,
+        request: Callable[[AsyncOpenAI], Awaitable[T]],
+        deadline: float,
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            started_at = time.perf_counter()
+            try:
+                result = await request(client)
+            except RETRYABLE_ERRORS:
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or loop.time() + delay >= deadline:
+                    raise
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            self.latency.setdefault(operation, LatencyHistogram()).observe(time.perf_counter() - started_at)
+            return result
+
+    async def chat_completion(self, user_id: int, **kwargs: Any):
+        """chat.completions.create"""
+        return await self.call("chat", user_id, lambda client: client.chat.completions.create(**kwargs))
+
+    async def chat_completion_stream(self, user_id: int, **kwargs: Any) -> AsyncIterator[str]:
+        """
+        流式 chat.completions.create，逐段返回生成的文本
+        只在收到第一段之前重试；整个流式输出同样受截止时间限制
+        """
+        client = await self._get_client()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.call_deadline
+        self.calls += 1
+
+        async def _open(client: AsyncOpenAI):
+            # 打开流并等到第一段内容，连接或服务端错误在这里触发重试
+            stream = await client.chat.completions.create(stream=True, **kwargs)
+            try:
+                first = await stream.__anext__()
+            except BaseException:
+                await stream.close()
+                raise
+            return stream, first
+
+        try:
+            async with AsyncExitStack() as stack:
+                started_at = time.perf_counter()
+                async with asyncio.timeout_at(deadline):
+                    await stack.enter_async_context(self._user_slot(user_id))
+                    await stack.enter_async_context(self._global_slots)
+                    self.queue_wait.observe(time.perf_counter() - started_at)
+                    stream, chunk = await self._call_with_retries("chat_stream_first_token", client, _open, deadline)
+                stack.push_async_callback(stream.close)
+                self.in_flight += 1
+                stack.callback(self._leave)
+
+                while True:
+                    text = _delta_text(chunk)
+                    if text:
+                        yield text
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise TimeoutError
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                self.latency.setdefault("chat_stream", LatencyHistogram()).observe(time.perf_counter() - started_at)
+        except TimeoutError as e:
+            self.failures += 1
+            self.deadline_exceeded += 1
+            raise LLMDeadlineExceeded(f"AI 服务响应超时（超过 {self.call_deadline:g} 秒）") from e
+        except Exception:
+            self.failures += 1
+            raise
+
+    def _leave(self) -> None:
+        self.in_flight -= 1
+
+    async def transcription(self, user_id: int, **kwargs: Any):
+        """
+        audio.transcriptions.create
+        file 使用 (文件名, bytes) 或 (文件名, 可 seek 的文件对象)，文件对象分块发送，重试时从头重新读取
+        """
+        return await self.call("transcription", user_id, lambda client: client.audio.transcriptions.create(**kwargs))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "per_user_concurrency": self.per_user_concurrency,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "deadline_exceeded": self.deadline_exceeded,
+            "queue_wait": self.queue_wait.snapshot(),
+            "latency": {operation: hist.snapshot() for operation, hist in self.latency.items()},
+        }
+
+
+def _delta_text(chunk: Any) -> str:
+    """流式响应中一段的文本内容"""
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+
+llm_gateway = LLMGateway.from_settings()
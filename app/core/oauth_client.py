@@ -0,0 +1,226 @@
+"""
+第三方登录（微信、钉钉 OAuth）接口的 HTTP 客户端
+
+应用级客户端，在 FastAPI lifespan 中创建和关闭：
+- 所有登录请求复用同一个连接池（keep-alive，安装 h2 时使用 HTTP/2），不再每次登录都重新握手
+- 连接、读取分别有超时，第三方接口无响应时不会一直占用请求
+- 每个平台一个熔断器：连续失败达到阈值后暂停调用一段时间，直接返回 503，之后放行一个探测请求
+- 按平台统计调用延迟分布
+"""
+import importlib.util
+import time
+from typing import Any, Optional
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+from app.core.llm_gateway import LatencyHistogram
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    closed：正常调用；open：连续失败后暂停调用；half_open：暂停结束后只放行一个探测请求，成功则恢复
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.opened_count = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def retry_after(self) -> int:
+        return max(1, int(self.reset_timeout - (time.monotonic() - self.opened_at)) + 1)
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened_count += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """请求被取消（不计入成功或失败），释放探测名额"""
+        self._probing = False
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_count": self.opened_count,
+        }
+
+
+class OAuthHTTPClient:
+    # 平台名称 -> 错误提示中使用的名称
+    PROVIDER_LABELS = {"wechat": "微信", "dingtalk": "钉钉"}
+
+    def __init__(
+        self,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 5.0,
+        max_connections: int = 20,
+        http2: bool = True,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_connections = max_connections
+        # HTTP/2 需要 h2 包（pip install httpx[http2]），未安装时使用 HTTP/1.1 keep-alive
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.transport = transport  # 测试时可以传入指向本地假服务的 transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.latency: dict[str, LatencyHistogram] = {}
+        self.calls: dict[str, int] = {}
+        self.failures: dict[str, int] = {}
+        self.rejected: dict[str, int] = {}
+
+    @classmethod
+    def from_settings(cls) -> "OAuthHTTPClient":
+        settings = get_settings()
+        return cls(
+            connect_timeout=settings.OAUTH_CONNECT_TIMEOUT,
+            read_timeout=settings.OAUTH_READ_TIMEOUT,
+            max_connections=settings.OAUTH_MAX_CONNECTIONS,
+            http2=settings.OAUTH_HTTP2,
+            breaker_failures=settings.OAUTH_BREAKER_FAILURES,
+            breaker_reset=settings.OAUTH_BREAKER_RESET_SECONDS,
+        )
+
+    async def start(self) -> None:
+        """创建连接池（应用启动时调用）"""
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            transport=self.transport,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=httpx.Timeout(
+                self.read_timeout, connect=self.connect_timeout, pool=self.connect_timeout
+            ),
+        )
+
+    async def close(self) -> None:
+        """关闭连接池（应用退出时调用）"""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        breaker = self.breakers.get(provider)
+        if breaker is None:
+            breaker = self.breakers[provider] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+        return breaker
+
+    async def request_json(self, provider: str, method: str, url: str, **kwargs: Any) -> dict:
+        """
+        调用第三方接口并返回 JSON
+        接口不可用（连接失败、超时、5xx、响应不是 JSON）时计入熔断，返回 502/504；熔断期间直接返回 503
+        业务错误（errcode）由调用方处理，不计入熔断
+        """
+        # 未经过 lifespan 启动时（例如命令行脚本）按需创建
+        if self._client is None:
+            await self.start()
+        label = self.PROVIDER_LABELS.get(provider, provider)
+        breaker = self._breaker(provider)
+        if not breaker.allow():
+            self.rejected[provider] = self.rejected.get(provider, 0) + 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"{label}登录服务暂时不可用，请稍后重试",
+                headers={"Retry-After": str(breaker.retry_after())},
+            )
+
+        self.calls[provider] = self.calls.get(provider, 0) + 1
+        started_at = time.perf_counter()
+        try:
+            response = await self._client.request(method, url, **kwargs)  # type: ignore[union-attr]
+            if response.status_code >= 500:
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"{label}接口返回错误: HTTP {response.status_code}",
+                )
+            try:
+                data = response.json()
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"{label}接口返回了无法解析的响应",
+                )
+        except BaseException as e:
+            if isinstance(e, (httpx.TransportError, HTTPException)):
+                breaker.record_failure()
+                self.failures[provider] = self.failures.get(provider, 0) + 1
+            else:
+                # 取消（例如客户端断开）不代表第三方不可用
+                breaker.release()
+            if isinstance(e, httpx.TimeoutException):
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail=f"{label}接口响应超时，请稍后重试",
+                ) from e
+            if isinstance(e, httpx.TransportError):
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"无法连接{label}接口: {type(e).__name__}",
+                ) from e
+            raise
+        finally:
+            self.latency.setdefault(provider, LatencyHistogram()).observe(time.perf_counter() - started_at)
+
+        breaker.record_success()
+        return data
+
+    def stats(self) -> dict[str, Any]:
+        providers = set(self.calls) | set(self.rejected)
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "providers": {
+                provider: {
+                    "calls": self.calls.get(provider, 0),
+                    "failures": self.failures.get(provider, 0),
+                    "rejected": self.rejected.get(provider, 0),
+                    "breaker": self._breaker(provider).stats(),
+                    "latency": self.latency[provider].snapshot() if provider in self.latency else None,
+                }
+                for provider in sorted(providers)
+            },
+        }
+
+
+oauth_client = OAuthHTTPClient.from_settings()
@@ -1,8 +1,12 @@
+import asyncio
 import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from typing import Any, Callable, Optional, TypeVar
 
 import bcrypt
+from fastapi import HTTPException, status
 from jose import jwt
 
 from app.core.config import get_settings
@@ -60,3 +64,94 @@ def get_password_hash(password: str) -> str:
     return hashed.decode('utf-8')
 
 
+T = TypeVar("T")
+
+
+class PasswordHashService:
+    """
+    在独立的有界线程池中执行 bcrypt 计算，避免阻塞事件循环
+    bcrypt 计算期间会释放 GIL，所以多个线程可以并行计算
+    排队的任务超过上限时直接返回 429，避免请求在队列中无限堆积
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.compute_total = 0.0
+        self.compute_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="服务繁忙，请稍后重试",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        submitted_at = time.perf_counter()
+        timings: dict[str, float] = {}
+
+        def _job() -> T:
+            started_at = time.perf_counter()
+            timings["queue_wait"] = started_at - submitted_at
+            try:
+                return fn(*args)
+            finally:
+                timings["compute"] = time.perf_counter() - started_at
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), _job)
+        finally:
+            self._pending -= 1
+            if "compute" in timings:
+                self.completed += 1
+                self.queue_wait_total += timings["queue_wait"]
+                self.queue_wait_max = max(self.queue_wait_max, timings["queue_wait"])
+                self.compute_total += timings["compute"]
+                self.compute_max = max(self.compute_max, timings["compute"])
+
+    def stats(self) -> dict[str, Any]:
+        completed = self.completed or 1
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": round(self.queue_wait_total / completed * 1000, 2),
+            "queue_wait_max_ms": round(self.queue_wait_max * 1000, 2),
+            "compute_avg_ms": round(self.compute_total / completed * 1000, 2),
+            "compute_max_ms": round(self.compute_max * 1000, 2),
+        }
+
+
+_settings = get_settings()
+password_hash_service = PasswordHashService(
+    max_workers=_settings.PASSWORD_HASH_WORKERS,
+    max_queue=_settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在线程池中验证密码，不阻塞事件循环"""
+    return await password_hash_service.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在线程池中生成密码哈希，不阻塞事件循环"""
+    return await password_hash_service.run(get_password_hash, password)
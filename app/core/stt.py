@@ -0,0 +1,283 @@
+"""
+语音识别后端
+
+STT_BACKEND 选择识别方式：
+- remote：调用 OpenAI 兼容的 audio.transcriptions 接口（经过 llm_gateway 的并发限制、重试和截止时间）
+- local：在本机的进程池中运行识别模型（默认 faster-whisper），没有网络往返，无网络环境下也可以使用
+
+本地后端：
+- 应用启动时创建进程池，每个工作进程加载模型并识别一段静音预热
+- 短时间内到达的请求合并成一批交给同一个工作进程依次识别（一次进程间往返，模型保持加载）
+- 排队和识别中的请求超过上限时直接返回 429，避免请求在队列中无限堆积
+"""
+import asyncio
+import importlib.util
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Optional, Protocol
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.core.llm_gateway import LLMGateway, LatencyHistogram, llm_gateway
+from app.utils import stt_worker
+from app.utils.audio import AudioSpool
+
+
+class TranscriptionBackend(Protocol):
+    """语音识别后端接口"""
+
+    name: str
+
+    async def start(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+    async def transcribe(self, user_id: int, filename: str, spool: AudioSpool) -> str: ...
+
+    def stats(self) -> dict[str, Any]: ...
+
+
+class RemoteTranscriptionBackend:
+    """OpenAI 兼容的 audio.transcriptions 接口"""
+
+    name = "remote"
+
+    def __init__(self, gateway: LLMGateway, model: str, language: Optional[str]):
+        self.gateway = gateway
+        self.model = model
+        self.language = language
+
+    async def start(self) -> None:
+        # 连接池由 llm_gateway 管理
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    async def transcribe(self, user_id: int, filename: str, spool: AudioSpool) -> str:
+        # 以文件对象上传，httpx 分块读取发送（重试时会重新从头读取）
+        with spool.open() as f:
+            kwargs: dict[str, Any] = {"model": self.model, "file": (filename, f)}
+            if self.language:
+                kwargs["language"] = self.language
+            transcription = await self.gateway.transcription(user_id, **kwargs)
+        return transcription.text
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.name, "model": self.model}
+
+
+@dataclass
+class _Job:
+    path: str
+    future: asyncio.Future
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class LocalTranscriptionBackend:
+    """本机进程池中运行的识别模型"""
+
+    name = "local"
+
+    def __init__(
+        self,
+        engine: str,
+        model: str,
+        options: dict[str, Any],
+        workers: int = 1,
+        batch_size: int = 4,
+        batch_window: float = 0.02,
+        max_queue: int = 16,
+    ):
+        self.engine = engine
+        self.model = model
+        self.options = options
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_pending = workers * batch_size + max_queue
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue[_Job]] = None
+        self._dispatchers: list[asyncio.Task] = []
+        self._start_lock = asyncio.Lock()
+        self._pending = 0
+
+        self.warmup_seconds: Optional[float] = None
+        self.completed = 0
+        self.failures = 0
+        self.rejected = 0
+        self.batches = 0
+        self.pool_restarts = 0
+        self.queue_wait = LatencyHistogram()
+        self.latency = LatencyHistogram()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # 使用 spawn 启动子进程，避免 fork 带上事件循环、数据库连接等状态
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=stt_worker.init_worker,
+            initargs=(self.engine, self.model, self.options),
+        )
+
+    async def start(self) -> None:
+        """创建进程池并等待所有工作进程加载模型、完成预热（应用启动时调用）"""
+        if self._executor is not None:
+            return
+        async with self._start_lock:
+            if self._executor is not None:
+                return
+            if self.engine in stt_worker.ENGINES and importlib.util.find_spec("faster_whisper") is None:
+                raise RuntimeError("本地语音识别需要安装 faster-whisper：pip install faster-whisper")
+
+            executor = self._create_executor()
+            loop = asyncio.get_running_loop()
+            started_at = time.perf_counter()
+            try:
+                # 同时提交 workers 个任务，所有工作进程都会启动并执行初始化（加载模型、预热）
+                await asyncio.gather(*(loop.run_in_executor(executor, stt_worker.ping) for _ in range(self.workers)))
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            self.warmup_seconds = time.perf_counter() - started_at
+
+            self._queue = asyncio.Queue()
+            self._executor = executor
+            self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """停止分发并关闭进程池（应用退出时调用）"""
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError("语音识别服务已关闭"))
+            self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def transcribe(self, user_id: int, filename: str, spool: AudioSpool) -> str:
+        await self.start()
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="语音识别繁忙，请稍后重试",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        try:
+            # 工作进程按路径读取文件，不通过进程间通信传输音频内容
+            path = spool.path if spool.on_disk else await run_in_threadpool(spool.to_disk)
+            future = asyncio.get_running_loop().create_future()
+            self._queue.put_nowait(_Job(path, future))  # type: ignore[union-attr]
+            return await future
+        finally:
+            self._pending -= 1
+
+    async def _next_batch(self) -> list[_Job]:
+        """取出一批任务：拿到第一个任务后，在 batch_window 内继续收集，最多 batch_size 个"""
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        batch = [await queue.get()]  # type: ignore[union-attr]
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))  # type: ignore[union-attr]
+            except TimeoutError:
+                break
+        # 请求已取消（例如客户端断开）的任务不再识别
+        return [job for job in batch if not job.future.done()]
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            started_at = time.perf_counter()
+            for job in batch:
+                self.queue_wait.observe(started_at - job.queued_at)
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, stt_worker.transcribe_batch, [job.path for job in batch]
+                )
+            except Exception as e:
+                # 工作进程异常退出（例如内存不足）后进程池不可再用，重新创建（新进程在下次提交时加载模型）
+                if isinstance(e, BrokenProcessPool):
+                    self.pool_restarts += 1
+                    self._executor = self._create_executor()
+                results = [(False, f"{type(e).__name__}: {e}")] * len(batch)
+
+            self.batches += 1
+            self.latency.observe(time.perf_counter() - started_at)
+            for job, (ok, value) in zip(batch, results):
+                if job.future.done():
+                    continue
+                if ok:
+                    self.completed += 1
+                    job.future.set_result(value)
+                else:
+                    self.failures += 1
+                    job.future.set_exception(RuntimeError(f"本地语音识别失败: {value}"))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.name,
+            "engine": self.engine,
+            "model": self.model,
+            "workers": self.workers,
+            "started": self._executor is not None,
+            "warmup_ms": round(self.warmup_seconds * 1000, 1) if self.warmup_seconds is not None else None,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "avg_batch_size": round((self.completed + self.failures) / self.batches, 2) if self.batches else 0.0,
+            "pool_restarts": self.pool_restarts,
+            "queue_wait": self.queue_wait.snapshot(),
+            "batch_latency": self.latency.snapshot(),
+        }
+
+
+def create_transcription_backend() -> TranscriptionBackend:
+    """根据配置创建语音识别后端（STT_BACKEND=remote / local）"""
+    settings = get_settings()
+    if settings.STT_BACKEND == "local":
+        return LocalTranscriptionBackend(
+            engine=settings.STT_LOCAL_ENGINE,
+            model=settings.STT_LOCAL_MODEL,
+            options={
+                "language": settings.STT_LANGUAGE,
+                "cpu_threads": settings.STT_LOCAL_CPU_THREADS,
+                "compute_type": settings.STT_LOCAL_COMPUTE_TYPE,
+                "download_root": settings.STT_LOCAL_MODEL_DIR,
+            },
+            workers=settings.STT_LOCAL_WORKERS,
+            batch_size=settings.STT_BATCH_SIZE,
+            batch_window=settings.STT_BATCH_WINDOW_MS / 1000,
+            max_queue=settings.STT_MAX_QUEUE,
+        )
+    if settings.STT_BACKEND != "remote":
+        raise RuntimeError(f"不支持的 STT_BACKEND：{settings.STT_BACKEND}（可选 remote、local）")
+    return RemoteTranscriptionBackend(llm_gateway, model=settings.STT_REMOTE_MODEL, language=settings.STT_LANGUAGE)
+
+
+stt_backend = create_transcription_backend()
@@ -0,0 +1,287 @@
+"""
+跨 worker 共享的第三方令牌缓存（微信 access_token、jsapi_ticket 等）
+
+第三方平台的令牌有效期较长（微信为 7200 秒），获取接口有调用次数限制，所以：
+- 令牌保存在所有 worker 共享的存储中：
+  - FileTokenStore：同一台机器上的 JSON 文件，用文件锁协调（CACHE_BACKEND=memory 时使用）
+  - RedisTokenStore：Redis 兼容服务，用 SET NX 实现锁（CACHE_BACKEND=redis 时使用）
+- 在过期前 refresh_ahead 秒开始刷新，刷新失败时继续使用尚未过期的旧令牌，
+  并在 REFRESH_RETRY_INTERVAL 秒（不超过 refresh_ahead 的十分之一）内不再重试，避免第三方故障或限流时每个请求都调用接口
+- 单飞（single-flight）刷新：进程内用 asyncio.Lock，进程间用存储提供的锁，同一时间只有一个协程调用接口，
+  其他协程等锁后直接读取刷新好的令牌
+"""
+import asyncio
+import json
+import os
+import re
+import secrets
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Optional, Protocol
+
+from app.core.config import get_settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows 开发环境
+    fcntl = None
+
+# 等待其他 worker 刷新令牌的最长时间（秒），应大于一次刷新请求的超时
+LOCK_TIMEOUT = 30.0
+_LOCK_POLL_INTERVAL = 0.05
+# 提前刷新失败后，至少间隔多少秒才再次调用接口（不超过 refresh_ahead / 10）
+REFRESH_RETRY_INTERVAL = 30.0
+
+
+@dataclass
+class StoredToken:
+    value: str
+    expires_at: float  # Unix 时间戳
+
+
+class TokenStore(Protocol):
+    """令牌存储接口"""
+
+    async def get(self, name: str) -> Optional[StoredToken]: ...
+
+    async def set(self, name: str, token: StoredToken) -> None: ...
+
+    async def delete(self, name: str) -> None: ...
+
+    def lock(self, name: str) -> AsyncContextManager[None]: ...
+
+
+class MemoryTokenStore:
+    """进程内存储（只在单个 worker 内共享，用于开发和测试）"""
+
+    def __init__(self):
+        self._tokens: dict[str, StoredToken] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def get(self, name: str) -> Optional[StoredToken]:
+        return self._tokens.get(name)
+
+    async def set(self, name: str, token: StoredToken) -> None:
+        self._tokens[name] = token
+
+    async def delete(self, name: str) -> None:
+        self._tokens.pop(name, None)
+
+    @asynccontextmanager
+    async def lock(self, name: str) -> AsyncIterator[None]:
+        async with self._locks.setdefault(name, asyncio.Lock()):
+            yield
+
+
+class FileTokenStore:
+    """同一台机器上多个 worker 共享的文件存储，令牌写入时先写临时文件再替换，读取不需要加锁"""
+
+    def __init__(self, directory: str, lock_timeout: float = LOCK_TIMEOUT):
+        self.directory = directory
+        self.lock_timeout = lock_timeout
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", name) + suffix)
+
+    async def get(self, name: str) -> Optional[StoredToken]:
+        try:
+            with open(self._path(name, ".json"), encoding="utf-8") as f:
+                return StoredToken(**json.load(f))
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+
+    async def set(self, name: str, token: StoredToken) -> None:
+        path = self._path(name, ".json")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".token-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"value": token.value, "expires_at": token.expires_at}, f)
+        os.replace(tmp_path, path)
+
+    async def delete(self, name: str) -> None:
+        try:
+            os.unlink(self._path(name, ".json"))
+        except FileNotFoundError:
+            pass
+
+    @asynccontextmanager
+    async def lock(self, name: str) -> AsyncIterator[None]:
+        # 非阻塞地尝试加锁并轮询等待，不占用线程池
+        fd = os.open(self._path(name, ".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            deadline = time.monotonic() + self.lock_timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)  # type: ignore[union-attr]
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"等待令牌 {name} 的刷新锁超时")
+                    await asyncio.sleep(_LOCK_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)  # type: ignore[union-attr]
+        finally:
+            os.close(fd)
+
+
+# 只删除自己持有的锁（值与加锁时写入的随机值一致）
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisTokenStore:
+    """Redis 兼容存储（例如 redis.asyncio.Redis），多台机器共享"""
+
+    def __init__(self, client: Any, prefix: str = "little-score:token:", lock_timeout: float = LOCK_TIMEOUT):
+        self.client = client
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+
+    async def get(self, name: str) -> Optional[StoredToken]:
+        raw = await self.client.get(self.prefix + name)
+        if raw is None:
+            return None
+        try:
+            return StoredToken(**json.loads(raw))
+        except (ValueError, TypeError):
+            return None
+
+    async def set(self, name: str, token: StoredToken) -> None:
+        payload = json.dumps({"value": token.value, "expires_at": token.expires_at})
+        await self.client.set(self.prefix + name, payload, ex=max(1, int(token.expires_at - time.time())))
+
+    async def delete(self, name: str) -> None:
+        await self.client.delete(self.prefix + name)
+
+    @asynccontextmanager
+    async def lock(self, name: str) -> AsyncIterator[None]:
+        key = f"{self.prefix}{name}:lock"
+        owner = secrets.token_hex(16)
+        deadline = time.monotonic() + self.lock_timeout
+        # 锁自动过期，持有锁的 worker 异常退出时不会一直占用
+        while not await self.client.set(key, owner, nx=True, px=int(self.lock_timeout * 1000)):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"等待令牌 {name} 的刷新锁超时")
+            await asyncio.sleep(_LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            await self.client.eval(_RELEASE_LOCK_SCRIPT, 1, key, owner)
+
+
+def create_token_store() -> TokenStore:
+    """根据配置创建令牌存储（CACHE_BACKEND=redis 时使用 Redis，否则使用本机文件）"""
+    settings = get_settings()
+    if settings.CACHE_BACKEND == "redis":
+        if not settings.CACHE_REDIS_URL:
+            raise RuntimeError("CACHE_BACKEND=redis 时必须配置 CACHE_REDIS_URL")
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:  # pragma: no cover - 取决于部署环境
+            raise RuntimeError("使用 Redis 缓存需要安装 redis 包：pip install redis") from e
+        return RedisTokenStore(redis_asyncio.from_url(settings.CACHE_REDIS_URL))
+    if fcntl is None:  # pragma: no cover - Windows 开发环境
+        return MemoryTokenStore()
+    return FileTokenStore(settings.TOKEN_STORE_DIR or os.path.join(tempfile.gettempdir(), "little-score-tokens"))
+
+
+class CachedToken:
+    """
+    一个令牌的缓存
+    fetch 调用第三方接口获取新令牌，返回 (令牌, 有效期秒数)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], Awaitable[tuple[str, int]]],
+        store: TokenStore,
+        refresh_ahead: int = 300,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.store = store
+        self.refresh_ahead = refresh_ahead
+        self._local: Optional[StoredToken] = None
+        self._lock = asyncio.Lock()
+        # 提前刷新失败后，在此时间之前继续使用尚未过期的旧令牌，不调用接口
+        self._retry_at = 0.0
+
+        self.local_hits = 0
+        self.store_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _fresh(self, token: Optional[StoredToken]) -> bool:
+        return token is not None and time.time() < token.expires_at - self.refresh_ahead
+
+    def _usable(self) -> bool:
+        """本地令牌可以直接使用：未进入提前刷新窗口，或刚刷新失败、尚未到重试时间且令牌还没过期"""
+        if self._fresh(self._local):
+            return True
+        now = time.time()
+        return self._local is not None and now < self._retry_at and now < self._local.expires_at
+
+    async def get(self) -> str:
+        if self._usable():
+            self.local_hits += 1
+            return self._local.value  # type: ignore[union-attr]
+
+        async with self._lock:
+            # 等锁期间同一进程内的其他协程可能已经刷新（或刷新失败）
+            if self._usable():
+                self.local_hits += 1
+                return self._local.value  # type: ignore[union-attr]
+            token = await self.store.get(self.name)
+            if not self._fresh(token):
+                async with self.store.lock(self.name):
+                    # 等锁期间其他 worker 可能已经刷新
+                    token = await self.store.get(self.name)
+                    if not self._fresh(token):
+                        token = await self._refresh(token)
+            else:
+                self.store_hits += 1
+            self._local = token
+            return token.value  # type: ignore[union-attr]
+
+    async def _refresh(self, current: Optional[StoredToken]) -> StoredToken:
+        try:
+            value, expires_in = await self.fetch()
+        except Exception:
+            self.refresh_failures += 1
+            # 提前刷新失败时，旧令牌在过期前仍然可以使用，一段时间内不再重试
+            if current is not None and time.time() < current.expires_at:
+                self._retry_at = time.time() + min(REFRESH_RETRY_INTERVAL, self.refresh_ahead / 10)
+                return current
+            raise
+        self.refreshes += 1
+        token = StoredToken(value, time.time() + expires_in)
+        await self.store.set(self.name, token)
+        return token
+
+    async def invalidate(self, value: str) -> None:
+        """令牌被第三方判定为无效时调用（只有仍是当前令牌时才删除，避免删掉其他 worker 刚刷新的令牌）"""
+        async with self._lock:
+            if self._local is not None and self._local.value == value:
+                self._local = None
+            async with self.store.lock(self.name):
+                token = await self.store.get(self.name)
+                if token is not None and token.value == value:
+                    await self.store.delete(self.name)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "local_hits": self.local_hits,
+            "store_hits": self.store_hits,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "expires_in": round(self._local.expires_at - time.time()) if self._local else None,
+        }
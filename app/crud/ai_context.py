@@ -0,0 +1,207 @@
+"""
+语音助手的用户上下文
+
+上下文（项目、惩罚选项、兑换选项）拼接在系统提示词之后发给大模型。
+快照中保存了提示词以及项目和选项的词表，供本地规则解析和名称匹配使用，用一次查询构建；
+相同数据构建出的提示词逐字节相同，便于大模型服务端的提示词缓存命中。
+
+CACHE_BACKEND=redis 时快照按版本缓存在多个 worker 共享的 Redis 中：项目、惩罚选项、兑换选项的写操作
+调用 invalidate_user_context 使版本加一，版本不变时直接复用缓存的快照。
+memory 时不缓存快照（进程内的失效只作用于当前 worker，其他 worker 会继续匹配到已删除的项目、
+找不到新建的项目），每次都重新构建。
+
+每个 worker 进程内还按用户保留最近使用的快照对象和名称匹配索引（UserMatchIndex），
+快照内容变化时随之重建，不需要单独失效。
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import literal, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import ResponseCache, create_cache_backend, register_cache
+from app.core.config import get_settings
+from app.core.enums import RewardType, TaskRating, TaskStatus, get_enum_label
+from app.models.project import Project
+from app.models.task_and_score import PunishmentOption, RewardExchangeOption
+from app.schemas.ai_context import ContextOption, ContextProject, UserContextSnapshot
+from app.utils.name_index import UserMatchIndex
+
+settings = get_settings()
+
+ai_context_cache = register_cache(
+    ResponseCache(
+        "ai-context",
+        # 写操作后必须在所有 worker 立即失效，只在共享后端（redis）上缓存
+        create_cache_backend(max_entries=settings.AI_CONTEXT_CACHE_MAX_ENTRIES, shared_only=True),
+        ttl=settings.AI_CONTEXT_CACHE_TTL,
+    )
+)
+
+# 奖励积分预设值（在 enums.py 中定义）
+REWARD_POINTS_OPTIONS = [1, 3, 5, 7, 10]
+
+
+def _fixed_options_context() -> list[str]:
+    """固定的枚举选项部分，进程内不变"""
+    parts = []
+
+    # 任务状态选项
+    parts.append("\n【任务状态（固定选项）】")
+    parts.append(f"  {', '.join(get_enum_label('task_status', status.value) for status in TaskStatus)}")
+
+    # 任务评分选项
+    parts.append("\n【任务评分（固定选项）】")
+    parts.append(f"  {', '.join(get_enum_label('task_rating', rating.value) for rating in TaskRating)}")
+
+    # 惩奖类型选项
+    parts.append("\n【惩奖类型（固定选项）】")
+    parts.append(f"  {', '.join(get_enum_label('reward_type', rt.value) for rt in RewardType)}")
+
+    # 奖励积分选项
+    points_labels = [f"{p}积分" for p in REWARD_POINTS_OPTIONS]
+    parts.append("\n【奖励积分（固定选项，仅供参考，必须使用用户实际说的数值）】")
+    parts.append(f"  {', '.join(points_labels)}")
+    parts.append("  **重要：如果用户说的积分值不在上述列表中，也必须使用用户实际说的数值，不要强制匹配！例如用户说'奖励15分'，即使15不在列表中，也要返回 reward_points: 15**")
+    return parts
+
+
+FIXED_OPTIONS_CONTEXT = _fixed_options_context()
+
+
+async def _load_user_options(db: AsyncSession, user_id: int) -> list:
+    """一次查询取出用户的项目、惩罚选项和兑换选项"""
+    projects = select(
+        literal("project").label("kind"),
+        Project.id,
+        Project.level,
+        Project.parent_id,
+        Project.name,
+        null().label("cost_points"),
+        null().label("created_at"),
+    ).where(Project.user_id == user_id)
+    punishments = select(
+        literal("punishment").label("kind"),
+        PunishmentOption.id,
+        null(),
+        null(),
+        PunishmentOption.name,
+        null(),
+        PunishmentOption.created_at,
+    ).where(PunishmentOption.user_id == user_id)
+    rewards = select(
+        literal("reward").label("kind"),
+        RewardExchangeOption.id,
+        null(),
+        null(),
+        RewardExchangeOption.name,
+        RewardExchangeOption.cost_points,
+        null(),
+    ).where(RewardExchangeOption.user_id == user_id)
+
+    result = await db.execute(union_all(projects, punishments, rewards))
+    return list(result.all())
+
+
+async def build_user_snapshot(db: AsyncSession, user_id: int) -> UserContextSnapshot:
+    """
+    构建用户上下文快照：提示词中的上下文信息（包含所有表单下拉框选项）和本地解析用的词表
+    每类选项按固定顺序输出，相同数据生成的字符串完全一致
+    """
+    rows = await _load_user_options(db, user_id)
+    level1_projects = sorted((r for r in rows if r.kind == "project" and r.level == 1), key=lambda r: r.id)
+    level2_by_parent: dict[int, list[str]] = {}
+    for r in sorted((r for r in rows if r.kind == "project" and r.level == 2), key=lambda r: r.id):
+        level2_by_parent.setdefault(r.parent_id, []).append(r.name)
+    # 惩罚选项按创建时间倒序，兑换选项按积分升序（与选项列表接口一致）
+    punishment_options = sorted(
+        (r for r in rows if r.kind == "punishment"), key=lambda r: (r.created_at, r.id), reverse=True
+    )
+    reward_options = sorted((r for r in rows if r.kind == "reward"), key=lambda r: (r.cost_points, r.id))
+
+    context_parts = []
+
+    # ========== 1. 用户自定义的项目（一级和二级） ==========
+    if level1_projects:
+        context_parts.append("【一级项目（用户自定义）】")
+        for p1 in level1_projects:
+            level2_names = level2_by_parent.get(p1.id)
+            if level2_names:
+                context_parts.append(f"  - {p1.name}：{', '.join(level2_names)}")
+            else:
+                context_parts.append(f"  - {p1.name}")
+
+    # ========== 2. 固定的枚举选项 ==========
+    context_parts.extend(FIXED_OPTIONS_CONTEXT)
+
+    # ========== 3. 用户自定义的惩罚选项 ==========
+    if punishment_options:
+        context_parts.append("\n【惩罚选项（用户自定义）】")
+        context_parts.append(f"  {', '.join(p.name for p in punishment_options)}")
+
+    # ========== 4. 用户自定义的兑换选项 ==========
+    if reward_options:
+        context_parts.append("\n【可兑换的奖励选项（用户自定义）】")
+        context_parts.extend(f"  - {o.name}（{o.cost_points}积分）" for o in reward_options)
+
+    prompt = "\n\n**用户系统中所有可用的选项（请优先匹配这些选项，即使语音识别有错误也要智能纠错）：**\n" + "\n".join(context_parts)
+    return UserContextSnapshot(
+        prompt=prompt,
+        projects=[
+            ContextProject(id=r.id, name=r.name, level=r.level, parent_id=r.parent_id)
+            for r in sorted((r for r in rows if r.kind == "project"), key=lambda r: r.id)
+        ],
+        punishment_options=[ContextOption(id=r.id, name=r.name) for r in punishment_options],
+        reward_options=[ContextOption(id=r.id, name=r.name, cost_points=r.cost_points) for r in reward_options],
+    )
+
+
+@dataclass
+class _LocalEntry:
+    payload: bytes
+    snapshot: UserContextSnapshot
+    match_index: Optional[UserMatchIndex] = None
+
+
+# 用户ID -> 当前进程内解析好的快照（按最近使用排序）
+_local_entries: "OrderedDict[int, _LocalEntry]" = OrderedDict()
+
+
+async def _get_local_entry(db: AsyncSession, user_id: int) -> _LocalEntry:
+    async def _build() -> bytes:
+        return (await build_user_snapshot(db, user_id)).model_dump_json().encode("utf-8")
+
+    payload = await ai_context_cache.get_or_build(user_id, _build)
+    entry = _local_entries.get(user_id)
+    if entry is None or entry.payload != payload:
+        entry = _LocalEntry(payload, UserContextSnapshot.model_validate_json(payload))
+        _local_entries[user_id] = entry
+    _local_entries.move_to_end(user_id)
+    while len(_local_entries) > settings.AI_MATCH_INDEX_MAX_ENTRIES:
+        _local_entries.popitem(last=False)
+    return entry
+
+
+async def get_user_snapshot(db: AsyncSession, user_id: int) -> UserContextSnapshot:
+    """获取用户上下文快照（共享缓存的版本未变化时直接使用缓存）"""
+    return (await _get_local_entry(db, user_id)).snapshot
+
+
+async def get_user_match_index(db: AsyncSession, user_id: int) -> UserMatchIndex:
+    """获取用户的名称匹配索引（快照未变化时复用已建好的索引）"""
+    entry = await _get_local_entry(db, user_id)
+    if entry.match_index is None:
+        entry.match_index = UserMatchIndex(entry.snapshot)
+    return entry.match_index
+
+
+async def get_user_context(db: AsyncSession, user_id: int) -> str:
+    """获取拼接在系统提示词之后的用户上下文"""
+    return (await get_user_snapshot(db, user_id)).prompt
+
+
+async def invalidate_user_context(user_id: int) -> None:
+    """项目、惩罚选项、兑换选项变化后调用（在提交之后）"""
+    _local_entries.pop(user_id, None)
+    await ai_context_cache.invalidate(user_id)
@@ -0,0 +1,130 @@
+"""
+归档：把已删除的记录和较早的积分记录从热表移到 *_archive 表
+
+- 已删除超过 ARCHIVE_DELETED_AFTER_DAYS 天的学生、任务、积分增加/兑换记录
+- 创建超过 ARCHIVE_LEDGER_AFTER_DAYS 天的积分增加/兑换记录（未删除的也归档，
+  “全部历史”查询会合并归档表，积分汇总重建时也会计入）
+按主键分批移动，每批在一个短事务中 INSERT ... SELECT 到归档表并从热表删除，跳过被在线请求锁定的行；
+先归档积分记录和任务，再归档学生，热表中仍有引用的任务/学生不会被归档（热表外键为级联删除）。
+恢复时按学生把归档记录原样（主键不变）移回热表。
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import ColumnElement, DateTime, Table, and_, delete, exists, func, insert, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.archive import score_exchanges_archive, score_increases_archive, students_archive, tasks_archive
+from app.models.student import Student
+from app.models.task_and_score import ScoreExchange, ScoreIncrease, Task
+from app.utils.time import utcnow
+
+
+@dataclass
+class ArchiveTarget:
+    model: Any
+    archive: Table
+
+    @property
+    def name(self) -> str:
+        return self.model.__tablename__
+
+
+# 归档顺序：先归档引用方，再归档被引用的任务和学生；恢复时按相反顺序
+ARCHIVE_TARGETS = (
+    ArchiveTarget(ScoreIncrease, score_increases_archive),
+    ArchiveTarget(ScoreExchange, score_exchanges_archive),
+    ArchiveTarget(Task, tasks_archive),
+    ArchiveTarget(Student, students_archive),
+)
+
+
+def _deleted_before(model, cutoff: datetime) -> ColumnElement[bool]:
+    # 早期的逻辑删除可能没有记录 deleted_at，按删除已超过保留期处理
+    return and_(model.is_deleted == True, or_(model.deleted_at < cutoff, model.deleted_at.is_(None)))
+
+
+def archive_condition(target: ArchiveTarget, now: datetime | None = None) -> ColumnElement[bool]:
+    """热表中应归档的记录"""
+    settings = get_settings()
+    now = now or utcnow()
+    model = target.model
+    condition = _deleted_before(model, now - timedelta(days=settings.ARCHIVE_DELETED_AFTER_DAYS))
+
+    if model in (ScoreIncrease, ScoreExchange):
+        if settings.ARCHIVE_LEDGER_AFTER_DAYS > 0:
+            condition = or_(condition, model.created_at < now - timedelta(days=settings.ARCHIVE_LEDGER_AFTER_DAYS))
+    elif model is Task:
+        # 热表中仍有积分记录引用的任务不归档；归档表中未删除的积分记录需要任务的评分，也不归档
+        condition = and_(
+            condition,
+            ~exists().where(ScoreIncrease.task_id == Task.id),
+            ~exists().where(
+                score_increases_archive.c.task_id == Task.id, score_increases_archive.c.is_deleted == False
+            ),
+        )
+    elif model is Student:
+        # 热表中的任务和积分记录都已归档后才归档学生
+        condition = and_(
+            condition,
+            *(~exists().where(child.student_id == Student.id) for child in (Task, ScoreIncrease, ScoreExchange)),
+        )
+    return condition
+
+
+async def count_archivable(db: AsyncSession, target: ArchiveTarget) -> int:
+    result = await db.execute(select(func.count()).select_from(target.model).where(archive_condition(target)))
+    return result.scalar_one()
+
+
+async def archive_batch(db: AsyncSession, target: ArchiveTarget, batch_size: int) -> int:
+    """
+    移动一批应归档的记录到归档表，返回移动的数量（不 commit，由调用者 commit）
+    选中的行加锁（已被在线请求锁定的行跳过，下一轮再处理），复制和删除在同一事务中完成
+    """
+    model = target.model
+    ids = (
+        await db.execute(
+            select(model.id)
+            .where(archive_condition(target))
+            .order_by(model.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    columns = [column.name for column in model.__table__.columns]
+    await db.execute(
+        insert(target.archive).from_select(
+            [*columns, "archived_at"],
+            select(*model.__table__.columns, literal(utcnow(), DateTime(timezone=True))).where(model.id.in_(ids)),
+        )
+    )
+    await db.execute(delete(model).where(model.id.in_(ids)))
+    return len(ids)
+
+
+async def restore_batch(db: AsyncSession, target: ArchiveTarget, student_id: int, batch_size: int) -> int:
+    """把一批属于该学生的归档记录移回热表，返回移动的数量（不 commit，由调用者 commit）"""
+    archive = target.archive
+    key = archive.c.id if target.model is Student else archive.c.student_id
+    ids = (
+        await db.execute(
+            select(archive.c.id).where(key == student_id).order_by(archive.c.id).limit(batch_size)
+        )
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    columns = [column.name for column in target.model.__table__.columns]
+    await db.execute(
+        insert(target.model.__table__).from_select(
+            columns, select(*(archive.c[name] for name in columns)).where(archive.c.id.in_(ids))
+        )
+    )
+    await db.execute(delete(archive).where(archive.c.id.in_(ids)))
+    return len(ids)
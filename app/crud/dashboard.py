@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import ResponseCache, create_cache_backend, register_cache
+from app.core.config import get_settings
+from app.crud.student import get_students_by_user
+from app.models.project import Project
+from app.models.student import Student
+from app.models.task_and_score import StudentScoreBalance, Task, TaskStatus
+from app.schemas.dashboard import DashboardResponse, StudentDashboard, TaskRatingSummary
+from app.schemas.student import StudentRead
+
+settings = get_settings()
+
+# 首页数据缓存（按用户ID），任务、兑换、学生、项目的写操作会使其失效
+# 首页包含积分余额，写操作后其他 worker 也不能返回旧数据，所以只在 CACHE_BACKEND=redis 时缓存
+dashboard_cache = register_cache(
+    ResponseCache(
+        "dashboard",
+        create_cache_backend(max_entries=settings.DASHBOARD_CACHE_MAX_ENTRIES, shared_only=True),
+        ttl=settings.DASHBOARD_CACHE_TTL,
+    )
+)
+
+
+def _rating_summary_query(user_id: int, student_ids: list[int], since: datetime):
+    """按学生、一级项目、评分统计最近完成且有评分的任务数量，同时关联项目名称"""
+    return (
+        select(
+            Task.student_id,
+            Task.project_level1_id,
+            Project.name.label("project_level1_name"),
+            Task.rating,
+            func.count(Task.id).label("count"),
+        )
+        .join(
+            Project,
+            (Project.id == Task.project_level1_id) & (Project.user_id == user_id),
+        )
+        .where(
+            Task.student_id.in_(student_ids),
+            Task.is_deleted == False,
+            Task.status == TaskStatus.COMPLETED,
+            Task.rating.isnot(None),
+            Task.updated_at >= since,
+        )
+        .group_by(Task.student_id, Task.project_level1_id, Project.name, Task.rating)
+        .order_by(Task.student_id, Task.project_level1_id)
+    )
+
+
+async def build_dashboard(db: AsyncSession, user_id: int, days: int = 30) -> DashboardResponse:
+    """
+    组装首页数据：学生列表、积分汇总、最近 days 天的任务评分汇总
+    无论学生和项目数量多少，固定只执行 3 条查询（学生、积分余额、评分统计+项目名称）
+    """
+    # 1. 获取所有学生
+    students = await get_students_by_user(db, user_id)
+    if not students:
+        return DashboardResponse(students=[])
+
+    student_ids = [s.id for s in students]
+
+    # 2. 批量获取积分余额
+    balance_result = await db.execute(
+        select(StudentScoreBalance).where(StudentScoreBalance.student_id.in_(student_ids))
+    )
+    balances = {b.student_id: b for b in balance_result.scalars().all()}
+
+    # 3. 批量统计任务评分（已完成且有评分的任务），按学生、一级项目、评分分组，同时关联项目名称
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rating_result = await db.execute(_rating_summary_query(user_id, student_ids, since))
+
+    # {student_id: {project_id: TaskRatingSummary}}
+    rating_summaries: dict[int, dict[int, TaskRatingSummary]] = {}
+    for row in rating_result.all():
+        project_summaries = rating_summaries.setdefault(row.student_id, {})
+        summary = project_summaries.get(row.project_level1_id)
+        if summary is None:
+            summary = TaskRatingSummary(
+                project_level1_id=row.project_level1_id,
+                project_level1_name=row.project_level1_name,
+                ratings={},
+            )
+            project_summaries[row.project_level1_id] = summary
+        summary.ratings[row.rating] = row.count
+
+    # 4. 在内存中组装响应
+    student_dashboards = []
+    for student in students:
+        balance = balances.get(student.id)
+        student_dashboards.append(
+            StudentDashboard(
+                student=StudentRead.model_validate(student),
+                score_summary={
+                    "available_points": balance.available_points if balance else 0,
+                    "exchanged_points": balance.total_exchange if balance else 0,
+                },
+                task_rating_summary=list(rating_summaries.get(student.id, {}).values()),
+            )
+        )
+
+    return DashboardResponse(students=student_dashboards)
+
+
+async def get_dashboard_json(db: AsyncSession, user_id: int) -> bytes:
+    """获取序列化后的首页数据（优先读取缓存）"""
+
+    async def _build() -> bytes:
+        dashboard = await build_dashboard(db, user_id)
+        return dashboard.model_dump_json().encode("utf-8")
+
+    return await dashboard_cache.get_or_build(user_id, _build)
+
+
+async def invalidate_dashboard_cache(user_id: int) -> None:
+    """使用户的首页数据缓存失效（在写操作 commit 之后调用）"""
+    await dashboard_cache.invalidate(user_id)
+
+
+async def invalidate_dashboard_cache_for_student(db: AsyncSession, student_id: int) -> None:
+    """根据学生ID使其所属用户的首页数据缓存失效"""
+    # 学生通常已在本次请求中加载过，db.get 会直接命中 identity map，不产生额外查询
+    student = await db.get(Student, student_id)
+    if student is not None:
+        await invalidate_dashboard_cache(student.user_id)
@@ -1,6 +1,9 @@
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.crud.ai_context import invalidate_user_context
+from app.crud.dashboard import invalidate_dashboard_cache
+from app.models.archive import score_increases_archive, tasks_archive
 from app.models.project import Project
 from app.models.task_and_score import Task, ScoreIncrease
 from app.schemas.project import ProjectCreate, ProjectUpdate
@@ -31,6 +34,7 @@ async def create_project(db: AsyncSession, project: ProjectCreate, user_id: int)
     db.add(db_project)
     await db.commit()
     await db.refresh(db_project)
+    await invalidate_user_context(user_id)
     return db_project
 
 
@@ -46,6 +50,9 @@ async def update_project(db: AsyncSession, project_id: int, project_update: Proj
 
     await db.commit()
     await db.refresh(db_project)
+    # 首页评分汇总中显示项目名称
+    await invalidate_dashboard_cache(user_id)
+    await invalidate_user_context(user_id)
     return db_project
 
 
@@ -69,10 +76,21 @@ async def delete_project(db: AsyncSession, project_id: int, user_id: int) -> boo
     score_result = await db.execute(score_query)
     scores = score_result.scalars().all()
     
+    # 已归档的任务和积分记录也引用该项目（恢复到热表时需要外键存在）
+    archived_count = 0
+    for archive in (tasks_archive, score_increases_archive):
+        archived_count += (
+            await db.execute(
+                select(func.count()).select_from(archive).where(
+                    (archive.c.project_level1_id == project_id) | (archive.c.project_level2_id == project_id)
+                )
+            )
+        ).scalar_one()
+    
     # 如果有引用，抛出异常
-    if tasks or scores:
+    if tasks or scores or archived_count:
         from fastapi import HTTPException
-        ref_count = len(tasks) + len(scores)
+        ref_count = len(tasks) + len(scores) + archived_count
         raise HTTPException(
             status_code=400,
             detail=f"无法删除项目：该项目已被 {ref_count} 条记录引用（任务或积分记录），请先删除相关记录"
@@ -91,5 +109,6 @@ async def delete_project(db: AsyncSession, project_id: int, user_id: int) -> boo
 
     await db.delete(db_project)
     await db.commit()
+    await invalidate_user_context(user_id)
     return True
 
@@ -1,54 +1,268 @@
-from sqlalchemy import func, select
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import Insert, Row, Select, Table, func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from app.crud.ai_context import invalidate_user_context
+from app.models.archive import score_exchanges_archive, score_increases_archive
+from app.models.project import Project
+from app.models.student import Student
 from app.models.task_and_score import (
     PunishmentOption,
     RewardExchangeOption,
     ScoreExchange,
     ScoreIncrease,
+    StudentScoreBalance,
+    Task,
 )
 from app.schemas.score import RewardExchangeOptionCreate, RewardExchangeOptionUpdate, ScoreExchangeCreate
+from app.utils.pagination import apply_keyset_union
 
 
 async def get_score_summary(db: AsyncSession, student_id: int) -> dict[str, int]:
-    """获取积分汇总（排除已删除的记录）"""
-    # 计算可用积分（总增加 - 总兑换）
-    increase_result = await db.execute(
-        select(func.sum(ScoreIncrease.points)).where(
-            ScoreIncrease.student_id == student_id,
-            ScoreIncrease.is_deleted == False
-        )
-    )
-    total_increase = increase_result.scalar() or 0
+    """获取积分汇总（读取物化的积分余额，按主键查询）"""
+    balance = await db.get(StudentScoreBalance, student_id)
+    if balance is None:
+        # 没有余额记录说明该学生还没有任何积分变动
+        return {
+            "available_points": 0,
+            "exchanged_points": 0,
+        }
+
+    return {
+        "available_points": balance.available_points,
+        "exchanged_points": balance.total_exchange,
+    }
 
-    exchange_result = await db.execute(
-        select(func.sum(ScoreExchange.cost_points)).where(
-            ScoreExchange.student_id == student_id,
-            ScoreExchange.is_deleted == False
-        )
-    )
-    total_exchange = exchange_result.scalar() or 0
 
+def _score_totals_query(source: Table, amount_column: str, student_ids: list[int] | None) -> Select:
+    query = (
+        select(source.c.student_id, func.sum(source.c[amount_column]))
+        .join(Student, Student.id == source.c.student_id)
+        .where(source.c.is_deleted == False, Student.is_deleted == False)
+        .group_by(source.c.student_id)
+    )
+    if student_ids is not None:
+        query = query.where(source.c.student_id.in_(student_ids))
+    return query
+
+
+async def _compute_score_totals(
+    db: AsyncSession, student_ids: list[int] | None = None
+) -> dict[int, tuple[int, int]]:
+    """
+    从原始记录计算积分汇总（排除已删除的记录，包括已归档的较早记录），返回 {student_id: (总增加, 总兑换)}
+    已删除学生的记录由后台任务分批标记删除，在此之前也按学生的删除标记排除
+    """
+    increases: dict[int, int] = {}
+    exchanges: dict[int, int] = {}
+    sources = (
+        (ScoreIncrease.__table__, "points", increases),
+        (score_increases_archive, "points", increases),
+        (ScoreExchange.__table__, "cost_points", exchanges),
+        (score_exchanges_archive, "cost_points", exchanges),
+    )
+    for source, amount_column, totals in sources:
+        result = await db.execute(_score_totals_query(source, amount_column, student_ids))
+        for student_id, total in result.all():
+            totals[student_id] = totals.get(student_id, 0) + int(total or 0)
     return {
-        "available_points": total_increase - total_exchange,
-        "exchanged_points": total_exchange,
+        student_id: (increases.get(student_id, 0), exchanges.get(student_id, 0))
+        for student_id in increases.keys() | exchanges.keys()
     }
 
 
-async def get_score_increases(
-    db: AsyncSession, student_id: int, limit: int = 100
-) -> list[ScoreIncrease]:
-    """获取积分增加记录（排除已删除的）"""
+def _insert_balance_if_absent(dialect: str, values: dict[str, int]) -> Insert:
+    """插入积分余额记录，已存在时什么也不做（并发插入同一学生时不会因主键冲突失败）"""
+    if dialect == "mysql":
+        stmt = mysql_insert(StudentScoreBalance).values(**values)
+        return stmt.on_duplicate_key_update(student_id=StudentScoreBalance.student_id)
+    return sqlite_insert(StudentScoreBalance).values(**values).on_conflict_do_nothing(
+        index_elements=[StudentScoreBalance.student_id]
+    )
+
+
+async def _lock_score_balance(db: AsyncSession, student_id: int) -> StudentScoreBalance | None:
     result = await db.execute(
-        select(ScoreIncrease)
+        select(StudentScoreBalance)
+        .where(StudentScoreBalance.student_id == student_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_score_balance_for_update(db: AsyncSession, student_id: int) -> StudentScoreBalance:
+    """
+    获取并锁定学生积分余额（SELECT ... FOR UPDATE）
+    新建学生时已创建余额记录；早期没有余额记录的学生先根据原始记录插入（已存在则忽略），再重新加锁读取，
+    并发的首次积分变动不会重复插入同一主键，也不会在未加锁的数据上检查余额
+    """
+    balance = await _lock_score_balance(db, student_id)
+    if balance is None:
+        totals = await _compute_score_totals(db, [student_id])
+        total_increase, total_exchange = totals.get(student_id, (0, 0))
+        await db.execute(
+            _insert_balance_if_absent(
+                db.get_bind().dialect.name,
+                {
+                    "student_id": student_id,
+                    "total_increase": total_increase,
+                    "total_exchange": total_exchange,
+                    "available_points": total_increase - total_exchange,
+                },
+            )
+        )
+        balance = await _lock_score_balance(db, student_id)
+    return balance
+
+
+async def apply_score_balance_delta(
+    db: AsyncSession, student_id: int, increase: int = 0, exchange: int = 0
+) -> StudentScoreBalance:
+    """
+    在当前事务中调整学生积分余额（加行锁，不 commit，由调用者 commit）
+    如果余额记录不存在，先根据原始记录初始化
+    """
+    balance = await get_score_balance_for_update(db, student_id)
+    balance.total_increase += increase
+    balance.total_exchange += exchange
+    balance.available_points = balance.total_increase - balance.total_exchange
+    return balance
+
+
+async def rebuild_score_balances(db: AsyncSession, student_id: int | None = None) -> int:
+    """根据原始积分记录重建积分余额，返回重建的学生数量（不 commit，由调用者 commit）"""
+    student_query = select(Student.id)
+    if student_id is not None:
+        student_query = student_query.where(Student.id == student_id)
+    student_ids = list((await db.execute(student_query)).scalars().all())
+    if not student_ids:
+        return 0
+
+    totals = await _compute_score_totals(db, student_ids if student_id is not None else None)
+    balance_result = await db.execute(
+        select(StudentScoreBalance)
+        .where(StudentScoreBalance.student_id.in_(student_ids))
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    balances = {b.student_id: b for b in balance_result.scalars().all()}
+
+    for sid in student_ids:
+        total_increase, total_exchange = totals.get(sid, (0, 0))
+        balance = balances.get(sid)
+        if balance is None:
+            balance = StudentScoreBalance(student_id=sid)
+            db.add(balance)
+        balance.total_increase = total_increase
+        balance.total_exchange = total_exchange
+        balance.available_points = total_increase - total_exchange
+
+    await db.flush()
+    return len(student_ids)
+
+
+async def verify_score_balances(db: AsyncSession) -> list[dict[str, int]]:
+    """校验积分余额与原始记录是否一致，返回不一致的学生列表"""
+    student_ids = list((await db.execute(select(Student.id))).scalars().all())
+    totals = await _compute_score_totals(db)
+    balance_result = await db.execute(select(StudentScoreBalance))
+    balances = {b.student_id: b for b in balance_result.scalars().all()}
+
+    mismatches = []
+    for sid in student_ids:
+        expected_increase, expected_exchange = totals.get(sid, (0, 0))
+        balance = balances.get(sid)
+        actual_increase = balance.total_increase if balance else 0
+        actual_exchange = balance.total_exchange if balance else 0
+        actual_available = balance.available_points if balance else 0
+        if (
+            actual_increase != expected_increase
+            or actual_exchange != expected_exchange
+            or actual_available != expected_increase - expected_exchange
+        ):
+            mismatches.append({
+                "student_id": sid,
+                "expected_increase": expected_increase,
+                "expected_exchange": expected_exchange,
+                "actual_increase": actual_increase,
+                "actual_exchange": actual_exchange,
+                "actual_available": actual_available,
+            })
+    return mismatches
+
+
+def _score_increases_query(student_id: int, source: Table = ScoreIncrease.__table__) -> Select:
+    """
+    积分增加记录查询（排除已删除的），同时带出一级/二级项目名称和任务评分
+    source 为热表或归档表（两者的列相同，可以合并查询）
+    """
+    project_level1 = aliased(Project)
+    project_level2 = aliased(Project)
+    return (
+        select(
+            source.c.id,
+            source.c.student_id,
+            source.c.task_id,
+            source.c.project_level1_id,
+            source.c.project_level2_id,
+            source.c.points,
+            source.c.created_at,
+            project_level1.name.label("project_level1_name"),
+            project_level2.name.label("project_level2_name"),
+            Task.rating,
+        )
+        .outerjoin(project_level1, project_level1.id == source.c.project_level1_id)
+        .outerjoin(project_level2, project_level2.id == source.c.project_level2_id)
+        .outerjoin(Task, Task.id == source.c.task_id)
         .where(
-            ScoreIncrease.student_id == student_id,
-            ScoreIncrease.is_deleted == False
+            source.c.student_id == student_id,
+            source.c.is_deleted == False
         )
-        .order_by(ScoreIncrease.created_at.desc())
-        .limit(limit)
     )
-    return list(result.scalars().all())
+
+
+def _score_increases_page(
+    student_id: int, before: tuple[datetime, int] | None, limit: int | None, include_archived: bool
+) -> Select:
+    queries = [_score_increases_query(student_id)]
+    if include_archived:
+        queries.append(_score_increases_query(student_id, score_increases_archive))
+    return apply_keyset_union(queries, before, limit)
+
+
+async def get_score_increases_with_details(
+    db: AsyncSession,
+    student_id: int,
+    limit: int = 100,
+    before: tuple[datetime, int] | None = None,
+    include_archived: bool = False,
+) -> list[Row]:
+    """
+    获取积分增加记录（排除已删除的），一次查询同时带出一级/二级项目名称和任务评分
+    按 (created_at, id) 倒序，before 为上一页最后一条记录的 (created_at, id)；
+    include_archived 时合并归档表中的较早记录（全部历史）
+    """
+    result = await db.execute(_score_increases_page(student_id, before, limit, include_archived))
+    return list(result.all())
+
+
+async def stream_score_increases(
+    db: AsyncSession,
+    student_id: int,
+    before: tuple[datetime, int] | None = None,
+    limit: int | None = None,
+    include_archived: bool = False,
+) -> AsyncIterator[Row]:
+    """流式读取积分增加记录（服务端游标，不一次性加载到内存）"""
+    result = await db.stream(_score_increases_page(student_id, before, limit, include_archived))
+    async for row in result:
+        yield row
 
 
 async def get_reward_exchange_options(db: AsyncSession, user_id: int) -> list[RewardExchangeOption]:
@@ -81,6 +295,7 @@ async def create_reward_exchange_option(
     db.add(db_option)
     await db.commit()
     await db.refresh(db_option)
+    await invalidate_user_context(user_id)
     return db_option
 
 
@@ -98,6 +313,7 @@ async def update_reward_exchange_option(
 
     await db.commit()
     await db.refresh(db_option)
+    await invalidate_user_context(user_id)
     return db_option
 
 
@@ -115,31 +331,82 @@ async def delete_reward_exchange_option(db: AsyncSession, option_id: int, user_i
     exchange_result = await db.execute(exchange_query)
     exchanges = exchange_result.scalars().all()
     
+    # 已归档的兑换记录也引用该奖励选项（恢复到热表时需要外键存在）
+    archived_count = (
+        await db.execute(
+            select(func.count()).select_from(score_exchanges_archive)
+            .where(score_exchanges_archive.c.reward_option_id == option_id)
+        )
+    ).scalar_one()
+    
     # 如果有引用，抛出异常
-    if exchanges:
+    if exchanges or archived_count:
         from fastapi import HTTPException
         raise HTTPException(
             status_code=400,
-            detail=f"无法删除奖励选项：该选项已被 {len(exchanges)} 条兑换记录引用，请先删除相关兑换记录"
+            detail=f"无法删除奖励选项：该选项已被 {len(exchanges) + archived_count} 条兑换记录引用，请先删除相关兑换记录"
         )
 
     await db.delete(db_option)
     await db.commit()
+    await invalidate_user_context(user_id)
     return True
 
 
-async def get_score_exchanges(db: AsyncSession, student_id: int, limit: int = 100) -> list[ScoreExchange]:
-    """获取积分兑换记录（排除已删除的）"""
-    result = await db.execute(
-        select(ScoreExchange)
+def _score_exchanges_query(student_id: int, source: Table = ScoreExchange.__table__) -> Select:
+    """积分兑换记录查询（排除已删除的），同时带出奖励名称；source 为热表或归档表"""
+    return (
+        select(
+            source.c.id,
+            source.c.student_id,
+            source.c.reward_option_id,
+            source.c.cost_points,
+            source.c.created_at,
+            RewardExchangeOption.name.label("reward_name"),
+        )
+        .outerjoin(RewardExchangeOption, RewardExchangeOption.id == source.c.reward_option_id)
         .where(
-            ScoreExchange.student_id == student_id,
-            ScoreExchange.is_deleted == False
+            source.c.student_id == student_id,
+            source.c.is_deleted == False
         )
-        .order_by(ScoreExchange.created_at.desc())
-        .limit(limit)
     )
-    return list(result.scalars().all())
+
+
+def _score_exchanges_page(
+    student_id: int, before: tuple[datetime, int] | None, limit: int | None, include_archived: bool
+) -> Select:
+    queries = [_score_exchanges_query(student_id)]
+    if include_archived:
+        queries.append(_score_exchanges_query(student_id, score_exchanges_archive))
+    return apply_keyset_union(queries, before, limit)
+
+
+async def get_score_exchanges_with_details(
+    db: AsyncSession,
+    student_id: int,
+    limit: int = 100,
+    before: tuple[datetime, int] | None = None,
+    include_archived: bool = False,
+) -> list[Row]:
+    """
+    获取积分兑换记录（排除已删除的），一次查询同时带出奖励名称，按 (created_at, id) 倒序分页
+    include_archived 时合并归档表中的较早记录（全部历史）
+    """
+    result = await db.execute(_score_exchanges_page(student_id, before, limit, include_archived))
+    return list(result.all())
+
+
+async def stream_score_exchanges(
+    db: AsyncSession,
+    student_id: int,
+    before: tuple[datetime, int] | None = None,
+    limit: int | None = None,
+    include_archived: bool = False,
+) -> AsyncIterator[Row]:
+    """流式读取积分兑换记录（服务端游标，不一次性加载到内存）"""
+    result = await db.stream(_score_exchanges_page(student_id, before, limit, include_archived))
+    async for row in result:
+        yield row
 
 
 async def create_score_exchange(
@@ -151,20 +418,25 @@ async def create_score_exchange(
     if not reward_option:
         raise ValueError("奖励选项不存在")
 
-    # 检查可用积分
-    summary = await get_score_summary(db, student_id)
-    if summary["available_points"] < reward_option.cost_points:
+    # 检查可用积分（锁定余额记录，避免并发兑换超额扣减）
+    balance = await get_score_balance_for_update(db, student_id)
+    if balance.available_points < reward_option.cost_points:
         raise ValueError("可用积分不足")
 
-    # 创建兑换记录
+    # 创建兑换记录，并在同一事务中扣减余额
     db_exchange = ScoreExchange(
         student_id=student_id,
         reward_option_id=exchange.reward_option_id,
         cost_points=reward_option.cost_points,
     )
     db.add(db_exchange)
+    balance.total_exchange += reward_option.cost_points
+    balance.available_points = balance.total_increase - balance.total_exchange
     await db.commit()
     await db.refresh(db_exchange)
+
+    from app.crud.dashboard import invalidate_dashboard_cache_for_student
+    await invalidate_dashboard_cache_for_student(db, student_id)
     return db_exchange
 
 
@@ -198,6 +470,7 @@ async def create_punishment_option(
     db.add(db_option)
     await db.commit()
     await db.refresh(db_option)
+    await invalidate_user_context(user_id)
     return db_option
 
 
@@ -214,6 +487,7 @@ async def update_punishment_option(
 
     await db.commit()
     await db.refresh(db_option)
+    await invalidate_user_context(user_id)
     return db_option
 
 
@@ -241,5 +515,6 @@ async def delete_punishment_option(db: AsyncSession, option_id: int, user_id: in
 
     await db.delete(db_option)
     await db.commit()
+    await invalidate_user_context(user_id)
     return True
 
@@ -4,10 +4,17 @@ from typing import List
 from sqlalchemy import Select, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
+from app.core.jobs import JobContext, job_runner
 from app.models.student import Student
-from app.models.task_and_score import Task, ScoreIncrease, ScoreExchange
+from app.models.task_and_score import Task, ScoreIncrease, ScoreExchange, StudentScoreBalance
 from app.schemas.student import StudentCreate, StudentUpdate
 
+STUDENT_SOFT_DELETE_JOB = "student_soft_delete"
+
+# 学生删除后由后台任务依次标记删除的记录
+_CASCADE_MODELS = (Task, ScoreIncrease, ScoreExchange)
+
 
 async def get_students_by_user(db: AsyncSession, user_id: int) -> List[Student]:
     """获取用户的所有学生（排除已删除的）"""
@@ -70,8 +77,13 @@ async def create_student(db: AsyncSession, user_id: int, obj_in: StudentCreate)
         **obj_in.model_dump(),
     )
     db.add(db_obj)
+    await db.flush()
+    # 在同一事务中创建积分余额记录，之后的积分变动都能直接锁定这一行
+    # （没有这一行时两个并发的首次积分变动都会尝试插入同一主键）
+    db.add(StudentScoreBalance(student_id=db_obj.id, total_increase=0, total_exchange=0, available_points=0))
     await db.commit()
     await db.refresh(db_obj)
+    await _invalidate_dashboard_cache(user_id)
     return db_obj
 
 
@@ -98,13 +110,15 @@ async def update_student(db: AsyncSession, db_obj: Student, obj_in: StudentUpdat
     db.add(db_obj)
     await db.commit()
     await db.refresh(db_obj)
+    await _invalidate_dashboard_cache(db_obj.user_id)
     return db_obj
 
 
 async def delete_student(db: AsyncSession, student_id: int, user_id: int) -> None:
     """
-    逻辑删除学生及其所有相关记录
-    包括：任务、积分增加记录、积分兑换记录
+    逻辑删除学生及其所有相关记录（任务、积分增加记录、积分兑换记录）
+    学生记录在请求中立即标记删除，之后所有读取都会通过学生的删除标记排除其数据；
+    相关记录数量可能很多，由后台任务分批标记删除，不在请求事务中长时间持有行锁
     """
     # 检查学生是否存在且属于当前用户
     student = await get_student_by_id(db, student_id, user_id)
@@ -117,27 +131,74 @@ async def delete_student(db: AsyncSession, student_id: int, user_id: int) -> Non
     student.is_deleted = True
     student.deleted_at = now
     
-    # 逻辑删除所有相关任务
-    await db.execute(
-        update(Task)
-        .where(Task.student_id == student_id)
-        .values(is_deleted=True, deleted_at=now)
-    )
-    
-    # 逻辑删除所有积分增加记录
+    # 所有积分记录都会被删除，积分余额清零
     await db.execute(
-        update(ScoreIncrease)
-        .where(ScoreIncrease.student_id == student_id)
-        .values(is_deleted=True, deleted_at=now)
+        update(StudentScoreBalance)
+        .where(StudentScoreBalance.student_id == student_id)
+        .values(total_increase=0, total_exchange=0, available_points=0)
     )
     
-    # 逻辑删除所有积分兑换记录
-    await db.execute(
-        update(ScoreExchange)
-        .where(ScoreExchange.student_id == student_id)
-        .values(is_deleted=True, deleted_at=now)
+    # 与学生的删除标记在同一事务中创建后台任务，保证提交后一定会执行
+    await job_runner.enqueue(
+        db,
+        STUDENT_SOFT_DELETE_JOB,
+        f"{STUDENT_SOFT_DELETE_JOB}:{student_id}",
+        {"student_id": student_id, "deleted_at": now.isoformat()},
     )
     
     await db.commit()
+    job_runner.notify()
+    await _invalidate_dashboard_cache(user_id)
+
+
+async def cascade_student_soft_delete(context: JobContext) -> None:
+    """
+    后台任务：分批逻辑删除学生的任务、积分增加记录和积分兑换记录
+    按主键分批，每批一个短事务，进度随该批修改一起提交；只处理尚未删除的记录，重复执行是安全的
+    """
+    student_id: int = context.payload["student_id"]
+    deleted_at = datetime.fromisoformat(context.payload["deleted_at"])
+    chunk_size = get_settings().SOFT_DELETE_CHUNK_SIZE
+
+    async with context.session_maker() as db:
+        student = await db.get(Student, student_id)
+    if student is None or not student.is_deleted:
+        # 学生已不存在或已恢复，不再处理
+        return
+
+    for model in _CASCADE_MODELS:
+        table = model.__tablename__
+        progress = context.progress.get(table, {"updated": 0, "done": False})
+        while not progress["done"]:
+            async with context.session_maker() as db:
+                ids = (
+                    await db.execute(
+                        select(model.id)
+                        .where(model.student_id == student_id, model.is_deleted == False)
+                        .order_by(model.id)
+                        .limit(chunk_size)
+                    )
+                ).scalars().all()
+                updated = 0
+                if ids:
+                    result = await db.execute(
+                        update(model)
+                        .where(model.id.in_(ids), model.is_deleted == False)
+                        .values(is_deleted=True, deleted_at=deleted_at)
+                    )
+                    updated = result.rowcount
+                progress = {"updated": progress["updated"] + updated, "done": len(ids) < chunk_size}
+                await context.save_progress(db, table, progress)
+                await db.commit()
+
+
+job_runner.register(STUDENT_SOFT_DELETE_JOB, cascade_student_soft_delete)
+
+
+async def _invalidate_dashboard_cache(user_id: int) -> None:
+    """学生变动后使首页数据缓存失效（延迟导入，避免与 crud.dashboard 循环导入）"""
+    from app.crud.dashboard import invalidate_dashboard_cache
+
+    await invalidate_dashboard_cache(user_id)
 
 
@@ -1,26 +1,40 @@
 from datetime import datetime, timezone
+from typing import AsyncIterator
 
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from app.crud.dashboard import invalidate_dashboard_cache_for_student
 from app.models.project import Project
 from app.models.task_and_score import PunishmentOption, Task, TaskStatus
 from app.schemas.task import TaskCreate, TaskUpdate
+from app.utils.pagination import apply_keyset
 
 
-async def get_tasks(
-    db: AsyncSession,
+def _tasks_query(
     student_id: int,
     project_level1_id: int | None = None,
     project_level2_id: int | None = None,
     status: list[str] | str | None = None,
     include_all_status: bool = False,
     completed_after: datetime | None = None,
-) -> list[Task]:
-    """获取任务列表（默认只返回未开始和进行中的，排除已删除的）"""
-    query = select(Task).where(
-        Task.student_id == student_id,
-        Task.is_deleted == False
+):
+    """任务查询（默认只返回未开始和进行中的，排除已删除的），同时带出一级/二级项目名称"""
+    project_level1 = aliased(Project)
+    project_level2 = aliased(Project)
+    query = (
+        select(
+            Task,
+            project_level1.name.label("project_level1_name"),
+            project_level2.name.label("project_level2_name"),
+        )
+        .outerjoin(project_level1, project_level1.id == Task.project_level1_id)
+        .outerjoin(project_level2, project_level2.id == Task.project_level2_id)
+        .where(
+            Task.student_id == student_id,
+            Task.is_deleted == False
+        )
     )
 
     if project_level1_id is not None:
@@ -46,28 +60,66 @@ async def get_tasks(
         # 默认只显示未开始和进行中的
         query = query.where(Task.status.in_([TaskStatus.NOT_STARTED, TaskStatus.IN_PROGRESS]))
 
-    result = await db.execute(query.order_by(Task.created_at.desc()))
-    tasks = list(result.scalars().all())
+    return query
 
-    if not tasks:
-        return tasks
 
-    project_ids: set[int] = set()
-    for task in tasks:
-        project_ids.add(task.project_level1_id)
-        if task.project_level2_id:
-            project_ids.add(task.project_level2_id)
+def _with_project_names(row) -> Task:
+    task, project_level1_name, project_level2_name = row
+    setattr(task, "project_level1_name", project_level1_name)
+    setattr(task, "project_level2_name", project_level2_name)
+    return task
+
+
+async def get_tasks(
+    db: AsyncSession,
+    student_id: int,
+    project_level1_id: int | None = None,
+    project_level2_id: int | None = None,
+    status: list[str] | str | None = None,
+    include_all_status: bool = False,
+    completed_after: datetime | None = None,
+    limit: int | None = None,
+    before: tuple[datetime, int] | None = None,
+) -> list[Task]:
+    """
+    获取任务列表（默认只返回未开始和进行中的，排除已删除的）
+    按 (created_at, id) 倒序；指定 limit/before 时按游标分页
+    """
+    query = _tasks_query(
+        student_id,
+        project_level1_id=project_level1_id,
+        project_level2_id=project_level2_id,
+        status=status,
+        include_all_status=include_all_status,
+        completed_after=completed_after,
+    )
+    result = await db.execute(apply_keyset(query, Task.created_at, Task.id, before, limit))
+    return [_with_project_names(row) for row in result.all()]
 
-    if project_ids:
-        project_result = await db.execute(
-            select(Project.id, Project.name).where(Project.id.in_(project_ids))
-        )
-        project_map = {row.id: row.name for row in project_result.all()}
-        for task in tasks:
-            setattr(task, "project_level1_name", project_map.get(task.project_level1_id))
-            setattr(task, "project_level2_name", project_map.get(task.project_level2_id))
 
-    return tasks
+async def stream_tasks(
+    db: AsyncSession,
+    student_id: int,
+    project_level1_id: int | None = None,
+    project_level2_id: int | None = None,
+    status: list[str] | str | None = None,
+    include_all_status: bool = False,
+    completed_after: datetime | None = None,
+    limit: int | None = None,
+    before: tuple[datetime, int] | None = None,
+) -> AsyncIterator[Task]:
+    """流式读取任务列表（服务端游标，不一次性加载到内存），过滤条件同 get_tasks"""
+    query = _tasks_query(
+        student_id,
+        project_level1_id=project_level1_id,
+        project_level2_id=project_level2_id,
+        status=status,
+        include_all_status=include_all_status,
+        completed_after=completed_after,
+    )
+    result = await db.stream(apply_keyset(query, Task.created_at, Task.id, before, limit))
+    async for row in result:
+        yield _with_project_names(row)
 
 
 async def get_task_by_id(db: AsyncSession, task_id: int, student_id: int) -> Task | None:
@@ -92,6 +144,7 @@ async def create_task(db: AsyncSession, task: TaskCreate) -> Task:
     
     await db.commit()
     await db.refresh(db_task)
+    await invalidate_dashboard_cache_for_student(db, db_task.student_id)
     return db_task
 
 
@@ -117,16 +170,19 @@ async def update_task(db: AsyncSession, task_id: int, task_update: TaskUpdate, s
 
     await db.commit()
     await db.refresh(db_task)
+    await invalidate_dashboard_cache_for_student(db, student_id)
     return db_task
 
 
 async def _handle_task_completion(db: AsyncSession, task: Task) -> None:
     """处理任务完成时的逻辑：生成积分记录和惩罚任务"""
+    from app.crud.score import apply_score_balance_delta
     from app.models.task_and_score import ScoreIncrease
     from app.models.task_and_score import Task as TaskModel
 
-    # 1. 如果奖励积分 > 0，生成积分增加记录
+    # 1. 如果奖励积分 > 0，生成积分增加记录，并在同一事务中更新积分余额
     if task.reward_type == "reward" and task.reward_points and task.reward_points > 0:
+        await apply_score_balance_delta(db, task.student_id, increase=task.reward_points)
         score_increase = ScoreIncrease(
             student_id=task.student_id,
             task_id=task.id,
@@ -3,7 +3,7 @@ from typing import Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.models.user import User
 from app.schemas.user import UserCreate
 
@@ -20,7 +20,7 @@ async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
 async def create_user(db: AsyncSession, obj_in: UserCreate, is_admin: bool = False) -> User:
     db_obj = User(
         email=obj_in.email,
-        hashed_password=get_password_hash(obj_in.password),
+        hashed_password=await get_password_hash_async(obj_in.password),
         is_admin=is_admin,
     )
     db.add(db_obj)
@@ -0,0 +1,72 @@
+"""
+归档已删除的记录和较早的积分记录 / 按学生恢复归档记录
+
+分批在线执行，可以在业务运行时定时执行（例如每天凌晨 cron）。
+
+用法：
+    python3 -m app.db.archive                       # 归档
+    python3 -m app.db.archive --dry-run             # 只统计各表应归档的记录数，不修改
+    python3 -m app.db.archive --restore-student 12  # 把学生 12 的归档记录（含学生本身）移回热表
+"""
+import argparse
+import asyncio
+
+from app.core.config import get_settings
+from app.crud import archive as archive_crud
+from app.db.session import async_session_maker
+
+
+async def dry_run() -> None:
+    async with async_session_maker() as session:
+        for target in archive_crud.ARCHIVE_TARGETS:
+            count = await archive_crud.count_archivable(session, target)
+            print(f"  - {target.name}: {count} 条应归档")
+
+
+async def archive(batch_size: int, pause: float) -> None:
+    """逐表分批归档，每批一个事务"""
+    for target in archive_crud.ARCHIVE_TARGETS:
+        total = 0
+        while True:
+            async with async_session_maker() as session:
+                moved = await archive_crud.archive_batch(session, target, batch_size)
+                await session.commit()
+            total += moved
+            if moved < batch_size:
+                break
+            await asyncio.sleep(pause)
+        print(f"✓ {target.name}: 已归档 {total} 条")
+
+
+async def restore_student(student_id: int, batch_size: int) -> None:
+    """先恢复学生和任务，再恢复积分记录（热表外键要求被引用的记录先存在）"""
+    for target in reversed(archive_crud.ARCHIVE_TARGETS):
+        total = 0
+        while True:
+            async with async_session_maker() as session:
+                moved = await archive_crud.restore_batch(session, target, student_id, batch_size)
+                await session.commit()
+            total += moved
+            if moved < batch_size:
+                break
+        print(f"✓ {target.name}: 已恢复 {total} 条")
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="归档已删除的记录和较早的积分记录")
+    parser.add_argument("--dry-run", action="store_true", help="只统计应归档的记录数，不修改")
+    parser.add_argument("--restore-student", type=int, default=None, help="把指定学生的归档记录移回热表")
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.dry_run:
+        asyncio.run(dry_run())
+    elif args.restore_student is not None:
+        asyncio.run(restore_student(args.restore_student, args.batch_size))
+    else:
+        asyncio.run(archive(args.batch_size, settings.ARCHIVE_BATCH_PAUSE))
+
+
+if __name__ == "__main__":
+    main()
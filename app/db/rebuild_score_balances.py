@@ -0,0 +1,58 @@
+"""
+重建/校验学生积分余额
+
+用法：
+    python3 -m app.db.rebuild_score_balances            # 根据原始记录重建所有学生的积分余额
+    python3 -m app.db.rebuild_score_balances --verify   # 只校验，不修改
+    python3 -m app.db.rebuild_score_balances --student-id 12
+"""
+import argparse
+import asyncio
+import sys
+
+from app.crud import score as score_crud
+from app.db.session import async_session_maker
+
+
+async def rebuild(student_id: int | None = None) -> None:
+    """根据积分增加/兑换记录重建积分余额"""
+    async with async_session_maker() as session:
+        count = await score_crud.rebuild_score_balances(session, student_id=student_id)
+        await session.commit()
+        print(f"✓ 已重建 {count} 个学生的积分余额")
+
+
+async def verify() -> bool:
+    """校验积分余额与原始记录是否一致"""
+    async with async_session_maker() as session:
+        mismatches = await score_crud.verify_score_balances(session)
+
+    if not mismatches:
+        print("✓ 积分余额校验通过")
+        return True
+
+    print(f"⚠️ 发现 {len(mismatches)} 个学生的积分余额不一致：")
+    for item in mismatches:
+        print(
+            f"  - student_id={item['student_id']}: "
+            f"增加 {item['actual_increase']}（应为 {item['expected_increase']}），"
+            f"兑换 {item['actual_exchange']}（应为 {item['expected_exchange']}），"
+            f"可用 {item['actual_available']}"
+        )
+    return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="重建/校验学生积分余额")
+    parser.add_argument("--verify", action="store_true", help="只校验，不修改")
+    parser.add_argument("--student-id", type=int, default=None, help="只重建指定学生")
+    args = parser.parse_args()
+
+    if args.verify:
+        ok = asyncio.run(verify())
+        sys.exit(0 if ok else 1)
+    asyncio.run(rebuild(args.student_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+读写分离路由
+
+配置了只读副本时，只读接口的查询发往副本；
+用户的请求提交了事务后的 DB_REPLICA_STICKY_SECONDS 秒内，该用户的读请求仍然走主库（read-your-writes）。
+写操作记录必须保存在多个 worker 共享的缓存后端中（写请求和之后的读请求可能由不同的 worker 处理），
+所以配置了只读副本时要求 CACHE_BACKEND=redis，否则拒绝启动。
+"""
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheBackend, create_cache_backend
+from app.core.config import get_settings
+from app.db.session import replica_session_maker
+
+
+class ReadYourWritesTracker:
+    def __init__(self, backend: CacheBackend, window: int):
+        self.backend = backend
+        self.window = window
+
+    def _key(self, user_id: int) -> str:
+        return f"recent-write:{user_id}"
+
+    async def mark_write(self, user_id: int) -> None:
+        await self.backend.set(self._key(user_id), b"1", self.window)
+
+    async def recently_wrote(self, user_id: int) -> bool:
+        return await self.backend.get(self._key(user_id)) is not None
+
+
+settings = get_settings()
+
+if replica_session_maker is not None and settings.CACHE_BACKEND != "redis":
+    raise RuntimeError(
+        "配置了 SQLALCHEMY_REPLICA_DATABASE_URI 时必须使用共享缓存（CACHE_BACKEND=redis），"
+        "否则其他 worker 不知道用户刚发生过写操作，会从副本读到旧数据"
+    )
+
+# 未配置副本时不需要记录写操作
+write_tracker = (
+    ReadYourWritesTracker(create_cache_backend(shared_only=True), settings.DB_REPLICA_STICKY_SECONDS)
+    if replica_session_maker is not None
+    else None
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_commit(session: Session) -> None:
+    session.info["committed"] = True
+
+
+def session_committed(db: AsyncSession) -> bool:
+    """该会话是否提交过事务（只读请求不会提交，不应使用户的读请求改走主库）"""
+    return bool(db.info.get("committed"))
+
+
+async def mark_user_write(user_id: int) -> None:
+    """记录用户发生了写操作"""
+    if write_tracker is not None:
+        await write_tracker.mark_write(user_id)
+
+
+async def should_use_replica(user_id: int) -> bool:
+    """判断该用户的只读请求是否可以发往副本"""
+    if write_tracker is None:
+        return False
+    return not await write_tracker.recently_wrote(user_id)
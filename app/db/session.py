@@ -1,5 +1,10 @@
+import os
+import time
+
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import get_settings
 
@@ -8,11 +13,62 @@ class Base(DeclarativeBase):
     pass
 
 
+class PoolWaitStats:
+    """记录从连接池获取连接的等待时间（当前 worker 进程）"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """统计获取连接等待时间的连接池"""
+
+    @property
+    def wait_stats(self) -> PoolWaitStats:
+        if not hasattr(self, "_wait_stats"):
+            self._wait_stats = PoolWaitStats()
+        return self._wait_stats
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        self.wait_stats.record(time.perf_counter() - started_at)
+        return connection
+
+
 settings = get_settings()
 
+
+def _engine_options(database_uri: str) -> dict:
+    """根据配置生成引擎参数（SQLite 不使用连接池大小相关参数）"""
+    options: dict = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if database_uri.startswith("sqlite"):
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
 engine = create_async_engine(
     settings.SQLALCHEMY_DATABASE_URI,
-    pool_pre_ping=True,
+    **_engine_options(settings.SQLALCHEMY_DATABASE_URI),
 )
 
 async_session_maker = async_sessionmaker[AsyncSession](
@@ -21,9 +77,54 @@ async_session_maker = async_sessionmaker[AsyncSession](
     expire_on_commit=False,
 )
 
+# 只读副本（可选）
+replica_engine = (
+    create_async_engine(
+        settings.SQLALCHEMY_REPLICA_DATABASE_URI,
+        **_engine_options(settings.SQLALCHEMY_REPLICA_DATABASE_URI),
+    )
+    if settings.SQLALCHEMY_REPLICA_DATABASE_URI
+    else None
+)
+
+replica_session_maker = (
+    async_sessionmaker[AsyncSession](
+        bind=replica_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    if replica_engine is not None
+    else None
+)
+
+
+def _pool_stats(pool) -> dict:
+    stats: dict = {"pool_class": type(pool).__name__}
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        wait_stats = pool.wait_stats
+        checkouts = wait_stats.checkouts or 1
+        stats.update(
+            pool_size=pool.size(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            checkouts=wait_stats.checkouts,
+            timeouts=wait_stats.timeouts,
+            wait_avg_ms=round(wait_stats.wait_total / checkouts * 1000, 2),
+            wait_max_ms=round(wait_stats.wait_max * 1000, 2),
+        )
+    return stats
+
+
+def get_pool_stats() -> dict:
+    """连接池状态：已签出/溢出连接数和获取连接的等待时间"""
+    stats = {"worker_pid": os.getpid(), **_pool_stats(engine.pool)}
+    if replica_engine is not None:
+        stats["replica"] = _pool_stats(replica_engine.pool)
+    return stats
+
 
 async def get_db() -> AsyncSession:
     async with async_session_maker() as session:
         yield session
-
-
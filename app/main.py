@@ -1,14 +1,42 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.api import api_router
 from app.core.config import get_settings
+from app.core.jobs import job_runner
+from app.core.llm_gateway import llm_gateway
+from app.core.oauth_client import oauth_client
+from app.core.stt import stt_backend
+from app.utils.name_index import warn_if_pinyin_unavailable
+from app.utils.wechat_jssdk import close_wechat_token_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 大模型客户端在应用生命周期内复用同一个连接池
+    await llm_gateway.start()
+    # 第三方登录接口同样复用一个连接池
+    await oauth_client.start()
+    # 本地语音识别在启动时加载模型并预热
+    await stt_backend.start()
+    # 后台任务执行循环（学生删除后分批标记相关记录等）
+    await job_runner.start()
+    # 名称的同音字纠错依赖 pypinyin，缺少时提示
+    warn_if_pinyin_unavailable()
+    yield
+    await job_runner.close()
+    await stt_backend.close()
+    await llm_gateway.close()
+    await oauth_client.close()
+    await close_wechat_token_service()
 
 
 def create_app() -> FastAPI:
     settings = get_settings()
 
-    app = FastAPI(title=settings.PROJECT_NAME, version="0.1.0")
+    app = FastAPI(title=settings.PROJECT_NAME, version="0.1.0", lifespan=lifespan)
 
     # CORS for web / WeChat browser
     # 处理 CORS 配置，同时支持带斜杠和不带斜杠的 Origin
@@ -54,6 +82,8 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # 游标分页通过响应头返回下一页游标
+        expose_headers=["X-Next-Cursor"],
     )
 
     app.include_router(api_router, prefix=settings.API_V1_STR)
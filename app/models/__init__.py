@@ -1,4 +1,11 @@
 from app.db.session import Base  # noqa: F401
+from app.models.archive import (  # noqa: F401
+    score_exchanges_archive,
+    score_increases_archive,
+    students_archive,
+    tasks_archive,
+)
+from app.models.job import BackgroundJob  # noqa: F401
 from app.models.project import Project  # noqa: F401
 from app.models.student import Student  # noqa: F401
 from app.models.system import SystemSettings  # noqa: F401
@@ -7,6 +14,7 @@ from app.models.task_and_score import (  # noqa: F401
     RewardExchangeOption,
     ScoreExchange,
     ScoreIncrease,
+    StudentScoreBalance,
     Task,
 )
 from app.models.user import User  # noqa: F401
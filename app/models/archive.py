@@ -0,0 +1,55 @@
+"""
+归档表
+
+已删除超过一定时间的记录和较早的积分记录从热表移到对应的 *_archive 表（见 app.crud.archive），
+热表只保留近期的有效数据。归档表与热表列相同（主键不变，可以原样恢复），另加 archived_at；
+归档表不建外键，学生、任务等被归档后，引用它们的归档记录仍然保留。
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, Table
+
+from app.db.session import Base
+from app.models.student import Student
+from app.models.task_and_score import ScoreExchange, ScoreIncrease, Task
+
+
+def _archive_table(source: Table, *indexes: Index) -> Table:
+    """按热表的列定义创建归档表（不复制外键、默认值和索引）"""
+    name = f"{source.name}_archive"
+    # 外键列的类型要等被引用的表加载后才能确定，这些外键引用的都是整数主键
+    columns = [
+        Column(
+            column.name,
+            Integer() if column.foreign_keys else column.type,
+            primary_key=column.primary_key,
+            nullable=column.nullable,
+            autoincrement=False,
+        )
+        for column in source.columns
+    ]
+    return Table(
+        name,
+        Base.metadata,
+        *columns,
+        Column("archived_at", DateTime(timezone=True), nullable=False),
+        *indexes,
+    )
+
+
+students_archive = _archive_table(
+    Student.__table__,
+    Index("ix_students_archive_user_id", "user_id"),
+)
+tasks_archive = _archive_table(
+    Task.__table__,
+    # 按学生恢复
+    Index("ix_tasks_archive_student_id", "student_id"),
+)
+# 积分记录的“全部历史”查询与热表合并：WHERE student_id = ? AND is_deleted = 0 ORDER BY created_at DESC, id DESC
+score_increases_archive = _archive_table(
+    ScoreIncrease.__table__,
+    Index("ix_score_increases_archive_student_deleted_created", "student_id", "is_deleted", "created_at", "id"),
+)
+score_exchanges_archive = _archive_table(
+    ScoreExchange.__table__,
+    Index("ix_score_exchanges_archive_student_deleted_created", "student_id", "is_deleted", "created_at", "id"),
+)
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+from app.utils.time import utcnow
+
+
+class JobStatus(str):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class BackgroundJob(Base):
+    """
+    后台任务（由 app.core.jobs.JobRunner 执行）
+    与触发它的写操作在同一事务中创建，进程重启后未完成的任务会继续执行
+    """
+
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # 取待执行的任务：WHERE status = ? AND run_after <= ? ORDER BY run_after
+        Index("ix_background_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    # 去重键：同一个操作重复提交时只创建一个任务，例如 student_soft_delete:12
+    dedupe_key: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
+    payload: Mapped[str] = mapped_column(Text, nullable=False, default="{}")  # JSON
+
+    status: Mapped[str] = mapped_column(String(16), default=JobStatus.PENDING, nullable=False)
+    # 执行进度（JSON，由任务处理函数维护，重试时从记录的进度继续）
+    progress: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # 下次可以执行的时间（失败重试时按退避时间推后）
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+    # 执行中的任务由 locked_by 持有到 locked_until，进程异常退出后租约过期，其他进程可以接手
+    locked_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=utcnow,
+        nullable=False,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=utcnow,
+        onupdate=utcnow,
+        nullable=False,
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -41,6 +41,15 @@ class TaskStatus(str):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # 任务列表：按学生过滤未删除的任务，按 (created_at, id) 倒序分页，status 在索引中过滤
+        Index("ix_tasks_student_deleted_created", "student_id", "is_deleted", "created_at", "id", "status"),
+        # 首页评分统计：按学生统计最近完成的任务（覆盖索引，不需要回表）
+        Index(
+            "ix_tasks_student_status_updated",
+            "student_id", "is_deleted", "status", "updated_at", "project_level1_id", "rating",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -81,6 +90,10 @@ class Task(Base):
 
 class ScoreIncrease(Base):
     __tablename__ = "score_increases"
+    __table_args__ = (
+        # 积分增加记录：按学生过滤未删除的记录，按 (created_at, id) 倒序分页
+        Index("ix_score_increases_student_deleted_created", "student_id", "is_deleted", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -121,6 +134,10 @@ class RewardExchangeOption(Base):
 
 class ScoreExchange(Base):
     __tablename__ = "score_exchanges"
+    __table_args__ = (
+        # 积分兑换记录：按学生过滤未删除的记录，按 (created_at, id) 倒序分页
+        Index("ix_score_exchanges_student_deleted_created", "student_id", "is_deleted", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -142,3 +159,28 @@ class ScoreExchange(Base):
     )
 
 
+
+
+class StudentScoreBalance(Base):
+    """
+    学生积分余额（物化汇总）
+    与积分增加/兑换记录在同一事务中维护，避免每次汇总都 SUM 全部历史记录
+    """
+
+    __tablename__ = "student_score_balances"
+
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("students.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    total_increase: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_exchange: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    available_points: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=utcnow,
+        onupdate=utcnow,
+        nullable=False,
+    )
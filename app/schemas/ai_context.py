@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+
+
+class ContextProject(BaseModel):
+    """上下文中的项目"""
+    id: int
+    name: str
+    level: int
+    parent_id: int | None = None
+
+
+class ContextOption(BaseModel):
+    """上下文中的惩罚/兑换选项"""
+    id: int
+    name: str
+    cost_points: int | None = None  # 兑换选项所需积分
+
+
+class UserContextSnapshot(BaseModel):
+    """语音助手的用户上下文快照"""
+    prompt: str  # 拼接在系统提示词之后的上下文
+    projects: list[ContextProject]
+    punishment_options: list[ContextOption]
+    reward_options: list[ContextOption]
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+
+from app.schemas.student import StudentRead
+
+
+class TaskRatingSummary(BaseModel):
+    """任务评分汇总"""
+    project_level1_id: int
+    project_level1_name: str
+    ratings: dict[str, int]  # {"A*": 3, "A": 2, "B": 1}
+
+
+class StudentDashboard(BaseModel):
+    """学生首页数据"""
+    student: StudentRead
+    score_summary: dict[str, int]  # {"available_points": 100, "exchanged_points": 20}
+    task_rating_summary: list[TaskRatingSummary]  # 最近1个月的任务评分汇总
+
+
+class DashboardResponse(BaseModel):
+    """首页响应"""
+    students: list[StudentDashboard]
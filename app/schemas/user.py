@@ -40,3 +40,14 @@ class TokenData(BaseModel):
     sub: str | None = None
 
 
+class CurrentUser(BaseModel):
+    """当前登录用户的轻量快照（不可变），用于鉴权缓存，避免每个请求都查询用户表"""
+    id: int
+    is_active: bool
+    is_admin: bool
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
@@ -0,0 +1,438 @@
+"""
+语音识别的音频上传与分段
+
+- 直接解析请求体中的 multipart 数据流，边接收边写入 AudioSpool，不在内存中保留整个文件
+- 根据 Content-Length 和 WAV 文件头提前拒绝过大、过长的上传，不必等接收完
+- AudioSpool 先写内存，超过单个请求的上限或当前 worker 的总额度后改写临时文件
+- 较长的录音在静音处切分成多段 WAV，分别识别后拼接（非 WAV 格式需要先用 ffmpeg 转码，未安装时整段识别）
+"""
+import array
+import asyncio
+import io
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import wave
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+FFMPEG = shutil.which("ffmpeg")
+
+# multipart 边界、各部分头信息等额外开销（Content-Length 超过文件上限加上该值时直接拒绝）
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+# 转码超时（秒）和每个 worker 同时运行的 ffmpeg 进程数
+TRANSCODE_TIMEOUT = 60
+_transcode_slots = asyncio.Semaphore(2)
+# 压缩格式录音按该码率估算时长（浏览器录制的 opus 通常为 32kbps）
+COMPRESSED_BYTES_PER_SECOND = 4000
+
+# 静音检测：窗口长度（秒）、峰值低于满幅的该比例视为静音、静音至少持续的时长（秒）
+SILENCE_WINDOW_SECONDS = 0.03
+SILENCE_PEAK_RATIO = 0.02
+SILENCE_MIN_SECONDS = 0.4
+
+
+class MemoryBudget:
+    """当前 worker 进程内音频数据占用内存的总额度"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.peak = 0
+        self.exhausted = 0
+
+    def reserve(self, size: int) -> bool:
+        if self.in_use + size > self.limit:
+            self.exhausted += 1
+            return False
+        self.in_use += size
+        self.peak = max(self.peak, self.in_use)
+        return True
+
+    def release(self, size: int) -> None:
+        self.in_use -= size
+
+    def stats(self) -> dict[str, int]:
+        return {"limit": self.limit, "in_use": self.in_use, "peak": self.peak, "budget_exhausted": self.exhausted}
+
+
+audio_memory_budget = MemoryBudget(settings.AUDIO_WORKER_MEMORY_BYTES)
+
+
+class AudioSpool:
+    """
+    音频内容：先写内存，超过 memory_limit 后转存临时文件
+    内存额度从 audio_memory_budget 中预留，额度不足时直接写临时文件；close 时释放额度并删除临时文件
+    """
+
+    def __init__(self, memory_limit: int = 0, suffix: str = ""):
+        self._reserved = memory_limit if memory_limit and audio_memory_budget.reserve(memory_limit) else 0
+        self._suffix = suffix
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self._file: Optional[BinaryIO] = None
+        self.path: Optional[str] = None
+        self.size = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> "AudioSpool":
+        """接管已写好的临时文件（close 时删除）"""
+        spool = cls()
+        spool._buffer = None
+        spool.path = path
+        spool.size = os.path.getsize(path)
+        return spool
+
+    @property
+    def on_disk(self) -> bool:
+        return self.path is not None
+
+    def write(self, data: bytes) -> None:
+        if self._buffer is not None and self._buffer.tell() + len(data) > self._reserved:
+            self._spill()
+        target = self._buffer if self._buffer is not None else self._file
+        target.write(data)  # type: ignore[union-attr]
+        self.size += len(data)
+
+    def _spill(self) -> None:
+        fd, self.path = tempfile.mkstemp(prefix="audio-", suffix=self._suffix)
+        self._file = os.fdopen(fd, "w+b")
+        self._file.write(self._buffer.getbuffer())  # type: ignore[union-attr]
+        self._buffer = None
+        self._release()
+
+    def head(self, size: int) -> bytes:
+        """开头的 size 个字节"""
+        if self._buffer is not None:
+            return self._buffer.getvalue()[:size]
+        if self._file is not None:
+            self._file.flush()
+        with open(self.path, "rb") as f:  # type: ignore[arg-type]
+            return f.read(size)
+
+    def to_disk(self) -> str:
+        """确保内容已写入临时文件，返回文件路径（用于 ffmpeg 等外部程序）"""
+        if self._buffer is not None:
+            self._spill()
+        if self._file is not None:
+            self._file.flush()
+        return self.path  # type: ignore[return-value]
+
+    def open(self) -> BinaryIO:
+        """以只读方式打开内容（每次返回新的文件对象，调用方负责关闭）"""
+        if self._buffer is not None:
+            return io.BytesIO(self._buffer.getvalue())
+        if self._file is not None:
+            self._file.flush()
+        return open(self.path, "rb")  # type: ignore[arg-type]
+
+    def _release(self) -> None:
+        if self._reserved:
+            audio_memory_budget.release(self._reserved)
+            self._reserved = 0
+
+    def close(self) -> None:
+        self._release()
+        self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+@dataclass
+class UploadedAudio:
+    filename: str
+    content_type: Optional[str]
+    spool: AudioSpool
+
+    def close(self) -> None:
+        self.spool.close()
+
+
+def _wav_byte_rate(header: bytes) -> Optional[int]:
+    """WAV 文件头中的每秒字节数，不是 WAV 时返回 None"""
+    if len(header) < 32 or header[:4] != b"RIFF" or header[8:12] != b"WAVE" or header[12:16] != b"fmt ":
+        return None
+    return struct.unpack_from("<I", header, 28)[0] or None
+
+
+def _duration_exceeded() -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=f"录音时长超过 {settings.AUDIO_MAX_DURATION_SECONDS} 秒，请分段录制",
+    )
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"音频文件不能超过 {settings.AUDIO_MAX_UPLOAD_BYTES // (1024 * 1024)}MB",
+    )
+
+
+async def receive_audio_upload(request: Request, field_name: str = "audio") -> UploadedAudio:
+    """
+    从 multipart/form-data 请求体中流式接收音频文件
+    超过大小或时长上限时尽早返回 413/422，请求中没有该文件字段时返回 400
+    """
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise HTTPException(status_code=400, detail="请使用 multipart/form-data 上传音频文件")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > settings.AUDIO_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            raise _too_large()
+
+    header_field = bytearray()
+    header_value = bytearray()
+    part_headers: dict[bytes, bytes] = {}
+    state: dict = {"target": False, "upload": None, "done": False}
+    pending: list[bytes] = []
+
+    def on_part_begin() -> None:
+        part_headers.clear()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header_value.extend(data[start:end])
+
+    def on_header_end() -> None:
+        part_headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished() -> None:
+        _, disposition = parse_options_header(part_headers.get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        state["target"] = name == field_name and b"filename" in disposition and state["upload"] is None
+        if state["target"]:
+            filename = disposition[b"filename"].decode("utf-8", "replace") or "audio.webm"
+            content_type = part_headers.get(b"content-type")
+            state["upload"] = UploadedAudio(
+                filename=os.path.basename(filename),
+                content_type=content_type.decode("latin-1") if content_type else None,
+                spool=AudioSpool(settings.AUDIO_SPOOL_MEMORY_BYTES, suffix=os.path.splitext(filename)[1]),
+            )
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if state["target"]:
+            pending.append(data[start:end])
+
+    def on_part_end() -> None:
+        if state["target"]:
+            state["target"] = False
+            state["done"] = True
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    duration_checked = False
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            upload: Optional[UploadedAudio] = state["upload"]
+            if upload is None or not pending:
+                continue
+            data = b"".join(pending)
+            pending.clear()
+            if upload.spool.size + len(data) > settings.AUDIO_MAX_UPLOAD_BYTES:
+                raise _too_large()
+            if upload.spool.on_disk:
+                # 写文件放到线程池中，避免阻塞事件循环
+                await run_in_threadpool(upload.spool.write, data)
+            else:
+                upload.spool.write(data)
+
+            # 收到 WAV 文件头后根据 Content-Length 估算时长
+            if not duration_checked and upload.spool.size >= 44:
+                duration_checked = True
+                byte_rate = _wav_byte_rate(upload.spool.head(44))
+                if byte_rate and content_length and content_length.isdigit():
+                    if (int(content_length) - 44) / byte_rate > settings.AUDIO_MAX_DURATION_SECONDS:
+                        raise _duration_exceeded()
+        parser.finalize()
+    except BaseException:
+        if state["upload"] is not None:
+            state["upload"].close()
+        raise
+
+    upload = state["upload"]
+    if upload is None or not state["done"]:
+        if upload is not None:
+            upload.close()
+        raise HTTPException(status_code=400, detail="未上传音频文件")
+    if upload.spool.size == 0:
+        upload.close()
+        raise HTTPException(status_code=400, detail="音频文件为空")
+    return upload
+
+
+async def _transcode_to_wav(spool: AudioSpool) -> Optional[AudioSpool]:
+    """用 ffmpeg 转为 16kHz 单声道 WAV，失败时返回 None"""
+    source = await run_in_threadpool(spool.to_disk)
+    fd, target = tempfile.mkstemp(prefix="audio-", suffix=".wav")
+    os.close(fd)
+    async with _transcode_slots:
+        process = await asyncio.create_subprocess_exec(
+            FFMPEG, "-nostdin", "-v", "error", "-y", "-i", source,  # type: ignore[arg-type]
+            "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le", target,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            returncode = await asyncio.wait_for(process.wait(), TRANSCODE_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            returncode = -1
+    if returncode != 0:
+        os.unlink(target)
+        return None
+    return AudioSpool.from_file(target)
+
+
+def _detect_silences(reader: wave.Wave_read) -> list[tuple[float, float]]:
+    """按窗口峰值检测静音区间（秒），只支持 16 位 PCM"""
+    rate = reader.getframerate()
+    window = max(1, int(rate * SILENCE_WINDOW_SECONDS))
+    threshold = int(32767 * SILENCE_PEAK_RATIO)
+    silences = []
+    silence_start = None
+    position = 0
+    reader.rewind()
+    while True:
+        data = reader.readframes(window)
+        if not data:
+            break
+        samples = array.array("h", data[: len(data) // 2 * 2])
+        if sys.byteorder == "big":
+            samples.byteswap()
+        quiet = not samples or max(max(samples), -min(samples)) < threshold
+        if quiet and silence_start is None:
+            silence_start = position
+        elif not quiet and silence_start is not None:
+            if (position - silence_start) / rate >= SILENCE_MIN_SECONDS:
+                silences.append((silence_start / rate, position / rate))
+            silence_start = None
+        position += len(data) // (reader.getsampwidth() * reader.getnchannels())
+    return silences
+
+
+def cut_points(silences: list[tuple[float, float]], duration: float, chunk_seconds: float) -> list[float]:
+    """
+    计算切分位置：每段不超过 chunk_seconds，尽量在后半段最靠后的静音中点切开，找不到静音时硬切
+    """
+    cuts = []
+    start = 0.0
+    while duration - start > chunk_seconds:
+        limit = start + chunk_seconds
+        middles = [(a + b) / 2 for a, b in silences if start + chunk_seconds / 2 <= (a + b) / 2 <= limit]
+        cut = middles[-1] if middles else limit
+        cuts.append(cut)
+        start = cut
+    return cuts
+
+
+def _split_wav(spool: AudioSpool, stem: str) -> list[tuple[str, AudioSpool]]:
+    """
+    检查 WAV 时长，超过 AUDIO_CHUNK_SECONDS 时切分为多个 WAV 临时文件
+    不需要切分（或无法解析）时返回空列表
+    """
+    with spool.open() as source:
+        try:
+            reader = wave.open(source, "rb")
+        except (wave.Error, EOFError):
+            return []
+        with reader:
+            rate = reader.getframerate()
+            duration = reader.getnframes() / rate
+            if duration > settings.AUDIO_MAX_DURATION_SECONDS:
+                raise _duration_exceeded()
+            if duration <= settings.AUDIO_CHUNK_SECONDS:
+                return []
+
+            silences = _detect_silences(reader) if reader.getsampwidth() == 2 else []
+            boundaries = [0, *(int(cut * rate) for cut in cut_points(silences, duration, settings.AUDIO_CHUNK_SECONDS)),
+                          reader.getnframes()]
+
+            chunks: list[tuple[str, AudioSpool]] = []
+            try:
+                for index, (begin, end) in enumerate(zip(boundaries, boundaries[1:]), 1):
+                    fd, path = tempfile.mkstemp(prefix="audio-", suffix=".wav")
+                    with os.fdopen(fd, "wb") as target, wave.open(target, "wb") as writer:
+                        writer.setparams(reader.getparams())
+                        reader.setpos(begin)
+                        remaining = end - begin
+                        while remaining > 0:
+                            frames = min(remaining, rate)
+                            writer.writeframes(reader.readframes(frames))
+                            remaining -= frames
+                    chunks.append((f"{stem}-{index}.wav", AudioSpool.from_file(path)))
+            except BaseException:
+                for _, chunk in chunks:
+                    chunk.close()
+                raise
+            return chunks
+
+
+async def split_audio(upload: UploadedAudio) -> list[tuple[str, AudioSpool]]:
+    """
+    返回需要分别识别的音频段 (文件名, 内容)
+    短录音（以及无法解析、未安装 ffmpeg 的非 WAV 录音）返回原文件一段；切分出的分段由调用方关闭
+    """
+    original = [(upload.filename, upload.spool)]
+    stem = os.path.splitext(upload.filename)[0] or "audio"
+    if _wav_byte_rate(upload.spool.head(44)) is not None:
+        return await run_in_threadpool(_split_wav, upload.spool, stem) or original
+
+    # 压缩格式按文件大小估算，估计不超过 AUDIO_CHUNK_SECONDS 的直接识别
+    if FFMPEG is None or upload.spool.size <= settings.AUDIO_CHUNK_SECONDS * COMPRESSED_BYTES_PER_SECOND:
+        return original
+    wav = await _transcode_to_wav(upload.spool)
+    if wav is None:
+        return original
+    try:
+        return await run_in_threadpool(_split_wav, wav, stem) or original
+    finally:
+        wav.close()
+
+
+def join_transcripts(texts: list[str]) -> str:
+    """拼接各段识别结果：中文直接相连，两侧都是英文或数字时加空格"""
+    result = ""
+    for text in (t.strip() for t in texts):
+        if not text:
+            continue
+        if result and result[-1].isascii() and result[-1].isalnum() and text[0].isascii() and text[0].isalnum():
+            result += " "
+        result += text
+    return result
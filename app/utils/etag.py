@@ -0,0 +1,55 @@
+"""
+带 ETag 的 JSON 响应
+
+响应体为预先序列化好的 bytes，ETag 为响应体的 SHA-256（强校验），
+请求头 If-None-Match 匹配时返回 304，不再发送响应体。
+"""
+import hashlib
+
+from fastapi import Request, Response
+
+
+def compute_etag(body: bytes) -> str:
+    """根据响应体计算强 ETag"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """判断请求头 If-None-Match 是否与 ETag 匹配（If-None-Match 使用弱比较）"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def etag_response(
+    request: Request,
+    body: bytes,
+    cache_control: str,
+    etag: str | None = None,
+    media_type: str = "application/json",
+) -> Response:
+    """返回带 ETag 和 Cache-Control 的响应，客户端缓存仍然有效时返回 304"""
+    etag = etag or compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+class StaticJSONResponse:
+    """
+    进程生命周期内不变的 JSON 响应
+    创建时序列化一次并计算 ETag，之后每次请求直接返回
+    """
+
+    def __init__(self, body: bytes, cache_control: str = "public, max-age=3600"):
+        self.body = body
+        self.etag = compute_etag(body)
+        self.cache_control = cache_control
+
+    def respond(self, request: Request) -> Response:
+        return etag_response(request, self.body, self.cache_control, etag=self.etag)
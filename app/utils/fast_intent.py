@@ -0,0 +1,257 @@
+"""
+语音指令本地快速解析
+
+很多指令格式固定，例如“语文单元形评获得A*，奖励10积分”、“积分兑换10元”。
+这里用规则匹配用户的项目、评分、惩罚/兑换选项词表，能确定解析出的结果直接返回，不再调用大模型；
+有歧义（匹配到多个候选、出现无法识别的内容等）时返回 None，交给大模型解析。
+
+返回值与大模型返回的 JSON 结构相同，之后同样经过 _validate_task_data / _validate_exchange_data 匹配ID。
+"""
+import re
+import time
+import unicodedata
+from typing import Any, Optional
+
+from app.core.enums import TaskRating
+from app.schemas.ai_context import ContextOption, ContextProject, UserContextSnapshot
+
+# 规则匹配成功时的置信度
+FAST_PATH_CONFIDENCE = 0.95
+_NUMBER = r"([0-9]+|[零一二两三四五六七八九十百]+)"
+_PUNCTUATION_RE = re.compile(r"[\s,，.。!！?？、;；:：\"'“”‘’~～…]+")
+_RATING_RE = re.compile(r"(?<![a-z])([abc])(\*|星|-|减)?(?![a-z])")
+_REWARD_RE = re.compile(rf"(?:奖励|奖|加){_NUMBER}个?(?:积分|分)")
+_AMOUNT_RE = re.compile(rf"{_NUMBER}(?:元|块钱|块)")
+_PUNISH_WORDS = ("惩罚", "罚")
+_STATUS_WORDS = {"进行中": "in_progress", "未开始": "not_started", "已完成": "completed", "完成了": "completed"}
+_FILLER_RE = re.compile(r"获得|得到|得了|拿到|评分|评级|等级|积分|兑换|奖励|惩罚|一个|本次|了|的|得|给|个|为|是|分")
+
+_VALID_RATINGS = {rating.value for rating in TaskRating}
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+
+
+def normalize(text: str) -> str:
+    """全角转半角、统一小写、去掉空白和标点（保留 * 和 -，用于评分等级）"""
+    return _PUNCTUATION_RE.sub("", unicodedata.normalize("NFKC", text)).lower()
+
+
+def parse_number(raw: str) -> Optional[int]:
+    """解析阿拉伯数字或简单的中文数字（一百以内，例如“十五”、“二十”）"""
+    if raw.isdigit():
+        return int(raw)
+    if raw == "一百":
+        return 100
+    if "百" in raw or "零" in raw:
+        return None
+    tens, _, ones = raw.partition("十")
+    if "十" not in raw:
+        return _CN_DIGITS.get(raw) if len(raw) == 1 else None
+    tens_value = _CN_DIGITS.get(tens, None) if tens else 1
+    ones_value = _CN_DIGITS.get(ones, None) if ones else 0
+    if tens_value is None or ones_value is None:
+        return None
+    return tens_value * 10 + ones_value
+
+
+def _unique_names(text: str, candidates: list[Any]) -> list[Any]:
+    """
+    找出名称出现在文本中的候选项
+    名称是另一个匹配项名称的一部分时忽略（“象棋”与“国际象棋”同时出现时取后者）
+    """
+    matched = [c for c in candidates if c.name and normalize(c.name) in text]
+    names = {normalize(c.name) for c in matched}
+    return [c for c in matched if not any(n != normalize(c.name) and normalize(c.name) in n for n in names)]
+
+
+def _single(items: list[Any]) -> tuple[bool, Any]:
+    """(是否无歧义, 唯一的项或 None)"""
+    if len(items) > 1:
+        return False, None
+    return True, items[0] if items else None
+
+
+def _is_clean(rest: str) -> bool:
+    """
+    去掉已识别的部分和常见虚词后不能剩下任何字符
+    哪怕一个字也可能改变意思（“不奖励5分”、“扣5分”、“b站”），有剩余时交给大模型解析
+    """
+    return not _FILLER_RE.sub("", rest)
+
+
+def _parse_exchange(text: str, snapshot: UserContextSnapshot) -> Optional[dict[str, Any]]:
+    # 同时出现奖励积分说明不是单纯的兑换
+    if _REWARD_RE.search(text):
+        return None
+
+    rest = text
+    ok, option = _single(_unique_names(text, snapshot.reward_options))
+    if not ok:
+        return None
+    if option is not None:
+        rest = rest.replace(normalize(option.name), "", 1)
+    else:
+        amount_match = _AMOUNT_RE.search(text)
+        amount = parse_number(amount_match.group(1)) if amount_match else None
+        if amount is None:
+            return None
+        candidates = [o for o in snapshot.reward_options if f"{amount}元" in normalize(o.name)]
+        if len(candidates) != 1:
+            return None
+        option = candidates[0]
+        rest = rest.replace(amount_match.group(0), "", 1)
+
+    if not _is_clean(rest):
+        return None
+    return {
+        "action": "exchange_points",
+        "confidence": FAST_PATH_CONFIDENCE,
+        "data": {"reward_name": option.name},
+        "message": f"将为您兑换「{option.name}」",
+    }
+
+
+def _match_projects(
+    text: str, projects: list[ContextProject]
+) -> Optional[tuple[Optional[ContextProject], Optional[ContextProject]]]:
+    """匹配一级和二级项目，有歧义时返回 None"""
+    level1 = [p for p in projects if p.level == 1]
+    level2 = [p for p in projects if p.level == 2]
+
+    ok, project1 = _single(_unique_names(text, level1))
+    if not ok:
+        return None
+    if project1 is not None:
+        children = [p for p in level2 if p.parent_id == project1.id]
+        ok, project2 = _single(_unique_names(text, children))
+        return (project1, project2) if ok else None
+
+    # 只说了二级项目名称时，根据二级项目推断一级项目
+    ok, project2 = _single(_unique_names(text, level2))
+    if not ok or project2 is None:
+        return None
+    project1 = next((p for p in level1 if p.id == project2.parent_id), None)
+    return (project1, project2) if project1 is not None else None
+
+
+def _parse_task(text: str, snapshot: UserContextSnapshot) -> Optional[dict[str, Any]]:
+    matched = _match_projects(text, snapshot.projects)
+    if matched is None:
+        return None
+    project1, project2 = matched
+    rest = text
+    for project in (project2, project1):
+        if project is not None:
+            rest = rest.replace(normalize(project.name), "", 1)
+
+    data: dict[str, Any] = {
+        "project_level1_name": project1.name,
+        "project_level2_name": project2.name if project2 else None,
+        "status": "completed",
+        "rating": None,
+        "reward_type": "none",
+    }
+
+    # 惩罚选项
+    punishment: Optional[ContextOption] = None
+    if any(word in rest for word in _PUNISH_WORDS):
+        ok, punishment = _single(_unique_names(rest, snapshot.punishment_options))
+        if not ok or punishment is None:
+            return None
+        rest = rest.replace(normalize(punishment.name), "", 1)
+        data["reward_type"] = "punish"
+        data["punishment_option_name"] = punishment.name
+
+    # 奖励积分
+    rewards = _REWARD_RE.findall(rest)
+    if len(rewards) > 1 or (rewards and punishment is not None):
+        return None
+    if rewards:
+        points = parse_number(rewards[0])
+        if points is None:
+            return None
+        rest = _REWARD_RE.sub("", rest, count=1)
+        data["reward_type"] = "reward"
+        data["reward_points"] = points
+
+    # 评分等级
+    ratings = {match.group(1).upper() + ("*" if match.group(2) in ("*", "星") else "-" if match.group(2) else "")
+               for match in _RATING_RE.finditer(rest)}
+    if len(ratings) > 1:
+        return None
+    if ratings:
+        rating = ratings.pop()
+        if rating not in _VALID_RATINGS:
+            return None
+        rest = _RATING_RE.sub("", rest, count=1)
+        data["rating"] = rating
+
+    if data["rating"] is None and data["reward_type"] == "none":
+        return None
+
+    # 任务状态
+    for word, status in _STATUS_WORDS.items():
+        if word in rest:
+            rest = rest.replace(word, "", 1)
+            data["status"] = status
+            break
+
+    if not _is_clean(rest):
+        return None
+
+    project_label = project1.name + (f"/{project2.name}" if project2 else "")
+    details = [d for d in (
+        data["rating"],
+        f"奖励{data['reward_points']}积分" if data["reward_type"] == "reward" else None,
+        f"惩罚：{punishment.name}" if punishment is not None else None,
+    ) if d]
+    return {
+        "action": "add_task",
+        "confidence": FAST_PATH_CONFIDENCE,
+        "data": data,
+        "message": f"将为您记录「{project_label}」{'，'.join(details)}",
+    }
+
+
+def parse_fast_intent(text: str, snapshot: UserContextSnapshot) -> Optional[dict[str, Any]]:
+    """用规则解析语音指令，能确定结果时返回与大模型相同结构的 JSON，否则返回 None"""
+    normalized = normalize(text)
+    if not normalized:
+        return None
+    if "兑换" in normalized:
+        parsed = _parse_exchange(normalized, snapshot)
+    else:
+        parsed = _parse_task(normalized, snapshot)
+    if parsed is not None:
+        parsed["corrected_text"] = text.strip()
+    return parsed
+
+
+class FastPathStats:
+    """本地快速解析的命中统计"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits: dict[str, int] = {}
+        self.parse_time_total = 0.0
+
+    def parse(self, text: str, snapshot: UserContextSnapshot) -> Optional[dict[str, Any]]:
+        started_at = time.perf_counter()
+        parsed = parse_fast_intent(text, snapshot)
+        self.parse_time_total += time.perf_counter() - started_at
+        self.attempts += 1
+        if parsed is not None:
+            self.hits[parsed["action"]] = self.hits.get(parsed["action"], 0) + 1
+        return parsed
+
+    def stats(self) -> dict[str, Any]:
+        hits = sum(self.hits.values())
+        return {
+            "attempts": self.attempts,
+            "hits": hits,
+            "hits_by_action": dict(self.hits),
+            "hit_rate": round(hits / self.attempts, 4) if self.attempts else 0.0,
+            "parse_avg_us": round(self.parse_time_total / self.attempts * 1e6, 1) if self.attempts else 0.0,
+        }
+
+
+fast_intent = FastPathStats()
@@ -0,0 +1,224 @@
+"""
+项目/选项名称的模糊匹配索引
+
+语音识别的结果常有同音字或个别字错误（例如“单元形评”识别为“单元行苹”），
+这里按用户的项目、惩罚选项、兑换选项名称建立倒排索引（字符二元组 + 拼音音节），
+查询时先通过索引取出候选项，再按编辑距离打分排序，不需要逐个扫描所有名称。
+
+安装 pypinyin（requirements.txt 中已包含）后会同时按拼音匹配（同音字得分接近精确匹配），
+未安装时只按字符匹配，同音字纠错失效，应用启动时会输出警告。
+"""
+import heapq
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Generic, Optional, TypeVar
+
+from app.schemas.ai_context import ContextOption, ContextProject, UserContextSnapshot
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # pragma: no cover - 取决于部署环境
+    lazy_pinyin = None
+
+T = TypeVar("T")
+
+# 自动采用匹配结果的最低得分（精确匹配、包含关系、同音）
+MATCH_THRESHOLD = 0.85
+# 每次查询最多打分的候选数
+MAX_CANDIDATES = 64
+
+
+def normalize_name(name: str) -> str:
+    """全角转半角、统一小写、去掉空白"""
+    return "".join(unicodedata.normalize("NFKC", name).lower().split())
+
+
+def to_pinyin(name: str) -> tuple[str, ...]:
+    """名称的拼音音节（未安装 pypinyin 时为空）"""
+    if lazy_pinyin is None:
+        return ()
+    return tuple(lazy_pinyin(name))
+
+
+def warn_if_pinyin_unavailable() -> None:
+    """未安装 pypinyin 时输出警告（应用启动时调用）"""
+    if lazy_pinyin is None:
+        print("⚠️ 未安装 pypinyin，项目/选项名称只按字符匹配，同音字无法纠正：pip install pypinyin")
+
+
+def edit_distance(a: str | tuple, b: str | tuple) -> int:
+    """编辑距离（Levenshtein）"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def similarity(a: str | tuple, b: str | tuple) -> float:
+    """基于编辑距离的相似度，0-1"""
+    if not a or not b:
+        return 0.0
+    return 1 - edit_distance(a, b) / max(len(a), len(b))
+
+
+def _grams(name: str, syllables: tuple[str, ...]) -> set[str]:
+    """索引键：字符二元组（单字名称用单字）和拼音音节"""
+    grams = {name[i:i + 2] for i in range(len(name) - 1)} if len(name) > 1 else {name}
+    grams.update(f"py:{s}" for s in syllables)
+    return grams
+
+
+@dataclass(frozen=True)
+class NameMatch(Generic[T]):
+    item: T
+    name: str
+    score: float
+
+
+@dataclass(frozen=True)
+class _Entry(Generic[T]):
+    item: T
+    name: str
+    normalized: str
+    syllables: tuple[str, ...]
+    gram_count: int
+
+
+class NameIndex(Generic[T]):
+    """
+    名称模糊匹配索引
+    min_contained_len / max_extra_len 控制包含关系的判定（避免“象棋”匹配到“国际象棋比赛”这种短词）
+    """
+
+    def __init__(
+        self,
+        items: list[T],
+        name_of: Callable[[T], str] = lambda item: item.name,  # type: ignore[attr-defined]
+        min_contained_len: int = 3,
+        max_extra_len: Optional[int] = 5,
+    ):
+        self.min_contained_len = min_contained_len
+        self.max_extra_len = max_extra_len
+        self._entries: list[_Entry[T]] = []
+        self._exact: dict[str, int] = {}
+        self._postings: dict[str, list[int]] = {}
+
+        for item in items:
+            name = name_of(item)
+            normalized = normalize_name(name)
+            if not normalized:
+                continue
+            syllables = to_pinyin(normalized)
+            grams = _grams(normalized, syllables)
+            position = len(self._entries)
+            self._entries.append(_Entry(item, name, normalized, syllables, len(grams)))
+            self._exact.setdefault(normalized, position)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _score(self, query: str, syllables: tuple[str, ...], entry: _Entry[T], min_score: float) -> float:
+        name = entry.normalized
+        if query == name:
+            return 1.0
+        # 包含关系：用户说的名称包含在项目名称中（长度相近），或项目名称包含在用户说的名称中
+        if len(query) >= self.min_contained_len and query in name:
+            if self.max_extra_len is None or len(name) - len(query) <= self.max_extra_len:
+                return 0.9
+        if len(name) >= self.min_contained_len and name in query:
+            return 0.9
+        # 同音（语音识别的同音字错误）
+        if syllables and syllables == entry.syllables:
+            return 0.86
+        # 编辑距离相似度最高只有 0.8，只需要自动匹配的结果时不用计算
+        if min_score > 0.8:
+            return 0.0
+        score = similarity(query, name)
+        if syllables and entry.syllables:
+            score = max(score, similarity(syllables, entry.syllables))
+        return round(score * 0.8, 4)
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> list[NameMatch[T]]:
+        """返回得分不低于 min_score 的候选项，按得分从高到低排序"""
+        normalized = normalize_name(query)
+        if not normalized or not self._entries:
+            return []
+
+        exact = self._exact.get(normalized)
+        if exact is not None and limit == 1:
+            entry = self._entries[exact]
+            return [NameMatch(entry.item, entry.name, 1.0)]
+
+        syllables = to_pinyin(normalized)
+        if len(normalized) == 1:
+            # 单字查询没有二元组可用，取包含该字的名称
+            candidates = [position for position, entry in enumerate(self._entries) if normalized in entry.normalized]
+        else:
+            grams = _grams(normalized, syllables)
+            counts: dict[int, int] = {}
+            # 单字名称以单字为索引键，查询时也按单字查找
+            for gram in grams.union(normalized):
+                for position in self._postings.get(gram, ()):
+                    counts[position] = counts.get(position, 0) + 1
+            # 按 Dice 系数取重合度最高的候选项，避免长名称仅因共享的键多而挤掉短名称
+            candidates = heapq.nlargest(
+                MAX_CANDIDATES,
+                counts,
+                key=lambda position: counts[position] / (len(grams) + self._entries[position].gram_count),
+            )
+
+        matches = [
+            match
+            for match in (
+                NameMatch(entry.item, entry.name, self._score(normalized, syllables, entry, min_score))
+                for entry in (self._entries[position] for position in candidates)
+            )
+            if match.score >= min_score
+        ]
+        matches.sort(key=lambda m: -m.score)
+        return matches[:limit]
+
+    def best_match(self, query: str) -> Optional[T]:
+        """得分达到 MATCH_THRESHOLD 的最佳匹配"""
+        matches = self.search(query, limit=1, min_score=MATCH_THRESHOLD)
+        return matches[0].item if matches else None
+
+    def suggestions(self, query: str, limit: int = 3) -> list[str]:
+        """得分未达到自动匹配要求但比较接近的候选名称"""
+        return [m.name for m in self.search(query, limit=limit, min_score=0.4) if m.score < MATCH_THRESHOLD]
+
+
+_EMPTY_INDEX: NameIndex = NameIndex([])
+
+
+class UserMatchIndex:
+    """一个用户的项目、惩罚选项、兑换选项匹配索引"""
+
+    def __init__(self, snapshot: UserContextSnapshot):
+        level2_by_parent: dict[int, list[ContextProject]] = {}
+        for project in snapshot.projects:
+            if project.level == 2 and project.parent_id is not None:
+                level2_by_parent.setdefault(project.parent_id, []).append(project)
+
+        self.level1: NameIndex[ContextProject] = NameIndex([p for p in snapshot.projects if p.level == 1])
+        self.level2_by_parent: dict[int, NameIndex[ContextProject]] = {
+            parent_id: NameIndex(projects) for parent_id, projects in level2_by_parent.items()
+        }
+        self.punishment_options: NameIndex[ContextOption] = NameIndex(
+            snapshot.punishment_options, min_contained_len=2, max_extra_len=None
+        )
+        self.reward_options: NameIndex[ContextOption] = NameIndex(
+            snapshot.reward_options, min_contained_len=1, max_extra_len=None
+        )
+        self.reward_option_list = snapshot.reward_options
+
+    def level2(self, parent_id: int) -> NameIndex[ContextProject]:
+        """某个一级项目下的二级项目索引"""
+        return self.level2_by_parent.get(parent_id) or _EMPTY_INDEX
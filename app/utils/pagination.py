@@ -0,0 +1,120 @@
+"""游标（keyset）分页工具，按 (created_at, id) 倒序翻页"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select, and_, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.session import async_session_maker
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """将 (created_at, id) 编码为不透明的游标字符串"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """解析游标字符串，格式不正确时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at_str, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at_str), int(row_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError("无效的分页游标") from e
+
+
+def keyset_before(created_at_column, id_column, cursor: tuple[datetime, int]) -> ColumnElement[bool]:
+    """生成“排在游标之后”（更早）的过滤条件，配合 ORDER BY created_at DESC, id DESC 使用"""
+    created_at, row_id = cursor
+    return or_(
+        created_at_column < created_at,
+        and_(created_at_column == created_at, id_column < row_id),
+    )
+
+
+def apply_keyset(
+    query: Select,
+    created_at_column,
+    id_column,
+    before: tuple[datetime, int] | None = None,
+    limit: int | None = None,
+) -> Select:
+    """为查询添加游标条件、(created_at, id) 倒序排序和数量限制"""
+    if before is not None:
+        query = query.where(keyset_before(created_at_column, id_column, before))
+    query = query.order_by(created_at_column.desc(), id_column.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def apply_keyset_union(
+    queries: list[Select],
+    before: tuple[datetime, int] | None = None,
+    limit: int | None = None,
+) -> Select:
+    """
+    合并多个列相同的查询（例如热表和归档表）并按 (created_at, id) 倒序分页
+    每个查询先按游标各自取 limit 条（各自使用索引），合并后再排序取 limit 条
+    """
+    if len(queries) == 1:
+        columns = queries[0].selected_columns
+        return apply_keyset(queries[0], columns.created_at, columns.id, before, limit)
+    branches = [
+        select(apply_keyset(query, query.selected_columns.created_at, query.selected_columns.id, before, limit).subquery())
+        for query in queries
+    ]
+    merged = union_all(*branches).subquery()
+    return apply_keyset(select(merged), merged.c.created_at, merged.c.id, None, limit)
+
+
+def parse_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    """解析请求中的游标参数，格式不正确时返回 400"""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def trim_page(rows: list, limit: int, response: Response) -> list:
+    """
+    截取一页数据（查询时应多取一条），还有下一页时在响应头 X-Next-Cursor 中返回游标
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    return rows
+
+
+def ndjson_response(
+    stream_rows: Callable[[AsyncSession], AsyncIterator[Any]],
+    schema: type[BaseModel],
+    bind: AsyncEngine | None = None,
+) -> StreamingResponse:
+    """
+    以 NDJSON（每行一个 JSON 对象）流式返回查询结果
+    请求依赖中的数据库会话在响应发送前就会关闭，所以流式读取使用独立的会话；
+    bind 传入请求会话所用的引擎（主库或只读副本），不传时使用主库
+    """
+
+    def _session() -> AsyncSession:
+        if bind is None:
+            return async_session_maker()
+        return AsyncSession(bind=bind, autoflush=False, expire_on_commit=False)
+
+    async def _body() -> AsyncIterator[bytes]:
+        async with _session() as session:
+            async for row in stream_rows(session):
+                yield schema.model_validate(row).model_dump_json().encode("utf-8") + b"\n"
+
+    return StreamingResponse(_body(), media_type="application/x-ndjson")
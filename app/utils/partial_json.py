@@ -0,0 +1,101 @@
+"""
+增量解析流式输出中的 JSON
+
+大模型流式返回 JSON 时，逐段喂入文本，顶层对象中的标量字段（字符串、数字、布尔、null）
+一旦完整就可以取出，不必等待整个 JSON 结束。每个字符只扫描一次。
+JSON 之前的内容（例如 markdown 代码块标记）会被跳过。
+"""
+import json
+from typing import Any
+
+
+class PartialJSONObjectScanner:
+    def __init__(self):
+        self.fields: dict[str, Any] = {}  # 已完整的顶层标量字段
+        self.finished = False  # 顶层对象已结束
+
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._token: list[str] = []  # 当前顶层字符串或标量
+        self._key: str | None = None
+        self._expect_value = False
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        """喂入新的文本，返回本次新完整的 (字段名, 值)"""
+        completed: list[tuple[str, Any]] = []
+        for ch in text:
+            if self.finished:
+                break
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._depth == 1:
+                    self._token.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_string(completed)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._token = ['"']
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    # 嵌套的对象/数组值结束，暂不解析
+                    self._reset_pair()
+                elif self._depth == 0:
+                    self._end_scalar(completed)
+                    self.finished = True
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_value = True
+                    self._token = []
+                elif ch == ",":
+                    self._end_scalar(completed)
+                elif self._expect_value and not ch.isspace():
+                    self._token.append(ch)
+        return completed
+
+    def _end_string(self, completed: list[tuple[str, Any]]) -> None:
+        value = json.loads("".join(self._token))
+        self._token = []
+        if not self._expect_value:
+            self._key = value
+            return
+        self._emit(self._key, value, completed)
+
+    def _end_scalar(self, completed: list[tuple[str, Any]]) -> None:
+        raw = "".join(self._token)
+        if self._expect_value and raw:
+            try:
+                self._emit(self._key, json.loads(raw), completed)
+            except json.JSONDecodeError:
+                self._reset_pair()
+        else:
+            self._reset_pair()
+
+    def _emit(self, key: str | None, value: Any, completed: list[tuple[str, Any]]) -> None:
+        if key is not None:
+            self.fields[key] = value
+            completed.append((key, value))
+        self._reset_pair()
+
+    def _reset_pair(self) -> None:
+        self._key = None
+        self._expect_value = False
+        self._token = []
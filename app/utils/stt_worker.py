@@ -0,0 +1,84 @@
+"""
+本地语音识别工作进程（在 ProcessPoolExecutor 的子进程中运行）
+
+只依赖标准库和识别引擎，不导入应用的其他模块，子进程启动时不需要加载配置、数据库连接等。
+内置引擎 faster-whisper（CTranslate2 实现的 Whisper，支持 CPU int8 推理），需要单独安装：
+    pip install faster-whisper
+也可以使用 "模块:函数" 形式指定自定义的加载函数（例如测试用的假引擎），
+加载函数接收 (model, options)，返回一个 transcribe(path) -> str 的函数。
+"""
+import importlib
+import io
+import wave
+from typing import Any, Callable
+
+Transcribe = Callable[[Any], str]
+
+_transcribe: Transcribe | None = None
+
+
+def _load_faster_whisper(model: str, options: dict[str, Any]) -> Transcribe:
+    from faster_whisper import WhisperModel
+
+    whisper = WhisperModel(
+        model,
+        device="cpu",
+        compute_type=options.get("compute_type", "int8"),
+        cpu_threads=options.get("cpu_threads", 0),
+        download_root=options.get("download_root"),
+    )
+    language = options.get("language")
+
+    def transcribe(audio: Any) -> str:
+        segments, _ = whisper.transcribe(audio, language=language, beam_size=1, vad_filter=True)
+        return "".join(segment.text for segment in segments).strip()
+
+    return transcribe
+
+
+ENGINES: dict[str, Callable[[str, dict[str, Any]], Transcribe]] = {
+    "faster-whisper": _load_faster_whisper,
+}
+
+
+def resolve_engine(engine: str) -> Callable[[str, dict[str, Any]], Transcribe]:
+    """内置引擎名称或 "模块:函数" 形式的加载函数"""
+    if engine in ENGINES:
+        return ENGINES[engine]
+    module_name, _, function_name = engine.partition(":")
+    if not function_name:
+        raise ValueError(f"未知的语音识别引擎：{engine}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _silence_wav(seconds: float = 1.0, rate: int = 16000) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(b"\0\0" * int(seconds * rate))
+    buffer.seek(0)
+    return buffer
+
+
+def init_worker(engine: str, model: str, options: dict[str, Any]) -> None:
+    """进程启动时加载模型，并识别一段静音预热（首次推理的初始化不计入请求耗时）"""
+    global _transcribe
+    _transcribe = resolve_engine(engine)(model, options)
+    _transcribe(_silence_wav())
+
+
+def ping() -> bool:
+    return _transcribe is not None
+
+
+def transcribe_batch(paths: list[str]) -> list[tuple[bool, str]]:
+    """依次识别一批文件，返回每个文件的 (是否成功, 文本或错误信息)，单个文件失败不影响其他文件"""
+    results = []
+    for path in paths:
+        try:
+            results.append((True, _transcribe(path)))  # type: ignore[misc]
+        except Exception as e:
+            results.append((False, f"{type(e).__name__}: {e}"))
+    return results
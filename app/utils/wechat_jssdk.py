@@ -9,6 +9,7 @@ import httpx
 from fastapi import HTTPException, status
 
 from app.core.config import get_settings
+from app.core.token_store import CachedToken, TokenStore, create_token_store
 
 
 def generate_nonce_str(length: int = 16) -> str:
@@ -16,8 +17,146 @@ def generate_nonce_str(length: int = 16) -> str:
     return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
 
 
+class WeChatAPIError(Exception):
+    """微信接口返回了错误码"""
+
+    def __init__(self, errcode: int, errmsg: str):
+        super().__init__(f"errcode={errcode}, errmsg={errmsg}")
+        self.errcode = errcode
+        self.errmsg = errmsg
+
+
+# access_token 无效或已过期（例如在其他地方被重新获取）
+_ACCESS_TOKEN_INVALID_ERRCODES = {40001, 40014, 42001}
+
+
+def _print_errcode_hint(errcode: int) -> None:
+    """打印常见错误码的排查提示"""
+    if errcode == 40013:
+        print("   提示: 无效的 AppID，请检查 WECHAT_APP_ID 配置是否正确")
+    elif errcode == 40125:
+        print("   提示: 无效的 AppSecret，请检查 WECHAT_APP_SECRET 配置是否正确")
+    elif errcode == 50001:
+        print("   提示: 用户未授权，可能的原因：")
+        print("     1. AppID 或 AppSecret 配置错误")
+        print("     2. IP 白名单限制（需要在微信公众平台配置服务器 IP 白名单）")
+        print("     3. 应用类型不支持（某些类型的应用不支持获取 access_token）")
+        print("   请登录微信公众平台检查：")
+        print("     - 开发 -> 基本配置 -> IP 白名单")
+        print("     - 设置 -> 公众号设置 -> 功能设置 -> JS 接口安全域名")
+    elif errcode == 61024:
+        print("   提示: IP 白名单限制，请在微信公众平台配置服务器 IP 白名单")
+        print("   路径: 开发 -> 基本配置 -> IP 白名单")
+
+
+class WeChatTokenService:
+    """
+    微信 access_token 和 jsapi_ticket（有效期 7200 秒，获取接口每天有调用次数限制）
+    两者都缓存在所有 worker 共享的存储中，过期前提前刷新，同一时间只有一个协程调用微信接口
+    base_url / transport 可替换为本地模拟服务，便于测试
+    """
+
+    def __init__(
+        self,
+        app_id: str,
+        app_secret: str,
+        store: TokenStore,
+        base_url: str = "https://api.weixin.qq.com",
+        refresh_ahead: int = 300,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.base_url = base_url
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.access_token = CachedToken(
+            f"wechat:{app_id}:access_token", self._fetch_access_token, store, refresh_ahead
+        )
+        self.jsapi_ticket = CachedToken(
+            f"wechat:{app_id}:jsapi_ticket", self._fetch_jsapi_ticket, store, refresh_ahead
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, transport=self.transport, timeout=10.0)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_json(self, path: str, params: dict) -> dict:
+        response = await self._get_client().get(path, params=params)
+        response.raise_for_status()
+        data = response.json()
+        # 检查微信 API 返回的错误
+        errcode = data.get("errcode")
+        if errcode not in (None, 0):
+            raise WeChatAPIError(errcode, data.get("errmsg", "未知错误"))
+        return data
+
+    async def _fetch_access_token(self) -> tuple[str, int]:
+        data = await self._get_json(
+            "/cgi-bin/token",
+            {"grant_type": "client_credential", "appid": self.app_id, "secret": self.app_secret},
+        )
+        if "access_token" not in data:
+            raise ValueError(f"微信 API 响应中缺少 access_token: {data}")
+        print("✓ 成功获取微信 access_token")
+        return data["access_token"], int(data.get("expires_in", 7200))
+
+    async def _request_ticket(self, access_token: str) -> dict:
+        return await self._get_json("/cgi-bin/ticket/getticket", {"type": "jsapi", "access_token": access_token})
+
+    async def _fetch_jsapi_ticket(self) -> tuple[str, int]:
+        access_token = await self.access_token.get()
+        try:
+            data = await self._request_ticket(access_token)
+        except WeChatAPIError as e:
+            if e.errcode not in _ACCESS_TOKEN_INVALID_ERRCODES:
+                raise
+            # 缓存的 access_token 已失效，作废后重新获取一次
+            await self.access_token.invalidate(access_token)
+            data = await self._request_ticket(await self.access_token.get())
+        if not data.get("ticket"):
+            raise ValueError(f"微信 API 响应中缺少 ticket: {data}")
+        print("✓ 成功获取微信 jsapi_ticket")
+        return data["ticket"], int(data.get("expires_in", 7200))
+
+    def stats(self) -> dict:
+        return {"access_token": self.access_token.stats(), "jsapi_ticket": self.jsapi_ticket.stats()}
+
+
+_token_service: Optional[WeChatTokenService] = None
+
+
+def get_wechat_token_service() -> WeChatTokenService:
+    """当前进程共享的微信令牌服务（首次使用时创建）"""
+    global _token_service
+    if _token_service is None:
+        settings = get_settings()
+        _token_service = WeChatTokenService(
+            settings.WECHAT_APP_ID,  # type: ignore[arg-type]
+            settings.WECHAT_APP_SECRET,  # type: ignore[arg-type]
+            create_token_store(),
+            base_url=settings.WECHAT_API_BASE_URL,
+            refresh_ahead=settings.WECHAT_TOKEN_REFRESH_AHEAD,
+        )
+    return _token_service
+
+
+async def close_wechat_token_service() -> None:
+    """关闭微信接口的连接池（应用退出时调用）"""
+    global _token_service
+    if _token_service is not None:
+        await _token_service.close()
+        _token_service = None
+
+
 async def get_jsapi_ticket() -> Optional[str]:
-    """获取微信 JSAPI ticket"""
+    """获取微信 JSAPI ticket（使用共享缓存，过期前才会重新调用微信接口）"""
     settings = get_settings()
     
     if not settings.WECHAT_APP_ID or not settings.WECHAT_APP_SECRET:
@@ -25,80 +164,20 @@ async def get_jsapi_ticket() -> Optional[str]:
               f"WECHAT_APP_SECRET={'已配置' if settings.WECHAT_APP_SECRET else '未配置'}")
         return None
     
-    # 第一步：获取 access_token
-    token_url = "https://api.weixin.qq.com/cgi-bin/token"
-    token_params = {
-        "grant_type": "client_credential",
-        "appid": settings.WECHAT_APP_ID,
-        "secret": settings.WECHAT_APP_SECRET,
-    }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            token_response = await client.get(token_url, params=token_params, timeout=10.0)
-            token_response.raise_for_status()
-            token_data = token_response.json()
-            
-            # 检查微信 API 返回的错误
-            if "errcode" in token_data and token_data.get("errcode") != 0:
-                errcode = token_data.get("errcode")
-                error_msg = token_data.get("errmsg", "未知错误")
-                print(f"⚠️ 获取微信 access_token 失败: token_params={token_params},errcode={errcode}, errmsg={error_msg}")
-                
-                # 提供更详细的错误说明
-                if errcode == 40013:
-                    print("   提示: 无效的 AppID，请检查 WECHAT_APP_ID 配置是否正确")
-                elif errcode == 40125:
-                    print("   提示: 无效的 AppSecret，请检查 WECHAT_APP_SECRET 配置是否正确")
-                elif errcode == 50001:
-                    print("   提示: 用户未授权，可能的原因：")
-                    print("     1. AppID 或 AppSecret 配置错误")
-                    print("     2. IP 白名单限制（需要在微信公众平台配置服务器 IP 白名单）")
-                    print("     3. 应用类型不支持（某些类型的应用不支持获取 access_token）")
-                    print("   请登录微信公众平台检查：")
-                    print("     - 开发 -> 基本配置 -> IP 白名单")
-                    print("     - 设置 -> 公众号设置 -> 功能设置 -> JS 接口安全域名")
-                elif errcode == 61024:
-                    print("   提示: IP 白名单限制，请在微信公众平台配置服务器 IP 白名单")
-                    print("   路径: 开发 -> 基本配置 -> IP 白名单")
-                
-                return None
-            
-            if "access_token" not in token_data:
-                print(f"⚠️ 微信 API 响应中缺少 access_token: {token_data}")
-                return None
-            
-            access_token = token_data["access_token"]
-            
-            # 第二步：获取 jsapi_ticket
-            ticket_url = "https://api.weixin.qq.com/cgi-bin/ticket/getticket"
-            ticket_params = {
-                "type": "jsapi",
-                "access_token": access_token,
-            }
-            
-            ticket_response = await client.get(ticket_url, params=ticket_params, timeout=10.0)
-            ticket_response.raise_for_status()
-            ticket_data = ticket_response.json()
-            
-            # 检查微信 API 返回的错误
-            if ticket_data.get("errcode") != 0:
-                error_msg = ticket_data.get("errmsg", "未知错误")
-                print(f"⚠️ 获取微信 jsapi_ticket 失败: errcode={ticket_data.get('errcode')}, errmsg={error_msg}")
-                return None
-            
-            ticket = ticket_data.get("ticket")
-            if ticket:
-                print(f"✓ 成功获取微信 jsapi_ticket")
-            return ticket
-        except httpx.HTTPStatusError as e:
-            print(f"⚠️ HTTP 请求失败: {e.response.status_code} - {e.response.text}")
-            return None
-        except Exception as e:
-            print(f"⚠️ 获取微信 JSAPI ticket 失败: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
+    try:
+        return await get_wechat_token_service().jsapi_ticket.get()
+    except WeChatAPIError as e:
+        print(f"⚠️ 获取微信 jsapi_ticket 失败: errcode={e.errcode}, errmsg={e.errmsg}")
+        _print_errcode_hint(e.errcode)
+        return None
+    except httpx.HTTPStatusError as e:
+        print(f"⚠️ HTTP 请求失败: {e.response.status_code} - {e.response.text}")
+        return None
+    except Exception as e:
+        print(f"⚠️ 获取微信 JSAPI ticket 失败: {type(e).__name__}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
 
 
 def generate_signature(ticket: str, nonce_str: str, timestamp: int, url: str) -> str:
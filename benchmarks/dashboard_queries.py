@@ -0,0 +1,121 @@
+"""
+首页数据查询次数检查
+
+build_dashboard 无论学生和项目数量多少，都应固定只执行 3 条查询（学生、积分余额、评分统计+项目名称）。
+在临时 SQLite 数据库中为一个用户写入不同数量的学生和任务，通过 before_cursor_execute 统计实际执行的 SQL 条数，
+超过 MAX_STATEMENTS 条说明出现了 N+1 查询。
+
+用法：
+    python3 -m benchmarks.dashboard_queries
+    python3 -m benchmarks.dashboard_queries --students 1 5 50 --tasks 20
+"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.crud.dashboard import build_dashboard
+from app.db.session import Base
+from app.models.project import Project
+from app.models.student import Student
+from app.models.task_and_score import StudentScoreBalance, Task, TaskStatus
+from app.models.user import User
+
+MAX_STATEMENTS = 3
+PROJECTS = 8
+
+
+async def seed(engine: AsyncEngine, user_id: int, students: int, tasks_per_student: int, seed_value: int) -> None:
+    """为一个用户写入若干学生（含积分余额）、一级项目和最近完成的任务"""
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    project_ids = [user_id * 1000 + i for i in range(PROJECTS)]
+    student_ids = [user_id * 1000 + i for i in range(students)]
+    async with engine.begin() as conn:
+        await conn.execute(insert(User).values(id=user_id, email=f"user{user_id}@example.com"))
+        await conn.execute(
+            insert(Project),
+            [{"id": pid, "user_id": user_id, "level": 1, "name": f"项目{pid}"} for pid in project_ids],
+        )
+        await conn.execute(
+            insert(Student),
+            [{"id": sid, "user_id": user_id, "name": f"学生{sid}"} for sid in student_ids],
+        )
+        await conn.execute(
+            insert(StudentScoreBalance),
+            [
+                {"student_id": sid, "total_increase": 100, "total_exchange": 30, "available_points": 70}
+                for sid in student_ids
+            ],
+        )
+        tasks = [
+            {
+                "student_id": sid,
+                "project_level1_id": rng.choice(project_ids),
+                "status": TaskStatus.COMPLETED,
+                "rating": rng.choice(["A*", "A", "B", "C"]),
+                "reward_type": "none",
+                "updated_at": now - timedelta(days=rng.randint(0, 20)),
+            }
+            for sid in student_ids
+            for _ in range(tasks_per_student)
+        ]
+        if tasks:
+            await conn.execute(insert(Task), tasks)
+
+
+async def count_statements(engine: AsyncEngine, user_id: int) -> tuple[int, int]:
+    """执行一次 build_dashboard，返回 (执行的 SQL 条数, 返回的学生数)"""
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _record)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            dashboard = await build_dashboard(db, user_id)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _record)
+    return len(statements), len(dashboard.students)
+
+
+async def run(student_counts: list[int], tasks_per_student: int, seed_value: int) -> int:
+    path = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    print(f"临时 SQLite 数据库 {path}，每个学生 {tasks_per_student} 个已完成任务")
+
+    failures = 0
+    for user_id, students in enumerate(student_counts, start=1):
+        await seed(engine, user_id, students, tasks_per_student, seed_value)
+        count, returned = await count_statements(engine, user_id)
+        ok = count <= MAX_STATEMENTS and returned == students
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {students} 个学生：执行 {count} 条 SQL（上限 {MAX_STATEMENTS}），返回 {returned} 个学生")
+    await engine.dispose()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="首页数据查询次数检查")
+    parser.add_argument("--students", type=int, nargs="+", default=[1, 5, 30], help="每个用户的学生数（可以指定多个规模）")
+    parser.add_argument("--tasks", type=int, default=10, help="每个学生的已完成任务数")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(args.students, args.tasks, args.seed))
+    if failures:
+        print(f"{failures} 个规模下首页数据的查询次数超过 {MAX_STATEMENTS} 条")
+        sys.exit(1)
+    print(f"首页数据在所有规模下都不超过 {MAX_STATEMENTS} 条查询")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+语音指令本地快速解析基准测试
+
+用固定的词表和语料（benchmarks/data/voice_commands.jsonl）测量本地规则解析的命中率、准确性和耗时；
+加 --llm 时同时调用配置的大模型解析同一批语料，对比延迟和解析结果是否一致（需要配置 AI_API_KEY）。
+任一语料的本地解析结果不符合预期（包括应当交给大模型、却被本地规则误解析的语料）时以非零状态退出。
+
+用法：
+    python3 -m benchmarks.fast_intent
+    python3 -m benchmarks.fast_intent --llm
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from app.schemas.ai_context import ContextOption, ContextProject, UserContextSnapshot
+from app.utils.fast_intent import parse_fast_intent
+
+CORPUS_PATH = Path(__file__).parent / "data" / "voice_commands.jsonl"
+
+# 语料对应的用户词表
+SNAPSHOT = UserContextSnapshot(
+    prompt="",
+    projects=[
+        ContextProject(id=1, name="语文", level=1),
+        ContextProject(id=2, name="数学", level=1),
+        ContextProject(id=3, name="英语", level=1),
+        ContextProject(id=4, name="国际象棋", level=1),
+        ContextProject(id=5, name="体育", level=1),
+        ContextProject(id=11, name="单元形评", level=2, parent_id=1),
+        ContextProject(id=12, name="作文", level=2, parent_id=1),
+        ContextProject(id=21, name="口算", level=2, parent_id=2),
+        ContextProject(id=31, name="听写", level=2, parent_id=3),
+        ContextProject(id=41, name="比赛", level=2, parent_id=4),
+        ContextProject(id=51, name="跳绳", level=2, parent_id=5),
+    ],
+    punishment_options=[
+        ContextOption(id=1, name="抄写十遍"),
+        ContextOption(id=2, name="不看电视"),
+    ],
+    reward_options=[
+        ContextOption(id=1, name="10元", cost_points=10),
+        ContextOption(id=2, name="20元零花钱", cost_points=20),
+        ContextOption(id=3, name="看电视30分钟", cost_points=15),
+    ],
+)
+
+
+def load_corpus() -> list[dict]:
+    with CORPUS_PATH.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _flatten(parsed: dict) -> dict:
+    return {"action": parsed["action"], **parsed.get("data", {})}
+
+
+def _matches(parsed: dict | None, expected: dict | None) -> bool:
+    if expected is None or parsed is None:
+        return parsed is None and expected is None
+    actual = _flatten(parsed)
+    return all(actual.get(key) == value for key, value in expected.items())
+
+
+def bench_fast_path(corpus: list[dict], rounds: int) -> int:
+    """返回结果不符合预期的语料条数"""
+    timings = []
+    hits = correct = 0
+    for item in corpus:
+        started_at = time.perf_counter()
+        for _ in range(rounds):
+            parsed = parse_fast_intent(item["text"], SNAPSHOT)
+        timings.append((time.perf_counter() - started_at) / rounds)
+        hits += parsed is not None
+        if _matches(parsed, item["expected"]):
+            correct += 1
+        else:
+            print(f"  ✗ {item['text']}: {parsed}")
+
+    print(f"本地规则解析：{len(corpus)} 条语料，命中 {hits} 条（{hits / len(corpus):.0%}），结果符合预期 {correct} 条")
+    print(f"  耗时 p50={statistics.median(timings) * 1e6:.1f}µs  max={max(timings) * 1e6:.1f}µs")
+    return len(corpus) - correct
+
+
+async def bench_llm(corpus: list[dict]) -> None:
+    from app.api.v1.endpoints.ai import SYSTEM_PROMPT, _chat_request, _extract_json
+    from app.core.llm_gateway import llm_gateway
+    from app.crud.ai_context import FIXED_OPTIONS_CONTEXT
+
+    projects = "\n".join(f"  - {p.name}" for p in SNAPSHOT.projects if p.level == 1)
+    prompt = SYSTEM_PROMPT + "\n【一级项目（用户自定义）】\n" + projects + "\n".join(FIXED_OPTIONS_CONTEXT)
+    timings = []
+    agree = 0
+    try:
+        for item in corpus:
+            fast = parse_fast_intent(item["text"], SNAPSHOT)
+            started_at = time.perf_counter()
+            response = await llm_gateway.chat_completion(0, **_chat_request(prompt, item["text"]))
+            timings.append(time.perf_counter() - started_at)
+            parsed = _extract_json(response.choices[0].message.content)
+            if fast is not None and parsed.get("action") == fast["action"]:
+                agree += 1
+    finally:
+        await llm_gateway.close()
+
+    hits = sum(parse_fast_intent(item["text"], SNAPSHOT) is not None for item in corpus)
+    print(f"大模型解析：耗时 p50={statistics.median(timings) * 1000:.0f}ms  max={max(timings) * 1000:.0f}ms")
+    print(f"  本地规则命中的 {hits} 条中，{agree} 条与大模型解析出的 action 一致")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="语音指令本地快速解析基准测试")
+    parser.add_argument("--rounds", type=int, default=1000, help="每条语料重复解析的次数")
+    parser.add_argument("--llm", action="store_true", help="同时调用大模型对比延迟")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    mismatches = bench_fast_path(corpus, args.rounds)
+    if args.llm:
+        asyncio.run(bench_llm(corpus))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+访问令牌校验基准测试
+
+对比每次请求的 token 校验耗时：
+- jose：python-jose 直接校验签名（原来的做法）
+- pyjwt：PyJWT 直接校验签名（需要安装 PyJWT，未安装时跳过）
+- cached：TokenVerifier 缓存命中（同一批用户反复请求）
+
+用法：
+    python3 -m benchmarks.jwt_verify
+    python3 -m benchmarks.jwt_verify --users 500 --requests 20000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from jose import jwt
+
+from app.core.jwt_verifier import JWT_BACKENDS, TokenVerifier, VerifiedToken
+
+KEY = "benchmark-secret-key"
+ALGORITHM = "HS256"
+
+
+def generate_tokens(users: int) -> list[str]:
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    return [jwt.encode({"exp": expires_at, "sub": f"user_id:{i}"}, KEY, algorithm=ALGORITHM) for i in range(1, users + 1)]
+
+
+def _timed(verify: Callable[[str], VerifiedToken], tokens: list[str]) -> list[float]:
+    durations = []
+    for token in tokens:
+        started_at = time.perf_counter()
+        verify(token)
+        durations.append(time.perf_counter() - started_at)
+    return durations
+
+
+def _summary(label: str, durations: list[float]) -> None:
+    ordered = sorted(durations)
+    p50 = ordered[len(ordered) // 2] * 1e6
+    p95 = ordered[int(len(ordered) * 0.95)] * 1e6
+    total = sum(durations)
+    print(
+        f"{label:<8} p50 {p50:7.1f}µs  p95 {p95:7.1f}µs  "
+        f"avg {statistics.mean(durations) * 1e6:7.1f}µs  {len(durations) / total:10.0f} 次/秒"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="访问令牌校验基准测试")
+    parser.add_argument("--users", type=int, default=200, help="不同 token 的数量")
+    parser.add_argument("--requests", type=int, default=10000, help="校验次数")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tokens = generate_tokens(args.users)
+    requests = [rng.choice(tokens) for _ in range(args.requests)]
+    print(f"{args.users} 个 token，{args.requests} 次校验（{ALGORITHM}）")
+
+    for name, backend_cls in JWT_BACKENDS.items():
+        try:
+            backend = backend_cls()
+        except RuntimeError as e:
+            print(f"{name:<8} 跳过：{e}")
+            continue
+        uncached = TokenVerifier(backend, KEY, ALGORITHM, max_entries=0)
+        _summary(name, _timed(uncached.verify, requests))
+
+    verifier = TokenVerifier(JWT_BACKENDS["jose"](), KEY, ALGORITHM, max_entries=args.users)
+    for token in tokens:
+        verifier.verify(token)
+    _summary("cached", _timed(verifier.verify, requests))
+    print(f"缓存命中 {verifier.hits}/{verifier.hits + verifier.misses}")
+
+
+if __name__ == "__main__":
+    main()
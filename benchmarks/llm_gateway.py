@@ -0,0 +1,287 @@
+"""
+大模型调用网关检查
+
+用本地假的 OpenAI 兼容服务（httpx.MockTransport，按脚本返回状态码、延迟和流式分段）驱动 LLMGateway，检查：
+- 429 / 5xx / 单次请求超时按退避重试，重试次数不超过 max_retries，退避带随机抖动
+- 整体截止时间（包含排队、重试和流式输出）到期时抛出 LLMDeadlineExceeded，不会继续等待
+- 单用户并发上限和全局并发上限（假服务记录同时处理的请求数）
+- 流式输出逐段返回，只在收到第一段之前重试
+
+用法：
+    python3 -m benchmarks.llm_gateway
+"""
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+import openai
+
+from app.core.llm_gateway import LLMDeadlineExceeded, LLMGateway
+
+MODEL = "fake-model"
+
+
+@dataclass
+class Reply:
+    """假服务对一次请求的响应：状态码、开始响应前的延迟、流式分段（以及分段之间的延迟）"""
+
+    status: int = 200
+    delay: float = 0.0
+    chunks: list[str] = field(default_factory=lambda: ["好的"])
+    chunk_delay: float = 0.0
+
+
+class FakeOpenAI:
+    """
+    本地假 OpenAI 兼容服务
+    按脚本依次返回响应（脚本用完后重复最后一个），记录请求数和同时处理的最大请求数
+    """
+
+    def __init__(self, *script: Reply):
+        self.script = list(script) or [Reply()]
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        reply = self.script[min(self.requests, len(self.script) - 1)]
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        # MockTransport 本身不执行超时，这里按请求携带的 read 超时模拟真实连接的 ReadTimeout
+        read_timeout = request.extensions.get("timeout", {}).get("read")
+        try:
+            if read_timeout is not None and reply.delay > read_timeout:
+                await asyncio.sleep(read_timeout)
+                raise httpx.ReadTimeout("fake read timeout", request=request)
+            await asyncio.sleep(reply.delay)
+        finally:
+            self.active -= 1
+        if reply.status != 200:
+            return httpx.Response(reply.status, json={"error": {"message": f"fake {reply.status}", "type": "fake"}})
+        if json.loads(request.content).get("stream"):
+            return httpx.Response(
+                200, headers={"content-type": "text/event-stream"}, content=self._sse(reply)
+            )
+        return httpx.Response(200, json=_completion("".join(reply.chunks)))
+
+    async def _sse(self, reply: Reply):
+        for text in reply.chunks:
+            yield f"data: {json.dumps(_chunk(text), ensure_ascii=False)}\n\n".encode("utf-8")
+            await asyncio.sleep(reply.chunk_delay)
+        yield b"data: [DONE]\n\n"
+
+
+def _completion(content: str) -> dict[str, Any]:
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": 0,
+        "model": MODEL,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+def _chunk(content: str) -> dict[str, Any]:
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": MODEL,
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    }
+
+
+def _gateway(server: FakeOpenAI, **options: Any) -> LLMGateway:
+    options = {
+        "max_concurrency": 16,
+        "per_user_concurrency": 2,
+        "request_timeout": 5.0,
+        "call_deadline": 5.0,
+        "max_retries": 2,
+        **options,
+    }
+    return LLMGateway(api_key="fake", base_url="http://fake-openai/v1", transport=server.transport(), **options)
+
+
+MESSAGES = [{"role": "user", "content": "数学口算A"}]
+
+
+async def _chat(gateway: LLMGateway, user_id: int = 1) -> str:
+    response = await gateway.chat_completion(user_id, model=MODEL, messages=MESSAGES)
+    return response.choices[0].message.content
+
+
+async def _stream(gateway: LLMGateway, user_id: int = 1) -> list[str]:
+    return [text async for text in gateway.chat_completion_stream(user_id, model=MODEL, messages=MESSAGES)]
+
+
+async def _outcome(call: Awaitable[Any]) -> tuple[Any, Optional[BaseException], float]:
+    """(返回值, 异常, 耗时秒)"""
+    started_at = time.perf_counter()
+    try:
+        return await call, None, time.perf_counter() - started_at
+    except Exception as e:
+        return None, e, time.perf_counter() - started_at
+
+
+async def check_retry_rate_limited() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(429), Reply(200))
+    gateway = _gateway(server)
+    result, error, _ = await _outcome(_chat(gateway))
+    await gateway.close()
+    ok = error is None and result == "好的" and server.requests == 2 and gateway.retries == 1
+    return ok, f"返回 {result!r}，请求 {server.requests} 次，重试 {gateway.retries} 次，错误 {error!r}"
+
+
+async def check_retry_server_error_exhausted() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(504))
+    gateway = _gateway(server, max_retries=2)
+    _, error, _ = await _outcome(_chat(gateway))
+    await gateway.close()
+    ok = isinstance(error, openai.InternalServerError) and server.requests == 3 and gateway.retries == 2
+    return ok, f"请求 {server.requests} 次（预期 1 + max_retries=2），重试 {gateway.retries} 次，错误 {type(error).__name__}"
+
+
+async def check_retry_request_timeout() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(delay=1.0), Reply())
+    gateway = _gateway(server, request_timeout=0.2)
+    result, error, elapsed = await _outcome(_chat(gateway))
+    await gateway.close()
+    ok = error is None and result == "好的" and server.requests == 2 and elapsed < 1.0
+    return ok, f"第一次请求超过 request_timeout 后重试，返回 {result!r}，请求 {server.requests} 次，耗时 {elapsed:.2f}s"
+
+
+async def check_deadline_slow_upstream() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(delay=3.0))
+    gateway = _gateway(server, request_timeout=10.0, call_deadline=0.5)
+    _, error, elapsed = await _outcome(_chat(gateway))
+    await gateway.close()
+    ok = isinstance(error, LLMDeadlineExceeded) and elapsed < 0.8 and gateway.deadline_exceeded == 1
+    return ok, f"上游 3s 才响应，截止时间 0.5s：{type(error).__name__}，耗时 {elapsed:.2f}s"
+
+
+async def check_deadline_stops_retries() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(429))
+    gateway = _gateway(server, max_retries=50, call_deadline=0.6)
+    _, error, elapsed = await _outcome(_chat(gateway))
+    await gateway.close()
+    ok = isinstance(error, (openai.RateLimitError, LLMDeadlineExceeded)) and elapsed < 0.8 and server.requests < 50
+    return ok, f"持续 429、max_retries=50、截止时间 0.6s：请求 {server.requests} 次后 {type(error).__name__}，耗时 {elapsed:.2f}s"
+
+
+async def check_deadline_includes_queueing() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(delay=1.0))
+    gateway = _gateway(server, per_user_concurrency=1, call_deadline=0.5)
+    outcomes = await asyncio.gather(*(_outcome(_chat(gateway)) for _ in range(3)))
+    await gateway.close()
+    errors = [type(error).__name__ for _, error, _ in outcomes]
+    slowest = max(elapsed for _, _, elapsed in outcomes)
+    ok = all(isinstance(error, LLMDeadlineExceeded) for _, error, _ in outcomes) and slowest < 0.8
+    return ok, f"单用户并发 1，3 个调用排队、截止时间 0.5s：{errors}，最慢 {slowest:.2f}s"
+
+
+async def check_per_user_concurrency() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(delay=0.1))
+    gateway = _gateway(server, per_user_concurrency=2)
+    outcomes = await asyncio.gather(*(_outcome(_chat(gateway, user_id=1)) for _ in range(6)))
+    await gateway.close()
+    ok = all(error is None for _, error, _ in outcomes) and server.max_active == 2
+    return ok, f"同一用户 6 个并发调用，上游最大并发 {server.max_active}（上限 2）"
+
+
+async def check_global_concurrency() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(delay=0.1))
+    gateway = _gateway(server, max_concurrency=3, per_user_concurrency=2)
+    calls = [_outcome(_chat(gateway, user_id=user_id)) for user_id in range(1, 7) for _ in range(2)]
+    outcomes = await asyncio.gather(*calls)
+    await gateway.close()
+    ok = all(error is None for _, error, _ in outcomes) and server.max_active == 3 and not gateway._user_slots
+    return ok, f"6 个用户各 2 个并发调用，上游最大并发 {server.max_active}（全局上限 3）"
+
+
+async def check_stream() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(chunks=["加", "5", "分"]))
+    gateway = _gateway(server)
+    texts, error, _ = await _outcome(_stream(gateway))
+    await gateway.close()
+    ok = error is None and texts == ["加", "5", "分"] and gateway.in_flight == 0
+    return ok, f"逐段返回 {texts}，错误 {error!r}"
+
+
+async def check_stream_retry_before_first_chunk() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(503), Reply(chunks=["好", "的"]))
+    gateway = _gateway(server)
+    texts, error, _ = await _outcome(_stream(gateway))
+    await gateway.close()
+    ok = error is None and texts == ["好", "的"] and server.requests == 2 and gateway.retries == 1
+    return ok, f"第一次 503 后重试，返回 {texts}，请求 {server.requests} 次"
+
+
+async def check_stream_deadline() -> tuple[bool, str]:
+    server = FakeOpenAI(Reply(chunks=[str(i) for i in range(20)], chunk_delay=0.1))
+    gateway = _gateway(server, call_deadline=0.5)
+    received: list[str] = []
+
+    async def _consume() -> None:
+        async for text in gateway.chat_completion_stream(1, model=MODEL, messages=MESSAGES):
+            received.append(text)
+
+    _, error, elapsed = await _outcome(_consume())
+    await gateway.close()
+    ok = isinstance(error, LLMDeadlineExceeded) and 0 < len(received) < 20 and elapsed < 0.8
+    return ok, f"20 段每段间隔 0.1s，截止时间 0.5s：收到 {len(received)} 段后 {type(error).__name__}，耗时 {elapsed:.2f}s"
+
+
+async def check_backoff_jitter() -> tuple[bool, str]:
+    gateway = _gateway(FakeOpenAI())
+    samples = {attempt: [gateway._backoff(attempt) for _ in range(200)] for attempt in range(6)}
+    bounds = {attempt: min(4.0, 0.25 * 2**attempt) for attempt in samples}
+    in_bounds = all(0 <= d <= bounds[attempt] for attempt, ds in samples.items() for d in ds)
+    spread = all(len({round(d, 6) for d in ds}) > 100 for ds in samples.values())
+    ok = in_bounds and spread
+    return ok, "退避时间上限 " + "、".join(f"{bounds[a]:g}s" for a in samples) + f"，均在范围内={in_bounds}，随机分布={spread}"
+
+
+CHECKS: list[tuple[str, Callable[[], Awaitable[tuple[bool, str]]]]] = [
+    ("429 限流后重试", check_retry_rate_limited),
+    ("5xx 重试次数上限", check_retry_server_error_exhausted),
+    ("单次请求超时后重试", check_retry_request_timeout),
+    ("上游过慢时截止时间到期", check_deadline_slow_upstream),
+    ("截止时间内停止重试", check_deadline_stops_retries),
+    ("截止时间包含排队时间", check_deadline_includes_queueing),
+    ("单用户并发上限", check_per_user_concurrency),
+    ("全局并发上限", check_global_concurrency),
+    ("流式输出", check_stream),
+    ("流式输出第一段之前重试", check_stream_retry_before_first_chunk),
+    ("流式输出截止时间", check_stream_deadline),
+    ("退避抖动", check_backoff_jitter),
+]
+
+
+async def run() -> int:
+    failures = 0
+    for name, check in CHECKS:
+        ok, summary = await check()
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {name}\n    {summary}")
+    return failures
+
+
+def main() -> None:
+    failures = asyncio.run(run())
+    if failures:
+        print(f"{failures} 项检查不符合预期")
+        sys.exit(1)
+    print("大模型调用网关的所有检查都符合预期")
+
+
+if __name__ == "__main__":
+    main()
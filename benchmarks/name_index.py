@@ -0,0 +1,107 @@
+"""
+名称匹配索引基准测试
+
+随机生成数千个项目名称，分别用原来的逐个扫描（lower() + 包含判断）和名称匹配索引（NameIndex）
+查找精确名称、部分名称和含错字的名称，比较耗时分布和匹配结果。
+
+用法：
+    python3 -m benchmarks.name_index
+    python3 -m benchmarks.name_index --names 5000 --queries 2000
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, Optional
+
+from app.schemas.ai_context import ContextProject
+from app.utils.name_index import NameIndex, lazy_pinyin
+
+CHARS = "语文数学英语物理化学生历史地理政治体育音乐美术书法编程围棋象棋钢琴小提琴舞蹈游泳跳绳篮球足球单元测验作文阅读口算听写背诵默写练习比赛考试周末课外"
+
+
+def generate_names(count: int, rng: random.Random) -> list[ContextProject]:
+    names: set[str] = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(CHARS) for _ in range(rng.randint(2, 8))))
+    return [ContextProject(id=i, name=name, level=1) for i, name in enumerate(sorted(names), 1)]
+
+
+def generate_queries(projects: list[ContextProject], count: int, rng: random.Random) -> list[str]:
+    """三分之一精确名称，三分之一去掉首字，三分之一替换一个字（模拟识别错误）"""
+    queries = []
+    for i in range(count):
+        name = rng.choice(projects).name
+        if i % 3 == 1 and len(name) > 3:
+            name = name[1:]
+        elif i % 3 == 2:
+            position = rng.randrange(len(name))
+            name = name[:position] + rng.choice(CHARS) + name[position + 1:]
+        queries.append(name)
+    return queries
+
+
+def legacy_match(projects: list[ContextProject], name: str) -> Optional[ContextProject]:
+    """原 _validate_task_data 中的逐个扫描匹配"""
+    project_lower = name.lower().strip()
+    for p in projects:
+        p_name_lower = p.name.lower().strip()
+        if project_lower == p_name_lower:
+            return p
+        if len(project_lower) >= 3 and project_lower in p_name_lower:
+            if len(p_name_lower) - len(project_lower) <= 5:
+                return p
+        if len(p_name_lower) >= 3 and p_name_lower in project_lower:
+            return p
+    return None
+
+
+def _timed(match: Callable[[str], Optional[ContextProject]], queries: list[str]):
+    durations, results = [], []
+    for query in queries:
+        started_at = time.perf_counter()
+        results.append(match(query))
+        durations.append(time.perf_counter() - started_at)
+    return durations, results
+
+
+def _summary(label: str, durations: list[float], results: list) -> None:
+    ordered = sorted(durations)
+    p50 = ordered[len(ordered) // 2] * 1e6
+    p95 = ordered[int(len(ordered) * 0.95)] * 1e6
+    matched = sum(r is not None for r in results)
+    print(
+        f"{label:<10} p50 {p50:8.1f}µs  p95 {p95:8.1f}µs  "
+        f"avg {statistics.mean(durations) * 1e6:8.1f}µs  matched {matched}/{len(results)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="名称匹配索引基准测试")
+    parser.add_argument("--names", type=int, default=3000, help="名称数量")
+    parser.add_argument("--queries", type=int, default=1000, help="查询次数")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    projects = generate_names(args.names, rng)
+    queries = generate_queries(projects, args.queries, rng)
+
+    started_at = time.perf_counter()
+    index = NameIndex(projects)
+    build_ms = (time.perf_counter() - started_at) * 1000
+    print(f"{len(projects)} 个名称，{len(queries)} 次查询，拼音匹配：{'开启' if lazy_pinyin else '未安装 pypinyin'}")
+    print(f"建索引 {build_ms:.1f}ms")
+
+    legacy_durations, legacy_results = _timed(lambda q: legacy_match(projects, q), queries)
+    index_durations, index_results = _timed(index.best_match, queries)
+    _summary("逐个扫描", legacy_durations, legacy_results)
+    _summary("索引", index_durations, index_results)
+
+    # 原方法能匹配到的，索引也应匹配到（可能选中另一个同样满足条件的名称）
+    missed = sum(1 for old, new in zip(legacy_results, index_results) if old is not None and new is None)
+    print(f"原方法匹配到而索引未匹配：{missed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+第三方登录接口客户端检查
+
+用本地假的微信、钉钉 OAuth 接口（httpx.MockTransport，可以切换为正常、超时、5xx、非 JSON、业务错误码）
+驱动 get_wechat_user_info / get_dingtalk_user_info，检查 OAuthHTTPClient 对每个平台：
+- 超时返回 504，5xx 和非 JSON 响应返回 502，业务错误码（errcode）原样提示且不计入熔断
+- 连续失败达到阈值后熔断，直接返回 503 和 Retry-After，不再请求第三方
+- 暂停结束后只放行一个探测请求，探测失败重新熔断，探测成功恢复正常
+
+用法：
+    python3 -m benchmarks.oauth_client
+"""
+import asyncio
+import os
+import sys
+from typing import Any, Awaitable, Callable, Optional
+
+# 在导入配置之前设置：登录功能需要配置应用凭据，接口地址指向假服务
+os.environ.setdefault("WECHAT_APP_ID", "fake-app-id")
+os.environ.setdefault("WECHAT_APP_SECRET", "fake-secret")
+os.environ.setdefault("DINGTALK_APP_KEY", "fake-app-key")
+os.environ.setdefault("DINGTALK_APP_SECRET", "fake-secret")
+os.environ["WECHAT_API_BASE_URL"] = "http://fake-wechat"
+os.environ["DINGTALK_API_BASE_URL"] = "http://fake-dingtalk"
+
+import httpx  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+from app.core.oauth_client import OAuthHTTPClient  # noqa: E402
+from app.utils import oauth  # noqa: E402
+
+READ_TIMEOUT = 0.2
+BREAKER_FAILURES = 3
+BREAKER_RESET = 1.0
+
+# 正常响应（路径 -> JSON）
+OK_RESPONSES = {
+    "/sns/oauth2/access_token": {"access_token": "fake-token", "openid": "wx-openid"},
+    "/sns/userinfo": {"nickname": "小明", "headimgurl": "", "unionid": "wx-unionid"},
+    "/sns/gettoken": {"errcode": 0, "errmsg": "ok", "access_token": "fake-token"},
+    "/sns/getuserinfo_bycode": {"errcode": 0, "user_info": {"openid": "dd-openid", "nick": "小红", "unionid": "dd-unionid"}},
+}
+# 业务错误（换取 access_token 时授权码无效）
+ERRCODE_RESPONSES = {
+    "wechat": {"errcode": 40029, "errmsg": "invalid code"},
+    "dingtalk": {"errcode": 40078, "errmsg": "不存在的临时授权码"},
+}
+
+
+class FakeOAuthProvider:
+    """本地假 OAuth 接口，mode 决定响应方式：ok / slow / error / html / errcode"""
+
+    def __init__(self, provider: str, mode: str = "ok"):
+        self.provider = provider
+        self.mode = mode
+        self.requests = 0
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.mode == "slow":
+            # MockTransport 本身不执行超时，这里按请求携带的 read 超时模拟真实连接的 ReadTimeout
+            await asyncio.sleep(request.extensions["timeout"]["read"])
+            raise httpx.ReadTimeout("fake read timeout", request=request)
+        if self.mode == "error":
+            return httpx.Response(500, text="Internal Server Error")
+        if self.mode == "html":
+            return httpx.Response(200, text="<html>维护中</html>", headers={"content-type": "text/html"})
+        if self.mode == "errcode":
+            return httpx.Response(200, json=ERRCODE_RESPONSES[self.provider])
+        return httpx.Response(200, json=OK_RESPONSES[request.url.path])
+
+
+LOGIN: dict[str, Callable[[str], Awaitable[dict]]] = {
+    "wechat": oauth.get_wechat_user_info,
+    "dingtalk": oauth.get_dingtalk_user_info,
+}
+
+
+def _use_client(server: FakeOAuthProvider) -> OAuthHTTPClient:
+    """换上指向假服务的客户端（登录函数通过模块属性 oauth_client 调用）"""
+    client = OAuthHTTPClient(
+        read_timeout=READ_TIMEOUT,
+        breaker_failures=BREAKER_FAILURES,
+        breaker_reset=BREAKER_RESET,
+        transport=server.transport(),
+    )
+    oauth.oauth_client = client
+    return client
+
+
+async def _login(provider: str) -> tuple[Optional[dict], Optional[HTTPException]]:
+    try:
+        return await LOGIN[provider]("fake-code"), None
+    except HTTPException as e:
+        return None, e
+
+
+def _status(error: Optional[HTTPException]) -> Optional[int]:
+    return error.status_code if error is not None else None
+
+
+async def check_ok(provider: str) -> tuple[bool, str]:
+    server = FakeOAuthProvider(provider)
+    client = _use_client(server)
+    user, error = await _login(provider)
+    await client.close()
+    ok = error is None and user is not None and user["openid"] and server.requests == 2
+    return ok, f"返回 openid={user and user['openid']!r}，请求 {server.requests} 次，错误 {error and error.detail!r}"
+
+
+async def _check_failure(provider: str, mode: str, expected_status: int) -> tuple[bool, str]:
+    server = FakeOAuthProvider(provider, mode)
+    client = _use_client(server)
+    _, error = await _login(provider)
+    await client.close()
+    breaker = client.breakers[provider]
+    ok = _status(error) == expected_status and breaker.consecutive_failures == 1 and breaker.state == "closed"
+    return ok, f"HTTP {_status(error)}（预期 {expected_status}）{error and error.detail!r}，连续失败计数 {breaker.consecutive_failures}"
+
+
+async def check_timeout(provider: str) -> tuple[bool, str]:
+    return await _check_failure(provider, "slow", 504)
+
+
+async def check_server_error(provider: str) -> tuple[bool, str]:
+    return await _check_failure(provider, "error", 502)
+
+
+async def check_non_json(provider: str) -> tuple[bool, str]:
+    return await _check_failure(provider, "html", 502)
+
+
+async def check_errcode(provider: str) -> tuple[bool, str]:
+    server = FakeOAuthProvider(provider, "errcode")
+    client = _use_client(server)
+    outcomes = [await _login(provider) for _ in range(BREAKER_FAILURES + 1)]
+    await client.close()
+    breaker = client.breakers[provider]
+    errmsg = ERRCODE_RESPONSES[provider]["errmsg"]
+    ok = (
+        all(_status(error) == 400 and errmsg in error.detail for _, error in outcomes)
+        and breaker.consecutive_failures == 0
+        and breaker.state == "closed"
+        and server.requests == len(outcomes)
+    )
+    _, error = outcomes[-1]
+    return ok, f"连续 {len(outcomes)} 次 HTTP {_status(error)} {error and error.detail!r}，熔断器 {breaker.state}"
+
+
+async def check_breaker_recovers(provider: str) -> tuple[bool, str]:
+    server = FakeOAuthProvider(provider, "error")
+    client = _use_client(server)
+    for _ in range(BREAKER_FAILURES):
+        await _login(provider)
+    requests_before = server.requests
+    _, rejected = await _login(provider)
+    retry_after = rejected.headers.get("Retry-After") if rejected is not None and rejected.headers else None
+    skipped = server.requests == requests_before
+
+    await asyncio.sleep(BREAKER_RESET)
+    server.mode = "ok"
+    user, error = await _login(provider)
+    state = client.breakers[provider].state
+    await client.close()
+    ok = (
+        _status(rejected) == 503 and retry_after is not None and int(retry_after) >= 1 and skipped
+        and error is None and user is not None and state == "closed"
+    )
+    return ok, (
+        f"连续 {BREAKER_FAILURES} 次 5xx 后 HTTP {_status(rejected)}，Retry-After={retry_after}，"
+        f"未请求第三方={skipped}；{BREAKER_RESET:g}s 后探测成功={error is None}，熔断器 {state}"
+    )
+
+
+async def check_half_open_single_probe(provider: str) -> tuple[bool, str]:
+    server = FakeOAuthProvider(provider, "error")
+    client = _use_client(server)
+    for _ in range(BREAKER_FAILURES):
+        await _login(provider)
+    await asyncio.sleep(BREAKER_RESET)
+
+    # 暂停结束后同时到达的请求只放行一个探测请求，探测仍然失败时重新熔断
+    server.mode = "slow"
+    requests_before = server.requests
+    outcomes = await asyncio.gather(*(_login(provider) for _ in range(3)))
+    statuses = sorted(_status(error) for _, error in outcomes)
+    probes = server.requests - requests_before
+    breaker = client.breakers[provider]
+    reopened = breaker.state == "open"
+    _, after = await _login(provider)
+    await client.close()
+    ok = statuses == [503, 503, 504] and probes == 1 and reopened and _status(after) == 503
+    return ok, f"3 个并发请求：HTTP {statuses}，第三方收到 {probes} 个探测请求，探测超时后重新熔断={reopened}"
+
+
+CHECKS: list[tuple[str, Callable[[str], Awaitable[tuple[bool, str]]]]] = [
+    ("正常登录", check_ok),
+    ("超时返回 504", check_timeout),
+    ("5xx 返回 502", check_server_error),
+    ("非 JSON 响应返回 502", check_non_json),
+    ("业务错误码原样提示且不计入熔断", check_errcode),
+    ("熔断返回 503 + Retry-After，探测成功后恢复", check_breaker_recovers),
+    ("半开状态只放行一个探测请求", check_half_open_single_probe),
+]
+
+
+async def run() -> int:
+    failures = 0
+    original_client = oauth.oauth_client
+    try:
+        for provider, label in OAuthHTTPClient.PROVIDER_LABELS.items():
+            for name, check in CHECKS:
+                ok, summary = await check(provider)
+                failures += not ok
+                print(f"{'✓' if ok else '✗'} [{label}] {name}\n    {summary}")
+    finally:
+        oauth.oauth_client = original_client
+    return failures
+
+
+def main() -> None:
+    failures = asyncio.run(run())
+    if failures:
+        print(f"{failures} 项检查不符合预期")
+        sys.exit(1)
+    print("第三方登录接口客户端的所有检查都符合预期")
+
+
+if __name__ == "__main__":
+    main()
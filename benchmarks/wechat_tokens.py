@@ -0,0 +1,178 @@
+"""
+微信 access_token / jsapi_ticket 缓存检查
+
+用本地假的微信接口（httpx.MockTransport）驱动 WeChatTokenService，检查单飞刷新、多个 worker 共享令牌、
+提前刷新、刷新失败后的重试间隔，以及 access_token 失效后重新获取，统计实际调用微信接口的次数。
+
+用法：
+    python3 -m benchmarks.wechat_tokens
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from app.core.token_store import FileTokenStore, MemoryTokenStore, StoredToken, TokenStore
+from app.utils.wechat_jssdk import WeChatAPIError, WeChatTokenService
+
+REFRESH_AHEAD = 5  # 秒，刷新失败后的重试间隔为 refresh_ahead / 10
+
+
+class FakeWeChat:
+    """
+    本地假微信接口，记录 /cgi-bin/token 和 /cgi-bin/ticket/getticket 的调用次数
+    token_errcode 不为 None 时获取 access_token 返回该错误码；invalid_tokens 中的 access_token 获取 ticket 时返回 40001
+    """
+
+    def __init__(self):
+        self.token_calls = 0
+        self.ticket_calls = 0
+        self.token_errcode: Optional[int] = None
+        self.invalid_tokens: set[str] = set()
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        # 让出事件循环，使并发请求有机会同时到达
+        await asyncio.sleep(0.01)
+        if request.url.path == "/cgi-bin/token":
+            self.token_calls += 1
+            if self.token_errcode is not None:
+                return httpx.Response(200, json={"errcode": self.token_errcode, "errmsg": "fake error"})
+            return httpx.Response(200, json={"access_token": f"token-{self.token_calls}", "expires_in": 7200})
+        self.ticket_calls += 1
+        if request.url.params["access_token"] in self.invalid_tokens:
+            return httpx.Response(200, json={"errcode": 40001, "errmsg": "invalid credential"})
+        return httpx.Response(200, json={"errcode": 0, "ticket": f"ticket-{self.ticket_calls}", "expires_in": 7200})
+
+
+def _service(server: FakeWeChat, store: TokenStore) -> WeChatTokenService:
+    return WeChatTokenService(
+        "fake-app", "fake-secret", store, base_url="http://fake-wechat",
+        refresh_ahead=REFRESH_AHEAD, transport=server.transport(),
+    )
+
+
+async def check_single_flight() -> tuple[bool, str]:
+    server = FakeWeChat()
+    service = _service(server, MemoryTokenStore())
+    tickets = await asyncio.gather(*(service.jsapi_ticket.get() for _ in range(20)))
+    again = await service.jsapi_ticket.get()
+    await service.close()
+    ok = set(tickets) == {again} and server.token_calls == 1 and server.ticket_calls == 1
+    return ok, f"20 个并发请求后再请求 1 次：获取 access_token {server.token_calls} 次、ticket {server.ticket_calls} 次"
+
+
+async def check_shared_across_workers() -> tuple[bool, str]:
+    server = FakeWeChat()
+    with tempfile.TemporaryDirectory() as directory:
+        # 每个 worker 各自的服务对象，共享同一个令牌目录
+        workers = [_service(server, FileTokenStore(directory)) for _ in range(4)]
+        tickets = await asyncio.gather(*(w.jsapi_ticket.get() for w in workers for _ in range(5)))
+        for worker in workers:
+            await worker.close()
+    ok = len(set(tickets)) == 1 and server.token_calls == 1 and server.ticket_calls == 1
+    return ok, f"4 个 worker 各 5 个并发请求：获取 access_token {server.token_calls} 次、ticket {server.ticket_calls} 次"
+
+
+async def check_refresh_ahead() -> tuple[bool, str]:
+    server = FakeWeChat()
+    store = MemoryTokenStore()
+    service = _service(server, store)
+    # 还有 REFRESH_AHEAD - 1 秒过期，已进入提前刷新窗口
+    await store.set(service.access_token.name, StoredToken("old-token", time.time() + REFRESH_AHEAD - 1))
+    token = await service.access_token.get()
+    await service.close()
+    ok = token == "token-1" and server.token_calls == 1
+    return ok, f"过期前 {REFRESH_AHEAD - 1}s 请求：返回 {token!r}，获取 access_token {server.token_calls} 次"
+
+
+async def check_refresh_failure_backoff() -> tuple[bool, str]:
+    server = FakeWeChat()
+    store = MemoryTokenStore()
+    service = _service(server, store)
+    cached = service.access_token
+    await store.set(cached.name, StoredToken("old-token", time.time() + REFRESH_AHEAD - 1))
+    server.token_errcode = 45009  # 接口调用超过限额
+
+    during_backoff = [await cached.get() for _ in range(20)]
+    calls_during_backoff = server.token_calls
+    await asyncio.sleep(REFRESH_AHEAD / 10 + 0.1)
+    after_backoff = await cached.get()
+    calls_after_backoff = server.token_calls
+
+    server.token_errcode = None
+    await asyncio.sleep(REFRESH_AHEAD / 10 + 0.1)
+    recovered = await cached.get()
+    await service.close()
+    ok = (
+        set(during_backoff) == {"old-token"} and calls_during_backoff == 1
+        and after_backoff == "old-token" and calls_after_backoff == 2
+        and recovered != "old-token" and cached.refresh_failures == 2
+    )
+    return ok, (
+        f"提前刷新返回 45009：20 次请求调用接口 {calls_during_backoff} 次并返回旧令牌，"
+        f"{REFRESH_AHEAD / 10:g}s 后重试 1 次，接口恢复后获取到 {recovered!r}"
+    )
+
+
+async def check_expired_refresh_failure() -> tuple[bool, str]:
+    server = FakeWeChat()
+    server.token_errcode = 45009
+    service = _service(server, MemoryTokenStore())
+    errors = []
+    for _ in range(2):
+        try:
+            await service.access_token.get()
+        except WeChatAPIError as e:
+            errors.append(e.errcode)
+    await service.close()
+    ok = errors == [45009, 45009]
+    return ok, f"没有可用的旧令牌时刷新失败直接报错：{errors}，获取 access_token {server.token_calls} 次"
+
+
+async def check_invalid_access_token() -> tuple[bool, str]:
+    server = FakeWeChat()
+    store = MemoryTokenStore()
+    service = _service(server, store)
+    await store.set(service.access_token.name, StoredToken("revoked-token", time.time() + 3600))
+    server.invalid_tokens.add("revoked-token")
+    ticket = await service.jsapi_ticket.get()
+    await service.close()
+    ok = ticket.startswith("ticket-") and server.token_calls == 1 and server.ticket_calls == 2
+    return ok, f"缓存的 access_token 已失效（40001）：作废后重新获取，返回 {ticket!r}，获取 access_token {server.token_calls} 次"
+
+
+CHECKS: list[tuple[str, Callable[[], Awaitable[tuple[bool, str]]]]] = [
+    ("单飞刷新", check_single_flight),
+    ("多个 worker 共享令牌", check_shared_across_workers),
+    ("提前刷新", check_refresh_ahead),
+    ("提前刷新失败后的重试间隔", check_refresh_failure_backoff),
+    ("令牌已过期时刷新失败", check_expired_refresh_failure),
+    ("access_token 失效后重新获取", check_invalid_access_token),
+]
+
+
+async def run() -> int:
+    failures = 0
+    for name, check in CHECKS:
+        ok, summary = await check()
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {name}\n    {summary}")
+    return failures
+
+
+def main() -> None:
+    failures = asyncio.run(run())
+    if failures:
+        print(f"{failures} 项检查不符合预期")
+        sys.exit(1)
+    print("微信令牌缓存的所有检查都符合预期")
+
+
+if __name__ == "__main__":
+    main()